@@ -10,7 +10,8 @@ from .models import (
 # admin.py
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Post, Category, Project, Comment, PostRating, UserProfile
+from .models import Post, Category, Project, Comment, PostRating, UserProfile, Platform
+from . import moderation
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
@@ -26,6 +27,18 @@ class PostAdmin(admin.ModelAdmin):
     
     list_filter = ['status', 'category', 'created_at']
     search_fields = ['title', 'content', 'author__username']
+    actions = ['approve_selected', 'reject_selected']
+    
+    # Modération en lot : une transaction, une invalidation des caches
+    @admin.action(description='Publier les articles en attente sélectionnés')
+    def approve_selected(self, request, queryset):
+        count = moderation.approve_posts(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{count} article(s) publié(s).')
+    
+    @admin.action(description='Renvoyer en brouillon les articles en attente sélectionnés')
+    def reject_selected(self, request, queryset):
+        count = moderation.reject_posts(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{count} article(s) renvoyé(s) en brouillon.')
     
     def author_username(self, obj):
         return obj.author.username
@@ -48,10 +61,28 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug', 'created_at']
     prepopulated_fields = {'slug': ('name',)}
 
+@admin.register(Platform)
+class PlatformAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'tag_slugs', 'post_count', 'position', 'is_active']
+    list_editable = ['position', 'is_active']
+    prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ['post_count']
+
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
-    list_display = ['title', 'project_type', 'status', 'is_approved', 'created_at']
-    list_filter = ['is_approved', 'project_type', 'status']
+    list_display = ['title', 'project_type', 'status', 'is_approved', 'rejected_at', 'created_at']
+    list_filter = ['is_approved', 'rejected_at', 'project_type', 'status']
+    actions = ['approve_selected', 'reject_selected']
+    
+    @admin.action(description='Approuver les projets en attente ou refusés sélectionnés')
+    def approve_selected(self, request, queryset):
+        count = moderation.approve_projects(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{count} projet(s) approuvé(s).')
+    
+    @admin.action(description='Refuser (masquer du site) les projets en attente sélectionnés')
+    def reject_selected(self, request, queryset):
+        count = moderation.reject_projects(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'{count} projet(s) refusé(s), visibles par leur auteur seulement.')
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
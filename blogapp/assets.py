@@ -0,0 +1,155 @@
+"""
+Fichiers statiques : feuilles de style minifiées, noms hachés, variantes
+précompressées.
+
+Les styles des pages vivent dans ``static/css/`` (gabarit de base) et
+``blogapp/static/blogapp/css/`` (une feuille par page) au lieu de blocs
+``<style>`` renvoyés avec chaque page HTML. ``collectstatic`` passe par
+``CompressedManifestStaticFilesStorage`` :
+
+- les CSS sont minifiées à l'écriture;
+- chaque fichier reçoit un nom haché d'après son contenu (manifeste Django),
+  ce qui permet un cache navigateur d'un an sans risque de version périmée;
+- chaque fichier texte est précompressé en ``.gz`` et, si le paquet
+  ``brotli`` est installé, en ``.br``.
+
+``serve`` sert ``STATIC_ROOT`` avec la variante compressée acceptée par le
+navigateur et les en-têtes de cache (``STATIC_SERVE``; à désactiver quand
+le serveur web s'en charge lui-même). L'envoi lui-même (ETag, plages) passe
+par ``file_serving.serve_file``.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import Http404
+from django.utils._os import safe_join
+
+from .file_serving import IMMUTABLE_MAX_AGE, serve_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.xml', '.map', '.ttf', '.eot')
+# En dessous, l'en-tête gzip coûte plus qu'il ne rapporte
+MIN_COMPRESS_SIZE = 256
+
+# Nom produit par le manifeste : ``base.0123456789ab.css``
+_HASHED_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+_CSS_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+_CSS_COMMENT_RE = re.compile(r'(%s)|/\*.*?\*/' % _CSS_STRING, re.S)
+_CSS_STRING_RE = re.compile(r'(%s)' % _CSS_STRING, re.S)
+
+
+def _squeeze(css):
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r' ?([{};,>]) ?', r'\1', css)
+    css = re.sub(r': ', ':', css)
+    return css.replace(';}', '}')
+
+
+def minify_css(css):
+    """Retirer commentaires et blancs inutiles (le contenu des chaînes est conservé)"""
+    css = _CSS_COMMENT_RE.sub(lambda match: match.group(1) or '', css)
+    parts = _CSS_STRING_RE.split(css)
+    # Indices impairs : chaînes entre guillemets, laissées intactes
+    return ''.join(part if i % 2 else _squeeze(part) for i, part in enumerate(parts)).strip()
+
+
+def compress(data):
+    """Variantes compressées d'un contenu : {'.gz': ..., '.br': ...}, si plus petites"""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {suffix: body for suffix, body in variants.items() if len(body) < len(data)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        # collectstatic pas encore lancé (développement, tests) : noms
+        # d'origine, servis depuis les dossiers sources
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def _save(self, name, content):
+        if name.endswith('.css') and not name.endswith('.min.css'):
+            content.seek(0)
+            content = ContentFile(minify_css(content.read().decode('utf-8')).encode('utf-8'))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for original, hashed in self.hashed_files.items():
+            for name in (original, hashed):
+                if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    self._precompress(name)
+
+    def _precompress(self, name):
+        with self.open(name) as source:
+            data = source.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, body in compress(data).items():
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            super()._save(name + suffix, ContentFile(body))
+
+
+def accepted_encodings(header):
+    """Codages acceptés d'après ``Accept-Encoding`` (``q=0`` = refusé)"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if coding and re.fullmatch(r'\s*q=0(\.0*)?\s*', params) is None:
+            accepted.add(coding)
+    return accepted
+
+
+def _find(path):
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if os.path.isfile(fullpath):
+        return fullpath
+    # Fichier pas encore collecté
+    return finders.find(path)
+
+
+def serve(request, path):
+    fullpath = _find(path)
+    if not fullpath:
+        raise Http404
+
+    content_type, _ = mimetypes.guess_type(fullpath)
+    headers, vary = {}, ()
+    filename = fullpath
+    if fullpath.endswith(COMPRESSIBLE_EXTENSIONS):
+        vary = ('Accept-Encoding',)
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for coding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if coding in accepted and os.path.isfile(fullpath + suffix):
+                headers['Content-Encoding'] = coding
+                filename = fullpath + suffix
+                break
+
+    if _HASHED_RE.search(path):
+        cache_control = {'public': True, 'max_age': IMMUTABLE_MAX_AGE, 'immutable': True}
+    else:
+        cache_control = {'public': True, 'no_cache': True}
+    return serve_file(request, filename, content_type=content_type, headers=headers, vary=vary,
+                      cache_control=cache_control)
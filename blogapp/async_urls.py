@@ -0,0 +1,21 @@
+"""
+Routes de l'application sous ASGI : celles de urls.py, les pages de lecture
+étant servies par les vues asynchrones (voir async_views.py).
+"""
+from django.urls import path
+
+from . import async_views, urls
+
+
+ASYNC_VIEWS = {
+    'home': async_views.home,
+    'robotics_posts': async_views.robotics_posts,
+    'post_detail': async_views.post_detail,
+}
+
+# Même ordre que urls.py (« blog/nouveau/ » reste avant « blog/<slug>/ »)
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], pattern.default_args, name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in urls.urlpatterns
+]
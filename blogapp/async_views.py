@@ -0,0 +1,139 @@
+"""
+Vues de lecture asynchrones, servies sous ASGI (voir monblog/asgi.py).
+
+Mêmes gabarits et mêmes contextes que les vues de views.py. Les requêtes
+indépendantes d'une page sont lancées ensemble (``asyncio.gather``) avec
+l'interface asynchrone de l'ORM (``afirst``, ``acount``, ``async for``); les
+helpers encore synchrones et le rendu des gabarits, qui peut lire la base
+(cartes absentes du cache), passent par ``sync_to_async``. Un worker ASGI
+garde ainsi de nombreux clients lents sans bloquer un thread par connexion.
+
+Avec Django 5.2, l'ORM asynchrone exécute les requêtes SQL d'une même
+requête HTTP dans un seul thread : elles ne se chevauchent pas encore dans
+la base, mais la boucle d'événements reste libre pour les autres clients.
+
+Les écritures (formulaires de ``post_detail``) et les articles non publiés
+(droits de l'auteur, messages) sont confiés à la vue synchrone.
+"""
+import asyncio
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+
+from . import conditional, home_cache, page_cache, platforms, recommendations, views
+from .comments import aload_comment_tree
+from .forms import CommentForm, RatingForm
+from .models import Category, Post, PostRating, PostStatus, Project
+from .page_cache import cache_page_for_anonymous
+
+
+arender = sync_to_async(render)
+
+# Sans ses décorateurs de cache : ceux de la vue asynchrone ont déjà été appliqués
+_sync_post_detail = sync_to_async(inspect.unwrap(views.post_detail))
+
+
+async def _list(queryset):
+    return [obj async for obj in queryset]
+
+
+async def home(request):
+    """Vue d'accueil"""
+    context = dict(await home_cache.aget_snapshot())
+    return await arender(request, 'blogapp/home.html', context)
+
+
+@cache_page_for_anonymous
+async def robotics_posts(request):
+    """Page spéciale Robotique"""
+    page_cache.add_tags(request, 'post-list', 'project-list', 'platform-list')
+    platform_list, robotics_category = await asyncio.gather(
+        sync_to_async(platforms.get_platforms)(),
+        Category.objects.filter(slug='robotique').afirst(),
+    )
+    if robotics_category is None:
+        context = {
+            'category': None,
+            'all_posts': [],
+            'platforms': [],
+            'robotics_projects': [],
+            'error_message': 'Aucune catégorie Robotique trouvée'
+        }
+        return await arender(request, 'blogapp/robotics_posts.html', context)
+
+    posts = Post.objects.filter(
+        category=robotics_category,
+        status=PostStatus.PUBLISHED
+    ).select_related('author')
+    all_posts, all_posts_count, latest, robotics_projects = await asyncio.gather(
+        _list(posts[:6]),
+        posts.acount(),
+        # Requête brute (UNION ALL) : pas d'itération asynchrone
+        sync_to_async(platforms.latest_posts)(platform_list, 3),
+        _list(Project.objects.filter(project_type='robotics', rejected_at__isnull=True).order_by('-is_featured', '-created_at')[:4]),
+    )
+    context = {
+        'category': robotics_category,
+        'all_posts': all_posts,
+        'all_posts_count': all_posts_count,
+        'platforms': [(platform, latest[platform.pk]) for platform in platform_list],
+        'robotics_projects': robotics_projects,
+    }
+    return await arender(request, 'blogapp/robotics_posts.html', context)
+
+
+async def _user_rating(post, user):
+    if not user.is_authenticated:
+        return None
+    return await PostRating.objects.filter(post=post, user=user).values_list('rating', flat=True).afirst()
+
+
+@cache_page_for_anonymous(on_hit=views._count_cached_view)
+@conditional.condition(conditional.post_detail_state, on_not_modified=views._count_not_modified_view)
+async def post_detail(request, slug):
+    """Détail d'un article publié"""
+    if request.method not in ('GET', 'HEAD'):
+        return await _sync_post_detail(request, slug)
+    post = await Post.objects.select_related('author', 'category').prefetch_related('tags').filter(
+        slug=slug, status=PostStatus.PUBLISHED,
+    ).afirst()
+    if post is None:
+        # Absent, brouillon ou en attente : la vue synchrone gère droits et messages
+        return await _sync_post_detail(request, slug)
+
+    user = await request.auser()
+    # Relu par le gabarit (processeur de contexte auth) : pas de seconde lecture de la session
+    request.user = user
+    # Le tampon des vues peut se vider en base
+    await sync_to_async(post.increment_views)()
+    comments, similar_posts, previous_post, next_post, user_rating = await asyncio.gather(
+        aload_comment_tree(post),
+        sync_to_async(recommendations.similar_posts)(post),
+        post.aget_previous_post(),
+        post.aget_next_post(),
+        _user_rating(post, user),
+    )
+
+    page_cache.add_tags(
+        request,
+        'post:{}'.format(post.pk),
+        'category:{}'.format(post.category_id),
+        *['post:{}'.format(other.pk) for other in (*similar_posts, previous_post, next_post) if other]
+    )
+    page_cache.set_meta(request, post_id=post.pk)
+
+    context = {
+        'post': post,
+        'comments': comments,
+        'comments_count': comments.count if comments else 0,
+        'similar_posts': similar_posts,
+        'previous_post': previous_post,
+        'next_post': next_post,
+        'comment_form': CommentForm(),
+        'rating_form': RatingForm(),
+        'avg_rating': post.avg_rating,
+        'user_rating': user_rating,
+        'can_edit': user.is_authenticated and (user == post.author or user.is_staff or user.is_superuser),
+    }
+    return await arender(request, 'blogapp/post_detail.html', context)
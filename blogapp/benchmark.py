@@ -0,0 +1,176 @@
+"""
+Banc d'essai WSGI / ASGI en mémoire.
+
+Les mêmes requêtes de lecture (accueil, robotique, détail d'un article) sont
+envoyées au gestionnaire WSGI (``monblog.wsgi``, vues synchrones) puis au
+gestionnaire ASGI (``monblog.asgi``, vues asynchrones), sur la même base,
+sans serveur ni réseau : seul le code Django est mesuré.
+
+Dans les deux cas ``concurrency`` clients envoient leurs requêtes les unes
+après les autres; la latence part de l'envoi de la requête :
+
+- WSGI : ``threads`` threads, comme un worker gunicorn ``gthread``; un
+  client lent garde son thread jusqu'à la fin de l'envoi, les autres
+  attendent qu'un thread se libère;
+- ASGI : une seule boucle d'événements; un client lent ne fait qu'attendre
+  sur ``send``.
+
+``client_delay`` simule un client qui lit lentement la réponse (réseau
+mobile). Les mesures sont des ``loadtest.Results`` : même rapport et même
+``compare`` que le test de charge HTTP.
+"""
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from . import loadtest
+
+
+# Routes servies par les vues asynchrones (voir async_urls.py)
+READ_MIX = [
+    {'name': 'home', 'weight': 30, 'method': 'GET', 'path': '/'},
+    {'name': 'robotics_posts', 'weight': 20, 'method': 'GET', 'path': '/robotique/'},
+    {'name': 'post_detail', 'weight': 50, 'method': 'GET', 'path': '/blog/{post_slug}/'},
+]
+
+HOST = 'localhost'
+
+
+def sample_requests(count, traffic, sampler):
+    """``count`` requêtes (nom de route, chemin) tirées du mélange"""
+    return [(route['name'], sampler.fill(route['path'])) for route in (traffic.next() for _ in range(count))]
+
+
+def _environ(path):
+    path, _, query = path.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def wsgi_request(application, path, client_delay=0.0):
+    status = []
+
+    def start_response(value, headers, exc_info=None):
+        status.append(int(value.split()[0]))
+
+    body = application(_environ(path), start_response)
+    try:
+        content = b''.join(body)
+        # Le thread reste occupé tant que le client n'a pas tout lu
+        if client_delay:
+            time.sleep(client_delay)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return status[0], content
+
+
+async def asgi_request(application, path, client_delay=0.0):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', HOST.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+    sent = []
+    disconnected = asyncio.Event()
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Le client reste connecté jusqu'à la fin de la réponse
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.body' and not message.get('more_body') and client_delay:
+            await asyncio.sleep(client_delay)
+        sent.append(message)
+
+    await application(scope, receive, send)
+    status = next(message['status'] for message in sent if message['type'] == 'http.response.start')
+    content = b''.join(message.get('body', b'') for message in sent if message['type'] == 'http.response.body')
+    return status, content
+
+
+def run_wsgi(application, paths, threads=4, concurrency=50, client_delay=0.0):
+    results = loadtest.Results()
+    lock = threading.Lock()
+    workers = threading.BoundedSemaphore(threads)
+    pending = iter(paths)
+
+    def next_request():
+        with lock:
+            return next(pending, None)
+
+    def client():
+        while (item := next_request()) is not None:
+            name, path = item
+            start = time.monotonic()
+            try:
+                with workers:
+                    status, content = wsgi_request(application, path, client_delay)
+            except Exception as exc:
+                with lock:
+                    results.record(name, time.monotonic() - start, error=exc)
+                continue
+            with lock:
+                results.record(name, time.monotonic() - start, status, content)
+
+    results.started = time.monotonic()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    results.finished = time.monotonic()
+    return results
+
+
+async def run_asgi(application, paths, concurrency=50, client_delay=0.0):
+    results = loadtest.Results()
+    pending = iter(paths)
+
+    async def client():
+        for name, path in pending:
+            start = time.monotonic()
+            try:
+                status, content = await asgi_request(application, path, client_delay)
+            except Exception as exc:
+                results.record(name, time.monotonic() - start, error=exc)
+                continue
+            results.record(name, time.monotonic() - start, status, content)
+
+    results.started = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    results.finished = time.monotonic()
+    return results
@@ -0,0 +1,126 @@
+"""
+Cache des cartes d'articles et de projets.
+
+Une même carte (image, titre, extrait tronqué, étiquettes, auteur, date) est
+affichée sur l'accueil, le blog, les catégories et les pages robotique.
+Chaque carte rendue est gardée dans le cache sous une clé construite avec
+la variante, l'id et ``updated_at`` de l'objet : modifier un article change
+sa clé, et seule sa carte est recalculée. Une liste est lue en un seul
+``get_many``; les étiquettes ne sont chargées que pour les cartes absentes.
+
+Les cartes sont imbriquées dans les caches de niveau supérieur (instantané
+de l'accueil, cache de pages) : quand une page est purgée, elle est
+reconstruite à partir des cartes encore valides.
+
+Les compteurs (vues, commentaires) changent sans toucher ``updated_at`` : ils
+restent hors du cache. Le gabarit d'une carte marque leur place avec
+``{{ slot }}``; la page affiche ``card.head``, les compteurs, puis
+``card.tail``.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+KEY_PREFIX = 'blogapp:card:'
+GENERATION_KEY = 'blogapp:card-generation'
+SLOT = '<!--card-slot-->'
+
+# Variante : (gabarit, relations à précharger pour le rendu)
+VARIANTS = {
+    'post-home': ('blogapp/cards/post_home.html', ()),
+    'post-list': ('blogapp/cards/post_list.html', ('tags',)),
+    'post-category': ('blogapp/cards/post_category.html', ('tags',)),
+    'post-platform': ('blogapp/cards/post_platform.html', ()),
+    'post-robotics': ('blogapp/cards/post_robotics.html', ('tags',)),
+    'project-home': ('blogapp/cards/project_home.html', ()),
+    'project-robotics': ('blogapp/cards/project_robotics.html', ()),
+}
+
+
+class Card:
+    def __init__(self, obj, html):
+        self.object = obj
+        head, _, tail = html.partition(SLOT)
+        self.head = mark_safe(head)
+        self.tail = mark_safe(tail)
+
+    def __html__(self):
+        return self.head + self.tail
+
+    def __str__(self):
+        return self.__html__()
+
+
+def get_generation():
+    """Jeton changé quand une donnée partagée par les cartes (catégorie,
+    nom d'auteur) est modifiée : toutes les clés changent d'un coup. Un jeton
+    aléatoire plutôt qu'un compteur : si la clé est évincée, le nouveau jeton
+    ne retombe pas sur une génération dont les cartes sont encore en cache."""
+    return cache.get_or_set(GENERATION_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def bump_generation():
+    def bump():
+        cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def cache_key(variant, obj, generation):
+    stamp = obj.updated_at.timestamp() if obj.updated_at else 0
+    # Les variantes d'image sont enregistrées après coup, sans toucher
+    # updated_at : la clé suit l'image dont elles proviennent
+    variants = getattr(obj, 'image_variants', None) or {}
+    images = variants.get('digest') or variants.get('source', '')
+    return '{}{}:{}:{}:{}:{}'.format(KEY_PREFIX, variant, obj.pk, stamp, images, generation)
+
+
+def render(objects, variant):
+    """Cartes des objets dans l'ordre donné, lues du cache ou rendues"""
+    template_name, prefetch = VARIANTS[variant]
+    objects = list(objects)
+    if not objects:
+        return []
+
+    generation = get_generation()
+    keys = [cache_key(variant, obj, generation) for obj in objects]
+    cached = cache.get_many(keys)
+
+    missing = [obj for obj, key in zip(objects, keys) if key not in cached]
+    if missing:
+        if prefetch:
+            prefetch_related_objects(missing, *prefetch)
+        rendered = {}
+        for obj in missing:
+            key = cache_key(variant, obj, generation)
+            rendered[key] = render_to_string(template_name, {
+                obj._meta.model_name: obj,
+                'slot': mark_safe(SLOT),
+            })
+        cache.set_many(rendered, getattr(settings, 'CARD_CACHE_TIMEOUT', 86400))
+        cached.update(rendered)
+
+    return [Card(obj, cached[key]) for obj, key in zip(objects, keys)]
+
+
+def invalidate(obj):
+    """Oublier les cartes d'un objet modifié sans changer ``updated_at``
+    (étiquettes)"""
+    prefix = obj._meta.model_name + '-'
+
+    def delete():
+        generation = get_generation()
+        cache.delete_many([
+            cache_key(variant, obj, generation) for variant in VARIANTS if variant.startswith(prefix)
+        ])
+
+    delete()
+    # Une carte a pu être recalculée avec l'ancien état avant le commit
+    transaction.on_commit(delete)
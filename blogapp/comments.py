@@ -0,0 +1,69 @@
+"""
+Chargement des commentaires d'un article sous forme d'arbre.
+
+Tous les commentaires approuvés d'un article (et leurs auteurs) sont lus en
+une seule requête; l'arbre parent/réponses est reconstruit en Python, quelle
+que soit la profondeur d'imbrication (``aload_comment_tree`` : même lecture
+pour les vues asynchrones).
+"""
+from .models import Comment
+
+
+class CommentTree:
+    """Commentaires de premier niveau, chacun portant ``children`` et ``depth``"""
+
+    def __init__(self, roots, count):
+        self.roots = roots
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.roots)
+
+    def __len__(self):
+        return len(self.roots)
+
+    def __bool__(self):
+        return bool(self.roots)
+
+
+def _comments(post):
+    return (
+        Comment.objects.filter(post=post, is_approved=True)
+        .select_related('author')
+        .order_by('created_at', 'id')
+    )
+
+
+def load_comment_tree(post):
+    return build_tree(list(_comments(post)))
+
+
+async def aload_comment_tree(post):
+    return build_tree([comment async for comment in _comments(post)])
+
+
+def build_tree(comments):
+    by_id = {}
+    for comment in comments:
+        comment.children = []
+        by_id[comment.pk] = comment
+
+    roots = []
+    for comment in comments:
+        if comment.parent_id is None:
+            roots.append(comment)
+        else:
+            parent = by_id.get(comment.parent_id)
+            # Une réponse à un commentaire non approuvé n'est pas affichée
+            if parent is not None:
+                parent.children.append(comment)
+
+    # Parcours en profondeur pour fixer les niveaux et compter les visibles
+    count = 0
+    stack = [(comment, 0) for comment in reversed(roots)]
+    while stack:
+        comment, depth = stack.pop()
+        comment.depth = depth
+        count += 1
+        stack.extend((child, depth + 1) for child in reversed(comment.children))
+    return CommentTree(roots, count)
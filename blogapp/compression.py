@@ -0,0 +1,173 @@
+"""
+Compression des réponses (brotli ou gzip) et minification du HTML.
+
+``CompressionMiddleware`` choisit le codage d'après ``Accept-Encoding``
+(brotli si le paquet ``brotli`` est installé, sinon gzip) :
+
+- les pages HTML sont d'abord débarrassées de l'indentation des gabarits;
+  le contenu de ``<pre>``, ``<code>``, ``<textarea>``, ``<script>`` et
+  ``<style>`` n'est pas touché;
+- les réponses en flux (``StreamingHttpResponse``) sont compressées bloc
+  par bloc, chaque bloc étant vidé vers le client aussitôt (pas de
+  minification : une balise peut être coupée entre deux blocs);
+- les fichiers (``FileResponse``), les plages (206) et les réponses déjà
+  codées (variantes ``.gz``/``.br`` des fichiers statiques) passent tels
+  quels.
+
+Le cache de pages stocke la page minifiée et ses variantes compressées au
+niveau maximal (``encode_variants``) : un succès de cache renvoie la variante
+acceptée sans recompresser (voir page_cache.py).
+"""
+import re
+import zlib
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .assets import accepted_encodings, brotli, compress
+
+
+# En dessous, l'en-tête du format coûte plus qu'il ne rapporte
+MIN_SIZE = 200
+# Niveaux pour une compression à chaque requête (les pages en cache et les
+# fichiers statiques utilisent le niveau maximal, une seule fois)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml', 'application/rss+xml',
+    'application/atom+xml', 'image/svg+xml',
+)
+# Codage HTTP -> suffixe de ``assets.compress``
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+_PROTECTED_RE = re.compile(rb'(<(pre|code|textarea|script|style)\b.*?</\2\s*>)', re.I | re.S)
+_INDENT_RE = re.compile(rb'[ \t\r\f\v]*\n\s*')
+_BLANKS_RE = re.compile(rb'[ \t\r\f\v]{2,}')
+
+
+def minify_html(content):
+    """Réduire chaque suite de blancs à un seul (retour à la ligne conservé),
+    hors des blocs où les blancs comptent"""
+    parts = _PROTECTED_RE.split(content)
+    out = []
+    # split() renvoie texte, bloc protégé, nom de balise, texte...
+    for i in range(0, len(parts), 3):
+        out.append(_BLANKS_RE.sub(b' ', _INDENT_RE.sub(b'\n', parts[i])))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return b''.join(out)
+
+
+def negotiate(request):
+    """Codage à utiliser pour la réponse, ``None`` sans compression"""
+    if not getattr(settings, 'COMPRESSION_ENABLED', True):
+        return None
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def is_compressible(response):
+    if response.status_code != 200 or response.has_header('Content-Encoding'):
+        return False
+    if isinstance(response, FileResponse):
+        return False
+    content_type = response.get('Content-Type', '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def minify_response(response):
+    """Minifier une page HTML entière, une seule fois"""
+    if getattr(response, '_html_minified', False) or response.streaming:
+        return
+    if not getattr(settings, 'HTML_MINIFY', True):
+        return
+    if not response.get('Content-Type', '').lower().startswith('text/html'):
+        return
+    response.content = minify_html(response.content)
+    if response.has_header('Content-Length'):
+        # Posé par CommonMiddleware avant la minification
+        response['Content-Length'] = str(len(response.content))
+    response._html_minified = True
+
+
+def encode_variants(content):
+    """Variantes compressées d'une page mise en cache : {'br': ..., 'gzip': ...}"""
+    if len(content) < MIN_SIZE:
+        return {}
+    variants = compress(content)
+    return {coding: variants[suffix] for coding, suffix in SUFFIXES.items() if suffix in variants}
+
+
+def set_encoding(response, coding):
+    response['Content-Encoding'] = coding
+    # Même page, octets différents : l'ETag forte devient faible
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+
+
+def _compressor(coding):
+    if coding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def compress_body(content, coding):
+    process, _, finish = _compressor(coding)
+    return process(content) + finish()
+
+
+def compress_stream(chunks, coding):
+    process, flush, finish = _compressor(coding)
+    for chunk in chunks:
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_stream(chunks, coding):
+    process, flush, finish = _compressor(coding)
+    async for chunk in chunks:
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if not is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        minify_response(response)
+
+        coding = negotiate(request)
+        if coding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(response.streaming_content, coding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, coding)
+            del response['Content-Length']
+        else:
+            if len(response.content) < MIN_SIZE:
+                return response
+            body = compress_body(response.content, coding)
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response['Content-Length'] = str(len(body))
+        set_encoding(response, coding)
+        return response
@@ -0,0 +1,156 @@
+"""
+Requêtes conditionnelles (``ETag`` / ``Last-Modified``) pour les pages
+publiques.
+
+Avant d'exécuter la vue, un validateur lit en une requête indexée l'état
+dont dépend la page (``updated_at`` le plus récent, compteurs de
+commentaires et de notes...). Si le navigateur ou le robot possède déjà
+cette version, la réponse est un ``304 Not Modified`` : ni la vue ni le
+gabarit ne sont exécutés.
+
+L'ETag (faible : le jeton CSRF change d'un rendu à l'autre) contient aussi
+l'utilisateur, la page n'étant pas la même connecté ou non, et l'empreinte
+du manifeste des fichiers statiques, qui change à chaque déploiement des
+styles. ``Last-Modified`` ne suit que ``updated_at`` : un client qui
+n'envoie que ``If-Modified-Since`` ne voit un nouveau commentaire qu'à la
+modification suivante de l'article. La liste des articles ajoute à son ETag
+la version de l'étiquette de cache ``post-list``, avancée par les signaux
+(étiquettes, catégories, commentaires). Les vues n'y figurent pas : le
+compteur affiché sur la liste peut avoir un vidage de retard.
+
+Placé sous ``cache_page_for_anonymous`` : une page servie depuis le cache
+garde son ETag et répond elle aussi 304 (voir page_cache.py).
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db.models import Count, Max, Value
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(request, parts):
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    raw = '|'.join(str(part) for part in (*parts, user, getattr(staticfiles_storage, 'manifest_hash', '')))
+    return 'W/"{}"'.format(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_vary_headers(response, ['Cookie'])
+
+
+def _precondition(request, validator, on_not_modified, args, kwargs):
+    """``(réponse 304/412, None)`` si la vue n'a pas à être exécutée, sinon
+    ``(None, validateurs à poser sur sa réponse)``"""
+    # Messages en attente : ils ne s'afficheraient pas
+    if request.method not in ('GET', 'HEAD') or 'messages' in request.COOKIES:
+        return None, None
+    state = validator(request, *args, **kwargs)
+    if state is None:
+        return None, None
+
+    parts, last_modified = state
+    etag = make_etag(request, parts)
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    headers = HttpResponse()
+    _set_validators(headers, etag, last_modified)
+    conditional = get_conditional_response(request, etag=etag, last_modified=timestamp, response=headers)
+    if conditional is not headers:
+        if on_not_modified is not None and conditional.status_code == 304:
+            on_not_modified(request, parts)
+        return conditional, None
+    return None, (etag, last_modified)
+
+
+def _finish(response, validators):
+    if validators is not None and response.status_code == 200 and not response.streaming:
+        _set_validators(response, *validators)
+    return response
+
+
+def condition(validator, on_not_modified=None):
+    """Décorateur de vue (synchrone ou asynchrone). ``validator(request,
+    *args, **kwargs)`` renvoie ``(parts, last_modified)`` ou ``None`` (objet
+    absent, non publié : la vue décide). ``on_not_modified(request, parts)``
+    est appelé pour chaque 304."""
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                response, validators = await sync_to_async(_precondition)(
+                    request, validator, on_not_modified, args, kwargs)
+                if response is not None:
+                    return response
+                return _finish(await view_func(request, *args, **kwargs), validators)
+
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response, validators = _precondition(request, validator, on_not_modified, args, kwargs)
+            if response is not None:
+                return response
+            return _finish(view_func(request, *args, **kwargs), validators)
+
+        return wrapper
+
+    return decorator
+
+
+# Validateurs des vues (requêtes vérifiées par query_plans.py)
+
+def newest(queryset):
+    """``updated_at`` le plus récent et nombre de lignes, lus dans un index
+    couvrant; le nombre signale aussi les suppressions"""
+    return queryset.order_by().values(one=Value(1)).annotate(latest=Max('updated_at'), total=Count('pk'))
+
+
+def post_detail_row(slug):
+    from .models import Post, PostStatus
+
+    return Post.objects.filter(slug=slug, status=PostStatus.PUBLISHED).values_list(
+        'pk', 'updated_at', 'comment_count', 'rating_count', 'rating_sum', 'like_count',
+    )
+
+
+def post_detail_state(request, slug):
+    row = post_detail_row(slug).first()
+    if row is None:
+        return None
+    return row, row[1]
+
+
+def post_list_state(request):
+    from . import page_cache
+    from .models import Post, PostStatus
+
+    state = newest(Post.objects.filter(status=PostStatus.PUBLISHED)).get()
+    # Étiquettes, catégories, nuage d'étiquettes et nombre de commentaires ne
+    # changent pas ``updated_at`` : leur version est celle de l'étiquette de
+    # cache ``post-list``, avancée par les signaux à chacune de ces modifications
+    version = page_cache.tag_versions(['post-list'])['post-list']
+    return (state['latest'], state['total'], version), state['latest']
+
+
+def projects_state(request):
+    from .models import Project
+
+    # Les projets listés : tous sauf les refusés (index partiel)
+    state = newest(Project.objects.filter(rejected_at__isnull=True)).get()
+    return (state['latest'], state['total']), state['latest']
+
+
+def project_detail_state(request, slug):
+    from .models import Project
+
+    row = Project.objects.filter(slug=slug).values_list('pk', 'updated_at').first()
+    if row is None:
+        return None
+    return row, row[1]
@@ -0,0 +1,73 @@
+"""
+Compteurs d'engagement dénormalisés sur ``Post``.
+
+``rating_sum``/``rating_count`` donnent la note moyenne, ``like_count`` le
+nombre de « j'aime » (notes marquées ``is_like``, voir ``toggle_like``) et
+``comment_count`` le nombre de commentaires approuvés. Ils sont modifiés par
+incréments relatifs (``F()``) depuis les signaux; ``reconcile()`` les
+recalcule entièrement. Ces colonnes ne sont jamais écrites par un
+``Post.save()`` complet (voir ``COUNTER_FIELDS``).
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+# Note enregistrée par le bouton « j'aime » quand l'utilisateur n'a pas
+# encore noté l'article
+LIKE_RATING = 5
+
+# Colonnes tenues par incréments : un instance chargée plus tôt en contient
+# des valeurs périmées
+COUNTER_FIELDS = frozenset(('views_count', 'rating_sum', 'rating_count', 'like_count', 'comment_count'))
+
+
+def _apply(post_id, **deltas):
+    from .models import Post
+
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if changes:
+        Post.objects.filter(pk=post_id).update(**changes)
+
+
+def rating_changed(post_id, old_rating, new_rating, was_like=False, is_like=False):
+    """Répercuter la création (old=None), modification ou suppression (new=None) d'une note"""
+    old_rating = old_rating or 0
+    new_rating = new_rating or 0
+    _apply(
+        post_id,
+        rating_sum=new_rating - old_rating,
+        rating_count=bool(new_rating) - bool(old_rating),
+        like_count=bool(is_like) - bool(was_like),
+    )
+
+
+def comment_changed(post_id, was_approved, is_approved):
+    _apply(post_id, comment_count=bool(is_approved) - bool(was_approved))
+
+
+def _subquery_total(model, aggregate, **filters):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(post=OuterRef('pk'), **filters)
+            .order_by()
+            .values('post')
+            .annotate(total=aggregate)
+            .values('total')[:1],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def reconcile(queryset=None):
+    """Recalculer tous les compteurs en une requête UPDATE; retourne le nombre d'articles"""
+    from .models import Comment, Post, PostRating
+
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.update(
+        rating_sum=_subquery_total(PostRating, Sum('rating')),
+        rating_count=_subquery_total(PostRating, Count('pk')),
+        like_count=_subquery_total(PostRating, Count('pk', filter=Q(is_like=True))),
+        comment_count=_subquery_total(Comment, Count('pk'), is_approved=True),
+    )
@@ -0,0 +1,307 @@
+"""
+Génération d'un jeu de données synthétique pour les mesures de performance.
+
+Tout passe par ``bulk_create`` par lots : ni ``Post.save()`` (temps de
+lecture, variantes d'images) ni les signaux ne sont appelés pendant la
+génération. Les données dérivées (compteurs, index de recherche, caches)
+sont recalculées une seule fois à la fin. Le résultat ne dépend que de la
+graine : deux générations avec la même graine produisent les mêmes contenus.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from taggit.models import Tag, TaggedItem
+
+from . import counters, home_cache, page_cache, platforms, recommendations, search_index, tag_stats
+from .models import Category, Comment, DifficultyLevel, Post, PostRating, PostStatus, Project
+
+
+WORDS = (
+    'capteur moteur servomoteur carte microcontrôleur programme signal tension '
+    'courant résistance broche entrée sortie boucle fonction variable bibliothèque '
+    'module réseau wifi bluetooth protocole données mesure température humidité '
+    'distance lumière écran afficheur bouton interruption mémoire registre horloge '
+    'alimentation batterie circuit soudure prototype boîtier robot roue châssis '
+    'contrôleur algorithme calibration filtre régulateur serveur requête réponse '
+    'interface navigateur base projet tutoriel étape montage schéma code test'
+).split()
+
+TAGS = (
+    ['arduino', 'esp32', 'raspberry-pi', 'python', 'cpp', 'micropython', 'django',
+     'javascript', 'iot', 'capteurs', 'moteurs', 'impression-3d', 'electronique',
+     'domotique', 'robotique', 'linux', 'api', 'bluetooth', 'wifi', 'debutant']
+    + ['sujet-{}'.format(i) for i in range(180)]
+)
+
+CATEGORY_NAMES = (
+    'Robotique', 'Électronique', 'Développement Web', 'IoT', 'Intelligence Artificielle',
+    'Systèmes embarqués', 'Impression 3D', 'Domotique', 'Python', 'Linux',
+)
+
+# Part des commentaires qui répondent à un autre commentaire
+REPLY_RATIO = 0.4
+# Nombre d'articles générés ensemble (commentaires et notes compris)
+POST_CHUNK = 1000
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Permettre de fixer ``created_at``/``updated_at`` malgré auto_now(_add)"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Generator:
+    def __init__(self, seed=0, prefix='gen', batch_size=2000, log=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.now = timezone.now().replace(microsecond=0)
+
+    # Texte
+
+    def sentence(self, low=6, high=16):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def paragraph(self, sentences=4):
+        return ' '.join(self.sentence() for _ in range(sentences))
+
+    def rich_text(self):
+        parts = []
+        for section in range(self.rng.randint(3, 6)):
+            parts.append('<h2>{}</h2>'.format(self.sentence(2, 5).rstrip('.')))
+            for _ in range(self.rng.randint(2, 4)):
+                parts.append('<p>{}</p>'.format(self.paragraph(self.rng.randint(3, 6))))
+            kind = self.rng.random()
+            if kind < 0.3:
+                items = ''.join('<li>{}</li>'.format(self.sentence(3, 8)) for _ in range(4))
+                parts.append('<ul>{}</ul>'.format(items))
+            elif kind < 0.5:
+                parts.append('<pre><code>void loop() {{\n  digitalWrite({}, HIGH);\n  delay({});\n}}</code></pre>'.format(
+                    self.rng.randint(2, 13), self.rng.choice((100, 250, 500, 1000))))
+        return '\n'.join(parts)
+
+    def spread_dates(self, count, days):
+        """``count`` dates croissantes réparties sur les ``days`` derniers jours"""
+        start = self.now - timedelta(days=days)
+        step = timedelta(days=days) / max(count, 1)
+        return [start + step * i for i in range(count)]
+
+    def stage(self, name):
+        """Une suite aléatoire par étape : le contenu des articles ne dépend
+        pas de ce qui existait déjà en base"""
+        self.rng = random.Random('{}:{}'.format(self.seed, name))
+
+    # Objets
+
+    def users(self, count):
+        self.stage('users')
+        if User.objects.filter(username__startswith=self.prefix + '-').exists():
+            raise ValueError('Des utilisateurs « {}-* » existent déjà'.format(self.prefix))
+        # Un seul hachage : le mot de passe est le même pour tous
+        password = make_password('password')
+        User.objects.bulk_create(
+            (User(username='{}-{}'.format(self.prefix, i), email='{}-{}@example.com'.format(self.prefix, i),
+                  password=password, first_name=self.rng.choice(WORDS).capitalize())
+             for i in range(count)),
+            batch_size=self.batch_size,
+        )
+        return list(User.objects.filter(username__startswith=self.prefix + '-').values_list('pk', flat=True))
+
+    def categories(self, count):
+        self.stage('categories')
+        names = [
+            CATEGORY_NAMES[i] if i < len(CATEGORY_NAMES) else '{} {}'.format(self.prefix, i)
+            for i in range(count)
+        ]
+        existing = set(Category.objects.filter(name__in=names).values_list('name', flat=True))
+        Category.objects.bulk_create(
+            Category(name=name, slug=slugify(name), description=self.sentence())
+            for name in names if name not in existing
+        )
+        return list(Category.objects.filter(name__in=names).values_list('pk', flat=True))
+
+    def tags(self):
+        # Les tags existants sont réutilisés (comparaison par slug, comme taggit)
+        slugs = {slugify(name): name for name in TAGS}
+        existing = set(Tag.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+        Tag.objects.bulk_create(Tag(name=name, slug=slug) for slug, name in slugs.items() if slug not in existing)
+        return list(Tag.objects.filter(slug__in=slugs).values_list('pk', flat=True))
+
+    def posts(self, count, comments, ratings, user_ids, category_ids, tag_ids):
+        self.stage('posts')
+        content_type = ContentType.objects.get_for_model(Post)
+        dates = self.spread_dates(count, days=3 * 365)
+        statuses = [PostStatus.PUBLISHED] * 8 + [PostStatus.DRAFT, PostStatus.PENDING]
+        totals = {'posts': 0, 'comments': 0, 'ratings': 0}
+
+        for start in range(0, count, POST_CHUNK):
+            size = min(POST_CHUNK, count - start)
+            posts = []
+            for i in range(start, start + size):
+                title = self.sentence(3, 8).rstrip('.')
+                content = self.rich_text()
+                posts.append(Post(
+                    title=title[:200],
+                    slug='{}-{}-{}'.format(self.prefix, i, slugify(title))[:200],
+                    author_id=self.rng.choice(user_ids),
+                    category_id=self.rng.choice(category_ids),
+                    excerpt=self.sentence(12, 30)[:300],
+                    content=content,
+                    difficulty_level=self.rng.choice(DifficultyLevel.values),
+                    status=self.rng.choice(statuses),
+                    reading_time=max(1, len(content.split()) // 200),
+                    created_at=dates[i],
+                    updated_at=dates[i],
+                    published_at=dates[i],
+                ))
+            with transaction.atomic():
+                posts = Post.objects.bulk_create(posts, batch_size=self.batch_size)
+                TaggedItem.objects.bulk_create(
+                    (TaggedItem(content_type=content_type, object_id=post.pk, tag_id=tag_id)
+                     for post in posts
+                     for tag_id in self.rng.sample(tag_ids, self.rng.randint(2, 5))),
+                    batch_size=self.batch_size,
+                )
+                # Commentaires et notes au prorata du lot
+                totals['comments'] += self.comments(posts, comments * size // count, user_ids)
+                totals['ratings'] += self.ratings(posts, ratings * size // count, user_ids)
+            totals['posts'] += size
+            self.log('{} / {} articles'.format(totals['posts'], count))
+        return totals
+
+    def comments(self, posts, count, user_ids):
+        if not count:
+            return 0
+        post_dates = {post.pk: post.created_at for post in posts}
+        post_ids = list(post_dates)
+        roots_count = count - int(count * REPLY_RATIO)
+        roots = Comment.objects.bulk_create(
+            (self._comment(post_id, post_dates[post_id], user_ids)
+             for post_id in self.rng.choices(post_ids, k=roots_count)),
+            batch_size=self.batch_size,
+        )
+        # Réponses en deux vagues : aux commentaires, puis aux réponses
+        parents = roots
+        remaining = count - roots_count
+        for wave in (remaining - remaining // 3, remaining // 3):
+            if not wave or not parents:
+                continue
+            parents = Comment.objects.bulk_create(
+                (self._comment(parent.post_id, parent.created_at, user_ids, parent)
+                 for parent in self.rng.choices(parents, k=wave)),
+                batch_size=self.batch_size,
+            )
+        return count
+
+    def _comment(self, post_id, after, user_ids, parent=None):
+        created_at = min(after + timedelta(minutes=self.rng.randint(1, 60 * 24 * 30)), self.now)
+        return Comment(
+            post_id=post_id,
+            parent=parent,
+            author_id=self.rng.choice(user_ids),
+            content=self.paragraph(self.rng.randint(1, 3)),
+            is_approved=self.rng.random() < 0.95,
+            created_at=created_at,
+        )
+
+    def ratings(self, posts, count, user_ids):
+        if not count:
+            return 0
+        per_post = min(len(user_ids), max(1, count // len(posts)))
+        ratings = []
+        for post in posts:
+            for user_id in self.rng.sample(user_ids, per_post):
+                ratings.append(PostRating(
+                    post_id=post.pk, user_id=user_id,
+                    rating=self.rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 3, 5, 6))[0],
+                    created_at=post.created_at,
+                ))
+        PostRating.objects.bulk_create(ratings, batch_size=self.batch_size)
+        return len(ratings)
+
+    def projects(self, count, user_ids):
+        self.stage('projects')
+        types = [code for code, _ in Project.PROJECT_TYPES]
+        statuses = [code for code, _ in Project.STATUS_CHOICES]
+        technologies = ('Python', 'C++', 'Django', 'MicroPython', 'JavaScript', 'ESP-IDF', 'ROS', 'OpenCV')
+        dates = self.spread_dates(count, days=3 * 365)
+        Project.objects.bulk_create(
+            (Project(
+                title=self.sentence(2, 5).rstrip('.')[:200],
+                slug='{}-projet-{}'.format(self.prefix, i),
+                description=self.paragraph(self.rng.randint(3, 8)),
+                project_type=self.rng.choice(types),
+                status=self.rng.choice(statuses),
+                technologies=', '.join(self.rng.sample(technologies, 3)),
+                start_date=dates[i].date(),
+                is_featured=self.rng.random() < 0.1,
+                is_approved=self.rng.random() < 0.9,
+                submitted_by_id=self.rng.choice(user_ids),
+                created_at=dates[i],
+                updated_at=dates[i],
+            ) for i in range(count)),
+            batch_size=self.batch_size,
+        )
+        return count
+
+
+def generate(users=100, categories=10, posts=1000, comments=10000, ratings=5000,
+             projects=100, seed=0, prefix='gen', batch_size=2000, rebuild=True, log=None):
+    """Générer le jeu de données; retourne le nombre d'objets créés par type"""
+    generator = Generator(seed=seed, prefix=prefix, batch_size=batch_size, log=log)
+    with explicit_dates(Post, Comment, PostRating, Project):
+        with transaction.atomic():
+            user_ids = generator.users(users)
+            category_ids = generator.categories(categories)
+            tag_ids = generator.tags()
+        generator.log('{} utilisateurs, {} catégories'.format(len(user_ids), len(category_ids)))
+        totals = generator.posts(posts, comments, ratings, user_ids, category_ids, tag_ids)
+        with transaction.atomic():
+            totals['projects'] = generator.projects(projects, user_ids)
+    totals['users'] = len(user_ids)
+
+    if rebuild:
+        rebuild_derived_data(log=generator.log)
+    return totals
+
+
+def rebuild_derived_data(log=None):
+    """Recalculer ce que les signaux maintiennent d'habitude"""
+    log = log or (lambda message: None)
+    with transaction.atomic():
+        counters.reconcile()
+    log('Compteurs recalculés')
+    if search_index.is_available():
+        with transaction.atomic():
+            search_index.rebuild()
+        log('Index de recherche reconstruit')
+    with transaction.atomic():
+        platforms.rebuild()
+        tag_stats.rebuild()
+    log('Plateformes et statistiques d\'étiquettes recalculées')
+    recommendations.build_all()
+    log('Recommandations recalculées')
+    home_cache.invalidate()
+    page_cache.purge('post-list', 'project-list', *(
+        'category:{}'.format(pk) for pk in Category.objects.values_list('pk', flat=True)
+    ))
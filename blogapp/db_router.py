@@ -0,0 +1,79 @@
+"""
+Routage des requêtes SQL : lectures sur les connexions en lecture seule
+(``DATABASE_READ_REPLICAS``), écritures sur la base principale.
+
+En SQLite, une réplique est la même base ouverte en URI ``mode=ro`` : en
+WAL, ses longues lectures (listes, recherche, comptages) ne prennent pas le
+verrou d'écriture et le nombre de connexions de lecture grandit sans toucher
+à celle des écritures. Une vraie réplique (autre serveur) se déclare de la
+même façon.
+
+Les lectures restent sur la base principale :
+
+- dans un bloc ``transaction.atomic()`` de la base principale, pour lire
+  l'état que la transaction s'apprête à modifier;
+- pendant le reste d'une requête qui a écrit;
+- pendant ``DATABASE_PIN_SECONDS`` après une requête POST qui a écrit
+  (cookie posé par ``PrimaryPinningMiddleware``) : la page vers laquelle
+  elle redirige, par exemple ``post_detail`` après ``create_post``, lit ses
+  propres écritures même si la réplique est en retard.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+
+
+PIN_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_pinned = contextvars.ContextVar('blogapp_db_pinned', default=False)
+_wrote = contextvars.ContextVar('blogapp_db_wrote', default=False)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_READ_REPLICAS', [])
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Même base (ou copie du serveur principal) : rien à migrer
+        if db in replicas():
+            return False
+        return None
+
+
+class PrimaryPinningMiddleware(MiddlewareMixin):
+    """À placer avant ``SessionMiddleware`` : l'enregistrement de la session
+    compte parmi les écritures de la requête."""
+
+    def process_request(self, request):
+        _pinned.set(PIN_COOKIE in request.COOKIES)
+        _wrote.set(False)
+
+    def process_response(self, request, response):
+        if _wrote.get() and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'DATABASE_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,166 @@
+"""
+Envoi de fichiers du disque : médias téléversés et fichiers statiques.
+
+``serve_file`` répond aux requêtes conditionnelles (``ETag`` et
+``Last-Modified`` → 304) et aux plages d'octets (``Range`` → 206, une seule
+plage; ``If-Range`` respecté). Le fichier n'est jamais chargé en mémoire :
+
+- fichier entier : ``FileResponse``, que le serveur WSGI envoie par
+  ``sendfile`` quand il fournit ``wsgi.file_wrapper`` (gunicorn, uWSGI...);
+- plage : lecture par blocs de la seule portion demandée;
+- ``SENDFILE_BACKEND`` : l'envoi est confié au serveur web (``X-Sendfile``
+  pour Apache/lighttpd, ``X-Accel-Redirect`` pour nginx, qui gère alors
+  lui-même les plages).
+
+``serve_media`` sert ``MEDIA_ROOT`` (``MEDIA_SERVE``). Les variantes
+d'images, dont le nom contient l'empreinte du contenu, sont mises en cache
+un an; les autres fichiers ``MEDIA_CACHE_MAX_AGE`` secondes.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+
+BLOCK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Variantes d'images : ``posts/variants/12/card-0123456789.webp``
+_HASHED_MEDIA_RE = re.compile(r'-[0-9a-f]{10}\.[^./]+$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def file_etag(statobj):
+    return '"{:x}-{:x}"'.format(statobj.st_mtime_ns, statobj.st_size)
+
+
+def parse_range(header, size):
+    """Plage ``(début, fin incluse)`` demandée, ``None`` pour le fichier
+    entier (en-tête absent, invalide ou à plusieurs plages)"""
+    match = _RANGE_RE.match(header.strip())
+    if match is None or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            raise RangeNotSatisfiable
+    else:
+        # Suffixe : les N derniers octets
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        start, end = max(size - length, 0), size - 1
+    return start, end
+
+
+def _range_applies(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Comparaison forte : une ETag faible n'autorise pas de plage
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, fullpath, content_type=None, headers=None, vary=(), cache_control=None,
+               offload_uri=None):
+    """Réponse pour un fichier existant; ``offload_uri`` : adresse interne
+    pour ``X-Accel-Redirect``"""
+    statobj = os.stat(fullpath)
+    etag = file_etag(statobj)
+    last_modified = int(statobj.st_mtime)
+    if content_type is None:
+        content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+
+    # En-têtes communs à toutes les réponses (y compris 304)
+    response = HttpResponse(content_type=content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    for name, value in (headers or {}).items():
+        response[name] = value
+    if vary:
+        patch_vary_headers(response, vary)
+    if cache_control:
+        patch_cache_control(response, **cache_control)
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified, response=response)
+    if conditional is not response:
+        return conditional
+
+    backend = getattr(settings, 'SENDFILE_BACKEND', None)
+    if backend == 'x-sendfile':
+        response['X-Sendfile'] = fullpath
+        return response
+    if backend == 'x-accel-redirect' and offload_uri:
+        response['X-Accel-Redirect'] = quote(offload_uri)
+        return response
+
+    size = statobj.st_size
+    byte_range = None
+    if request.method in ('GET', 'HEAD') and 'HTTP_RANGE' in request.META:
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except RangeNotSatisfiable:
+            unsatisfiable = HttpResponse(status=416)
+            unsatisfiable['Content-Range'] = 'bytes */{}'.format(size)
+            return unsatisfiable
+        if byte_range and not _range_applies(request, etag, last_modified):
+            byte_range = None
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        streamed = StreamingHttpResponse(_read_range(fullpath, start, length), status=206,
+                                         content_type=content_type)
+        streamed['Content-Length'] = str(length)
+        streamed['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+    else:
+        streamed = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+        streamed.block_size = BLOCK_SIZE
+        # Affiché tel quel (le nom sur disque peut être une variante .gz)
+        del streamed['Content-Disposition']
+    for name, value in response.items():
+        streamed[name] = value
+    streamed['Accept-Ranges'] = 'bytes'
+    return streamed
+
+
+def serve_media(request, path):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    if _HASHED_MEDIA_RE.search(path):
+        cache_control = {'public': True, 'max_age': IMMUTABLE_MAX_AGE, 'immutable': True}
+    else:
+        cache_control = {'public': True, 'max_age': getattr(settings, 'MEDIA_CACHE_MAX_AGE', 86400)}
+    offload_uri = getattr(settings, 'SENDFILE_ACCEL_PREFIX', '/_sendfile/') + 'media/' + path
+    return serve_file(request, fullpath, cache_control=cache_control, offload_uri=offload_uri)
@@ -0,0 +1,101 @@
+"""
+Instantané de la page d'accueil.
+
+Les articles récents, projets mis en avant, catégories et statistiques sont
+calculés une fois puis gardés dans le cache; la page d'accueil est ensuite
+servie sans aucune requête SQL. L'instantané est invalidé par les signaux
+dès qu'un article, un projet ou une catégorie change.
+
+``aget_snapshot`` sert la vue d'accueil asynchrone (voir async_views.py).
+"""
+import asyncio
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+
+CACHE_KEY = 'blogapp:home:snapshot'
+
+
+def _querysets():
+    from .models import Category, Post, PostStatus, Project
+
+    published = Post.objects.filter(status=PostStatus.PUBLISHED)
+    return {
+        'recent_posts': (
+            published.select_related('author', 'category')
+            # Le contenu complet n'est pas affiché sur l'accueil
+            .defer('content')[:6]
+        ),
+        # Tous mis en avant : inutile de trier sur is_featured (index partiel)
+        'featured_projects': Project.objects.filter(is_featured=True, rejected_at__isnull=True).order_by('-created_at')[:3],
+        'categories': Category.objects.annotate(
+            post_count=Count('posts', filter=Q(posts__status=PostStatus.PUBLISHED))
+        ).filter(post_count__gt=0),
+        'total_posts': published,
+        'total_projects': Project.objects.filter(rejected_at__isnull=True),
+    }
+
+
+def _snapshot(recent_posts, featured_projects, categories, total_posts, total_projects):
+    return {
+        'recent_posts': recent_posts,
+        'featured_projects': featured_projects,
+        'categories': categories[:6],
+        'stats': {
+            'total_posts': total_posts,
+            'total_projects': total_projects,
+            'total_categories': len(categories),
+        },
+    }
+
+
+def build_snapshot():
+    querysets = _querysets()
+    return _snapshot(
+        list(querysets['recent_posts']),
+        list(querysets['featured_projects']),
+        list(querysets['categories']),
+        querysets['total_posts'].count(),
+        querysets['total_projects'].count(),
+    )
+
+
+async def abuild_snapshot():
+    """Comme ``build_snapshot``, les requêtes lancées ensemble"""
+    querysets = _querysets()
+    return _snapshot(*await asyncio.gather(
+        _alist(querysets['recent_posts']),
+        _alist(querysets['featured_projects']),
+        _alist(querysets['categories']),
+        querysets['total_posts'].acount(),
+        querysets['total_projects'].acount(),
+    ))
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+def get_snapshot():
+    snapshot = cache.get(CACHE_KEY)
+    if snapshot is None:
+        snapshot = build_snapshot()
+        cache.set(CACHE_KEY, snapshot, getattr(settings, 'HOME_CACHE_TIMEOUT', 3600))
+    return snapshot
+
+
+async def aget_snapshot():
+    snapshot = await cache.aget(CACHE_KEY)
+    if snapshot is None:
+        snapshot = await abuild_snapshot()
+        await cache.aset(CACHE_KEY, snapshot, getattr(settings, 'HOME_CACHE_TIMEOUT', 3600))
+    return snapshot
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+    # Une requête concurrente a pu reconstruire l'instantané avant le commit
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
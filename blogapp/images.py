@@ -0,0 +1,140 @@
+"""
+Déclinaisons des images mises en avant des articles.
+
+Les variantes (carte, détail, Open Graph) sont générées une seule fois, quand
+``featured_image`` change, dans un pool de threads hors du cycle de la
+requête. Chaque variante existe en JPEG et en WebP; leurs chemins et
+dimensions sont enregistrés dans ``Post.image_variants``.
+"""
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+# nom -> (largeur, hauteur, recadrer)
+VARIANTS = {
+    'card': (400, 250, True),
+    'detail': (800, 600, False),
+    'og': (1200, 630, True),
+}
+
+VARIANTS_DIR = 'posts/variants'
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+            thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+def schedule_variants(post):
+    """Planifier la génération des variantes après la validation de la transaction"""
+    post_id = post.pk
+    source = post.featured_image.name if post.featured_image else ''
+
+    def run():
+        if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+            _get_executor().submit(_run_in_worker, post_id, source)
+        else:
+            build_variants(post_id, source)
+
+    transaction.on_commit(run)
+
+
+def _run_in_worker(post_id, source):
+    try:
+        build_variants(post_id, source)
+    except Exception:
+        logger.exception("Échec de la génération des variantes pour l'article %s", post_id)
+    finally:
+        connection.close()
+
+
+def build_variants(post_id, source):
+    """Générer les variantes d'une image source et les enregistrer sur l'article"""
+    from .models import Post
+
+    if not source:
+        delete_variants(post_id)
+        Post.objects.filter(pk=post_id).update(image_variants={})
+        return {}
+
+    with default_storage.open(source, 'rb') as fh:
+        data = fh.read()
+    original = Image.open(BytesIO(data))
+    original.load()
+    original = ImageOps.exif_transpose(original).convert('RGB')
+
+    delete_variants(post_id)
+    # Empreinte du contenu : une image remplacée sous le même nom change
+    # d'URL (les variantes sont servies comme immuables, voir file_serving.py)
+    digest = hashlib.sha1(data).hexdigest()[:10]
+    variants = {'source': source, 'digest': digest}
+    for name, (width, height, crop) in VARIANTS.items():
+        if crop:
+            img = ImageOps.fit(original, (width, height), Image.LANCZOS)
+        else:
+            img = original.copy()
+            img.thumbnail((width, height), Image.LANCZOS)
+
+        base = '{}/{}/{}-{}'.format(VARIANTS_DIR, post_id, name, digest)
+        variants[name] = {
+            'jpeg': _save(img, base + '.jpg', 'JPEG', quality=85, optimize=True, progressive=True),
+            'webp': _save(img, base + '.webp', 'WEBP', quality=80, method=6),
+            'width': img.width,
+            'height': img.height,
+        }
+
+    # Ne pas écraser les variantes si l'image a encore changé entre-temps
+    Post.objects.filter(pk=post_id, featured_image=source).update(image_variants=variants)
+    return variants
+
+
+def _save(img, name, fmt, **options):
+    buffer = BytesIO()
+    img.save(buffer, fmt, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def delete_variants(post_id):
+    directory = '{}/{}'.format(VARIANTS_DIR, post_id)
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        default_storage.delete(os.path.join(directory, filename))
+
+
+def variant_for(post, name):
+    """Retourner l'URL, l'URL WebP et les dimensions d'une variante (ou l'original)"""
+    if not post.featured_image:
+        return None
+    data = (post.image_variants or {})
+    variant = data.get(name) if data.get('source') == post.featured_image.name else None
+    if not variant:
+        return {'url': post.featured_image.url, 'webp_url': None, 'width': None, 'height': None}
+    return {
+        'url': default_storage.url(variant['jpeg']),
+        'webp_url': default_storage.url(variant['webp']),
+        'width': variant['width'],
+        'height': variant['height'],
+    }
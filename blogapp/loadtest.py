@@ -0,0 +1,425 @@
+"""
+Test de charge : rejoue un mélange de trafic contre une instance lancée en
+local (``runserver``, gunicorn...).
+
+Le trafic vient soit d'un journal d'accès (format « combined » de
+nginx/Apache), soit d'une liste pondérée de routes (``DEFAULT_MIX`` ou un
+fichier JSON). Chaque worker asyncio garde sa connexion HTTP/1.1 ouverte et
+deux identités : anonyme et connectée (cookie de session + jeton CSRF
+obtenus par le formulaire de connexion). Le client HTTP est écrit sur
+``asyncio.open_connection`` pour ne dépendre d'aucun paquet.
+
+Le rapport donne le débit, les latences p50/p95/p99 par route, les taux
+d'erreur et les erreurs de verrou SQLite (« database is locked »); il peut
+être enregistré en JSON et comparé à un run précédent. Les erreurs de verrou
+sont reconnues dans le corps des réponses 500 : seule la page d'erreur de
+``DEBUG=True`` contient le message de l'exception, sinon elles ne comptent
+que dans le taux d'erreur.
+
+Sans identifiants, les routes authentifiées sont retirées du trafic; un
+échec de connexion est compté comme une erreur de la route ``login``.
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+
+# Mélange par défaut; les {marqueurs} sont remplis avec des valeurs de la base
+DEFAULT_MIX = [
+    {'name': 'home', 'weight': 20, 'method': 'GET', 'path': '/'},
+    {'name': 'post_list', 'weight': 15, 'method': 'GET', 'path': '/blog/'},
+    {'name': 'post_list (filtres)', 'weight': 10, 'method': 'GET',
+     'path': '/blog/?category={category_slug}&tag={tag}'},
+    {'name': 'post_detail', 'weight': 35, 'method': 'GET', 'path': '/blog/{post_slug}/'},
+    {'name': 'search', 'weight': 8, 'method': 'GET', 'path': '/recherche/?q={search}'},
+    {'name': 'toggle_like', 'weight': 7, 'method': 'POST', 'path': '/ajax/post/{post_id}/like/', 'auth': True},
+    {'name': 'add_comment_reply', 'weight': 5, 'method': 'POST',
+     'path': '/ajax/comment/{comment_id}/reply/', 'auth': True, 'json': {'content': 'Merci pour ce tutoriel !'}},
+]
+
+# Présents dans les pages 500 de DEBUG=True seulement
+LOCK_MARKERS = (b'database is locked', b'database table is locked')
+
+_LOG_RE = re.compile(r'"(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3})')
+_CSRF_INPUT_RE = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+_SKIPPED_PREFIXES = ('/static/', '/media/', '/ckeditor/', '/admin/', '/favicon')
+
+
+# Client HTTP minimal
+
+class HttpError(Exception):
+    pass
+
+
+# Erreurs d'une requête comptées dans le rapport (sans interrompre le worker)
+REQUEST_ERRORS = (OSError, HttpError, asyncio.TimeoutError, asyncio.IncompleteReadError)
+
+
+class Connection:
+    """Connexion HTTP/1.1 persistante vers ``host:port``"""
+
+    def __init__(self, host, port, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=b''):
+        for attempt in (1, 2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                return await asyncio.wait_for(self._exchange(method, path, headers or {}, body), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Connexion keep-alive fermée par le serveur : on réessaie une fois
+                await self.close()
+                if attempt == 2:
+                    raise
+
+    async def _exchange(self, method, path, headers, body):
+        lines = ['{} {} HTTP/1.1'.format(method, path), 'Host: {}:{}'.format(self.host, self.port)]
+        headers = dict(headers)
+        if body or method == 'POST':
+            headers['Content-Length'] = str(len(body))
+        lines.extend('{}: {}'.format(name, value) for name, value in headers.items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b'\r\n')
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise HttpError('Réponse invalide : {!r}'.format(status_line))
+        response_headers = []
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers.append((name.strip().lower(), value.strip()))
+
+        header_map = dict(response_headers)
+        if method == 'HEAD' or status in (204, 304):
+            content = b''
+        elif header_map.get('transfer-encoding', '').lower() == 'chunked':
+            content = await self._read_chunked()
+        elif 'content-length' in header_map:
+            content = await self.reader.readexactly(int(header_map['content-length']))
+        else:
+            content = await self.reader.read()
+            await self.close()
+        if header_map.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, response_headers, content
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            if size == 0:
+                await self.reader.readuntil(b'\r\n')
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+
+class Identity:
+    """Cookies d'un visiteur (anonyme ou connecté)"""
+
+    def __init__(self):
+        self.cookies = {}
+
+    def header(self):
+        return '; '.join('{}={}'.format(name, value) for name, value in self.cookies.items())
+
+    def update(self, response_headers):
+        for name, value in response_headers:
+            if name == 'set-cookie':
+                cookie = SimpleCookie()
+                cookie.load(value)
+                for key, morsel in cookie.items():
+                    if morsel['max-age'] == '0' or not morsel.value:
+                        self.cookies.pop(key, None)
+                    else:
+                        self.cookies[key] = morsel.value
+
+    @property
+    def csrf_token(self):
+        return self.cookies.get('csrftoken', '')
+
+
+async def login(connection, identity, username, password, login_path='/login/'):
+    status, headers, content = await connection.request('GET', login_path)
+    identity.update(headers)
+    match = _CSRF_INPUT_RE.search(content)
+    if match is None:
+        raise HttpError('Jeton CSRF introuvable sur {}'.format(login_path))
+    body = urlencode({
+        'csrfmiddlewaretoken': match.group(1).decode(),
+        'username': username,
+        'password': password,
+    }).encode()
+    status, headers, _ = await connection.request('POST', login_path, {
+        'Cookie': identity.header(),
+        'Content-Type': 'application/x-www-form-urlencoded',
+    }, body)
+    identity.update(headers)
+    if 'sessionid' not in identity.cookies:
+        raise HttpError('Connexion refusée pour {} (HTTP {})'.format(username, status))
+
+
+# Trafic
+
+class Sampler:
+    """Valeurs réelles (slugs, identifiants...) pour remplir les chemins"""
+
+    def __init__(self, values, rng):
+        self.values = values
+        self.rng = rng
+
+    def fill(self, template):
+        def replace(match):
+            pool = self.values.get(match.group(1)) or ['']
+            return str(self.rng.choice(pool))
+        return re.sub(r'\{(\w+)\}', replace, template)
+
+
+def load_samples(limit=2000):
+    """Échantillon de valeurs tirées de la base configurée"""
+    from taggit.models import Tag
+
+    from .models import Category, Comment, Post, PostStatus
+
+    published = Post.objects.filter(status=PostStatus.PUBLISHED).order_by('-created_at')
+    posts = list(published.values_list('pk', 'slug', 'title')[:limit])
+    words = sorted({word for _, _, title in posts for word in title.split() if len(word) > 4})
+    return {
+        'post_id': [pk for pk, _, _ in posts],
+        'post_slug': [slug for _, slug, _ in posts],
+        'comment_id': list(Comment.objects.filter(
+            is_approved=True, post__status=PostStatus.PUBLISHED
+        ).order_by('-pk').values_list('pk', flat=True)[:limit]),
+        'category_slug': list(Category.objects.values_list('slug', flat=True)),
+        'tag': list(Tag.objects.values_list('name', flat=True)[:200]),
+        'search': words[:500],
+    }
+
+
+def parse_access_log(lines):
+    """Requêtes d'un journal d'accès; les routes sont nommées par ``resolve``"""
+    from django.urls import Resolver404, resolve
+
+    entries = []
+    for line in lines:
+        match = _LOG_RE.search(line)
+        if match is None:
+            continue
+        method, path = match.group('method'), match.group('path')
+        if method not in ('GET', 'POST') or path.startswith(_SKIPPED_PREFIXES):
+            continue
+        try:
+            name = resolve(urlsplit(path).path).url_name or 'autre'
+        except Resolver404:
+            continue
+        entry = {'name': name, 'method': method, 'path': path}
+        if name in ('toggle_like', 'add_comment_reply'):
+            entry['auth'] = True
+        if name == 'add_comment_reply':
+            entry['json'] = {'content': 'Réponse rejouée'}
+        if name in ('login', 'logout', 'register') or (method == 'POST' and 'auth' not in entry):
+            # Formulaires dont on n'a pas le contenu : ignorés
+            continue
+        entries.append(entry)
+    return entries
+
+
+class Traffic:
+    """Suite de requêtes à envoyer : rejeu du journal ou tirage pondéré"""
+
+    def __init__(self, routes=None, replay=None, rng=None):
+        self.rng = rng or random.Random(0)
+        self.replay = replay
+        self.position = 0
+        self.routes = routes or DEFAULT_MIX
+        self.weights = [route.get('weight', 1) for route in self.routes]
+
+    def anonymous(self):
+        """Même trafic sans les routes authentifiées"""
+        routes = [route for route in self.routes if not route.get('auth')]
+        replay = [entry for entry in self.replay if not entry.get('auth')] if self.replay else None
+        if not (replay if self.replay else routes):
+            raise ValueError('Aucune route anonyme dans le trafic')
+        return Traffic(routes=routes, replay=replay, rng=self.rng)
+
+    def next(self):
+        if self.replay:
+            entry = self.replay[self.position % len(self.replay)]
+            self.position += 1
+            return entry
+        return self.rng.choices(self.routes, weights=self.weights)[0]
+
+
+# Mesures
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    # Rang le plus proche : plus petite valeur couvrant ``fraction`` des mesures
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.lock_errors = defaultdict(int)
+        self.started = self.finished = None
+
+    def record(self, name, latency, status=None, content=b'', error=None):
+        self.latencies[name].append(latency)
+        if error is not None:
+            self.errors[name] += 1
+            self.statuses[name][type(error).__name__] += 1
+            return
+        self.statuses[name][str(status)] += 1
+        if status >= 500:
+            self.errors[name] += 1
+            if any(marker in content for marker in LOCK_MARKERS):
+                self.lock_errors[name] += 1
+
+    def summary(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        routes = {}
+        for name, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            routes[name] = {
+                'requests': len(values),
+                'rps': round(len(values) / elapsed, 2) if elapsed else None,
+                'p50_ms': _ms(percentile(ordered, 0.50)),
+                'p95_ms': _ms(percentile(ordered, 0.95)),
+                'p99_ms': _ms(percentile(ordered, 0.99)),
+                'max_ms': _ms(ordered[-1]),
+                'error_rate': round(self.errors[name] / len(values), 4),
+                'lock_errors': self.lock_errors[name],
+                'statuses': dict(self.statuses[name]),
+            }
+        total = sum(route['requests'] for route in routes.values())
+        all_latencies = sorted(value for values in self.latencies.values() for value in values)
+        return {
+            'duration_s': round(elapsed, 2),
+            'requests': total,
+            'rps': round(total / elapsed, 2) if elapsed else None,
+            'p50_ms': _ms(percentile(all_latencies, 0.50)),
+            'p95_ms': _ms(percentile(all_latencies, 0.95)),
+            'p99_ms': _ms(percentile(all_latencies, 0.99)),
+            'error_rate': round(sum(self.errors.values()) / total, 4) if total else 0,
+            'lock_errors': sum(self.lock_errors.values()),
+            'routes': routes,
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+# Exécution
+
+async def _worker(host, port, traffic, sampler, results, deadline, budget, credentials):
+    connection = Connection(host, port)
+    anonymous, member = Identity(), None
+    try:
+        while time.monotonic() < deadline and budget['remaining'] > 0:
+            budget['remaining'] -= 1
+            route = traffic.next()
+            if route.get('auth'):
+                if member is None:
+                    start = time.monotonic()
+                    try:
+                        identity = Identity()
+                        await login(connection, identity, *credentials)
+                    except REQUEST_ERRORS as exc:
+                        results.record('login', time.monotonic() - start, error=exc)
+                        await connection.close()
+                        continue
+                    member = identity
+                identity = member
+            else:
+                identity = anonymous
+
+            path = sampler.fill(route['path'])
+            headers = {'Accept': 'text/html,application/json'}
+            if identity.cookies:
+                headers['Cookie'] = identity.header()
+            body = b''
+            if route['method'] == 'POST':
+                headers['X-CSRFToken'] = identity.csrf_token
+                headers['X-Requested-With'] = 'XMLHttpRequest'
+                if 'json' in route:
+                    headers['Content-Type'] = 'application/json'
+                    body = json.dumps(route['json']).encode()
+
+            start = time.monotonic()
+            try:
+                status, response_headers, content = await connection.request(route['method'], path, headers, body)
+            except REQUEST_ERRORS as exc:
+                results.record(route['name'], time.monotonic() - start, error=exc)
+                await connection.close()
+                continue
+            results.record(route['name'], time.monotonic() - start, status, content)
+            identity.update(response_headers)
+    finally:
+        await connection.close()
+
+
+async def run(host, port, traffic, sampler, concurrency=10, duration=30.0, max_requests=None,
+              credentials=()):
+    """Lancer ``concurrency`` workers pendant ``duration`` secondes (ou jusqu'à
+    ``max_requests``); ``credentials`` est une liste de (utilisateur, mot de passe).
+    Sans identifiants, les routes authentifiées sont retirées du trafic
+    (``ValueError`` s'il n'en reste aucune)."""
+    credentials = list(credentials)
+    if not credentials:
+        traffic = traffic.anonymous()
+    results = Results()
+    results.started = time.monotonic()
+    deadline = results.started + duration
+    budget = {'remaining': max_requests if max_requests is not None else float('inf')}
+    await asyncio.gather(*(
+        _worker(host, port, traffic, sampler, results, deadline, budget,
+                credentials[i % len(credentials)] if credentials else None)
+        for i in range(concurrency)
+    ))
+    results.finished = time.monotonic()
+    return results
+
+
+def compare(current, previous):
+    """Écarts de latence et de débit par route par rapport à un run précédent"""
+    changes = {}
+    for name, route in current['routes'].items():
+        before = previous.get('routes', {}).get(name)
+        if not before:
+            continue
+        changes[name] = {
+            key: round(route[key] - before[key], 1)
+            for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms')
+            if route.get(key) is not None and before.get(key) is not None
+        }
+    return changes
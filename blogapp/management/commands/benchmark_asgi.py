@@ -0,0 +1,60 @@
+import asyncio
+import json
+import random
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from blogapp import benchmark, loadtest
+
+
+class Command(BaseCommand):
+    help = 'Compare débit et latences des pages de lecture servies en WSGI (synchrone) et en ASGI (asynchrone)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=4, help='Threads du worker WSGI')
+        parser.add_argument('--concurrency', type=int, default=50, help='Clients simultanés')
+        parser.add_argument('--client-delay-ms', type=float, default=0.0,
+                            help='Lecture lente de chaque réponse par le client')
+        parser.add_argument('--page-cache', action='store_true',
+                            help='Garder le cache de pages (désactivé par défaut : les vues sont mesurées)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Enregistrer les deux rapports en JSON')
+
+    def handle(self, *args, **options):
+        from monblog.asgi import application as asgi_application
+        from monblog.wsgi import application as wsgi_application
+
+        rng = random.Random(options['seed'])
+        paths = benchmark.sample_requests(
+            options['requests'],
+            loadtest.Traffic(routes=benchmark.READ_MIX, rng=rng),
+            loadtest.Sampler(loadtest.load_samples(), rng),
+        )
+        delay = options['client_delay_ms'] / 1000
+
+        with override_settings(PAGE_CACHE_ENABLED=options['page_cache']):
+            # Premier passage à blanc : instantané d'accueil et cartes en cache
+            benchmark.run_wsgi(wsgi_application, paths[:20], threads=1, concurrency=1)
+            wsgi = benchmark.run_wsgi(
+                wsgi_application, paths, options['threads'], options['concurrency'], delay).summary()
+            asgi = asyncio.run(benchmark.run_asgi(asgi_application, paths, options['concurrency'], delay)).summary()
+
+        for label, report in (('WSGI', wsgi), ('ASGI', asgi)):
+            self.stdout.write(
+                f"{label} : {report['requests']} requêtes en {report['duration_s']} s : {report['rps']} req/s, "
+                f"p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms, "
+                f"erreurs {report['error_rate']:.2%}"
+            )
+        self.stdout.write('ASGI par rapport à WSGI :')
+        for name, changes in loadtest.compare(asgi, wsgi).items():
+            self.stdout.write('{:<24} {}'.format(name, '  '.join(
+                f'{key} {value:+}' for key, value in changes.items())))
+
+        if options['output']:
+            config = {key: options[key] for key in ('requests', 'threads', 'concurrency', 'client_delay_ms',
+                                                    'page_cache', 'seed')}
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump({'config': config, 'wsgi': wsgi, 'asgi': asgi}, output, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Rapport enregistré dans {options['output']}"))
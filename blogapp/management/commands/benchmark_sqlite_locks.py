@@ -0,0 +1,49 @@
+import json
+import random
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blogapp import loadtest, sqlite_profile
+
+
+class Command(BaseCommand):
+    help = ('Compare les erreurs de verrouillage SQLite sous écritures concurrentes avec les réglages '
+            'par défaut de Django et avec le profil de production (WAL, busy_timeout...)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=2000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--work-ms', type=float, default=5.0,
+                            help='Travail simulé entre lecture et écriture dans une transaction')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Enregistrer les deux rapports en JSON')
+
+    def handle(self, *args, **options):
+        operations = sqlite_profile.sample_operations(options['operations'], random.Random(options['seed']))
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                reports = sqlite_profile.compare_profiles(
+                    directory, operations, options['threads'], options['work_ms'] / 1000, options['seed'])
+            except ValueError as exc:
+                raise CommandError(exc)
+
+        for name, report in reports.items():
+            self.stdout.write(
+                f"{name} : {report['requests']} opérations en {report['duration_s']} s : {report['rps']} op/s, "
+                f"p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms, erreurs {report['error_rate']:.2%}, "
+                f"verrous {report['lock_errors']}"
+            )
+            self.stdout.write('  ' + ', '.join(f'{key}={value}' for key, value in report['pragmas'].items()))
+            for route, stats in report['routes'].items():
+                self.stdout.write(f"  {route:<10} erreurs {stats['error_rate']:.2%}  verrous {stats['lock_errors']}")
+        self.stdout.write('production par rapport à django :')
+        for name, changes in loadtest.compare(reports['production'], reports['django']).items():
+            self.stdout.write('{:<24} {}'.format(name, '  '.join(
+                f'{key} {value:+}' for key, value in changes.items())))
+
+        if options['output']:
+            config = {key: options[key] for key in ('operations', 'threads', 'work_ms', 'seed')}
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump({'config': config, **reports}, output, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Rapport enregistré dans {options['output']}"))
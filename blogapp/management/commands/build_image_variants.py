@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from blogapp.images import build_variants
+from blogapp.models import Post
+
+
+class Command(BaseCommand):
+    help = "Génère les variantes (carte, détail, OG, WebP) des images d'articles"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Régénérer même si les variantes sont à jour",
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(featured_image='').exclude(featured_image__isnull=True)
+        built = 0
+        for post in posts.only('id', 'featured_image', 'image_variants').iterator():
+            if not options['force'] and post.image_variants.get('source') == post.featured_image.name:
+                continue
+            try:
+                build_variants(post.pk, post.featured_image.name)
+            except (OSError, ValueError) as exc:
+                self.stderr.write(f"Article {post.pk}: {exc}")
+                continue
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f'{built} image(s) traitée(s)'))
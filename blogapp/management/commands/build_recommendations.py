@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blogapp import recommendations
+
+
+class Command(BaseCommand):
+    help = "Recalcule les articles et projets similaires (vecteurs étiquettes + TF-IDF)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=recommendations.TOP_K,
+                            help='Nombre de voisins gardés par document')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        results = recommendations.build_all(k=options['top_k'])
+        posts, post_rows = results['posts']
+        projects, project_rows = results['projects']
+        self.stdout.write(self.style.SUCCESS(
+            f'{post_rows} recommandation(s) pour {posts} article(s), '
+            f'{project_rows} pour {projects} projet(s) en {time.perf_counter() - start:.1f} s'
+        ))
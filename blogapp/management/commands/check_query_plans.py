@@ -0,0 +1,30 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from blogapp import query_plans
+
+
+class Command(BaseCommand):
+    help = "Vérifie que les requêtes des listes utilisent leurs index (EXPLAIN QUERY PLAN)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Afficher tous les plans')
+
+    def handle(self, *args, **options):
+        try:
+            results = query_plans.check()
+        except ImproperlyConfigured as exc:
+            raise CommandError(exc)
+        failures = 0
+        for name, plan, problems in results:
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'✗ {name}'))
+            else:
+                self.stdout.write(f'✓ {name}')
+            if problems or options['verbose_plans']:
+                for line in plan:
+                    self.stdout.write(f'    {line}')
+        if failures:
+            raise CommandError(f'{failures} requête(s) sans index adapté')
+        self.stdout.write(self.style.SUCCESS('Tous les plans utilisent un index'))
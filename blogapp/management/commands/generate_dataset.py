@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blogapp import dataset
+
+
+class Command(BaseCommand):
+    help = "Génère un grand jeu de données synthétique (bulk_create) pour les mesures de performance"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--ratings', type=int, default=5000)
+        parser.add_argument('--projects', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0, help='Graine du générateur (résultat reproductible)')
+        parser.add_argument('--prefix', default='gen', help='Préfixe des identifiants et slugs générés')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help='Ne pas recalculer compteurs et index de recherche')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['categories'] < 1:
+            raise CommandError('Il faut au moins un utilisateur et une catégorie.')
+        started = time.monotonic()
+        try:
+            totals = dataset.generate(
+                users=options['users'],
+                categories=options['categories'],
+                posts=options['posts'],
+                comments=options['comments'],
+                ratings=options['ratings'],
+                projects=options['projects'],
+                seed=options['seed'],
+                prefix=options['prefix'],
+                batch_size=options['batch_size'],
+                rebuild=not options['skip_rebuild'],
+                log=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['users']} utilisateurs, {totals['posts']} articles, {totals['comments']} commentaires, "
+            f"{totals['ratings']} notes, {totals['projects']} projets en {elapsed:.1f} s"
+        ))
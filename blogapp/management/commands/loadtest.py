@@ -0,0 +1,95 @@
+import asyncio
+import json
+import random
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from blogapp import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Rejoue un mélange de trafic (journal d'accès ou routes pondérées) contre une instance locale. "
+        "Les erreurs de verrou SQLite ne sont reconnues que si l'instance tourne avec DEBUG=True."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Instance à tester (HTTP)')
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--duration', type=float, default=30.0, help='Durée maximale en secondes')
+        parser.add_argument('--requests', type=int, help='Nombre maximal de requêtes')
+        parser.add_argument('--access-log', help="Journal d'accès (format combined) à rejouer")
+        parser.add_argument('--routes', help='Fichier JSON de routes pondérées (voir loadtest.DEFAULT_MIX)')
+        parser.add_argument('--user', action='append', default=[],
+                            help='identifiant:mot_de_passe (répétable); par défaut les comptes gen-* de generate_dataset')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Enregistrer le rapport en JSON')
+        parser.add_argument('--compare', help='Rapport JSON précédent à comparer')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Seules les URL http://hôte:port sont gérées.')
+        rng = random.Random(options['seed'])
+
+        replay = routes = None
+        if options['access_log']:
+            with open(options['access_log'], encoding='utf-8', errors='replace') as log:
+                replay = loadtest.parse_access_log(log)
+            if not replay:
+                raise CommandError("Aucune requête exploitable dans le journal d'accès.")
+        elif options['routes']:
+            with open(options['routes'], encoding='utf-8') as spec:
+                routes = json.load(spec)
+
+        credentials = [tuple(value.split(':', 1)) for value in options['user'] if ':' in value]
+        if not credentials:
+            usernames = User.objects.filter(username__startswith='gen-').order_by('pk').values_list(
+                'username', flat=True)[:options['concurrency']]
+            credentials = [(username, 'password') for username in usernames]
+        if not credentials:
+            self.stderr.write('Aucun compte : les routes authentifiées seront ignorées.')
+
+        try:
+            results = asyncio.run(loadtest.run(
+                url.hostname, url.port or 80,
+                loadtest.Traffic(routes=routes, replay=replay, rng=rng),
+                loadtest.Sampler(loadtest.load_samples(), rng),
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                max_requests=options['requests'],
+                credentials=credentials,
+            ))
+        except ValueError as exc:
+            raise CommandError('{} : ajoutez --user identifiant:mot_de_passe.'.format(exc))
+        report = results.summary()
+        report['config'] = {
+            key: options[key] for key in ('url', 'concurrency', 'duration', 'requests', 'access_log', 'routes', 'seed')
+        }
+        self.print_report(report)
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                report['comparison'] = loadtest.compare(report, json.load(previous))
+            for name, changes in report['comparison'].items():
+                self.stdout.write('{:<24} {}'.format(name, '  '.join(
+                    f'{key} {value:+}' for key, value in changes.items())))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Rapport enregistré dans {options['output']}"))
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{report['requests']} requêtes en {report['duration_s']} s : {report['rps']} req/s, "
+            f"p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, p99 {report['p99_ms']} ms, "
+            f"erreurs {report['error_rate']:.2%}, verrous SQLite {report['lock_errors']}"
+        )
+        self.stdout.write('{:<24} {:>7} {:>8} {:>8} {:>8} {:>8} {:>8} {:>6}'.format(
+            'route', 'req', 'req/s', 'p50', 'p95', 'p99', 'erreurs', 'verrou'))
+        for name, route in report['routes'].items():
+            self.stdout.write('{:<24} {:>7} {:>8} {:>8} {:>8} {:>8} {:>8.2%} {:>6}'.format(
+                name[:24], route['requests'], route['rps'], route['p50_ms'], route['p95_ms'],
+                route['p99_ms'], route['error_rate'], route['lock_errors']))
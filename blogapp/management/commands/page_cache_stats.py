@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blogapp import page_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche le taux de succès du cache de pages à partir du journal du logger "
+        "blogapp.page_cache (compteurs tenus par chaque processus)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('logs', nargs='+', help="Fichiers de journal ('-' pour l'entrée standard)")
+
+    def handle(self, *args, **options):
+        lines = []
+        for path in options['logs']:
+            if path == '-':
+                lines.extend(sys.stdin)
+                continue
+            try:
+                with open(path, encoding='utf-8', errors='replace') as log:
+                    lines.extend(log)
+            except OSError as exc:
+                raise CommandError(exc)
+        stats = page_cache.read_stats(lines)
+        self.stdout.write(
+            f"Succès : {stats['hits']}  Échecs : {stats['misses']}  "
+            f"Taux de succès : {stats['hit_rate']:.1%}"
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blogapp import platforms
+
+
+class Command(BaseCommand):
+    help = "Recalcule les articles rattachés à chaque plateforme et leurs compteurs"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = platforms.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{count} plateforme(s) recalculée(s)'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from blogapp import search_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index plein texte (FTS5) des articles et projets"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("L'index FTS5 n'est disponible que sous SQLite.")
+        with transaction.atomic():
+            posts, projects = search_index.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Index reconstruit : {posts} article(s), {projects} projet(s)'
+        ))
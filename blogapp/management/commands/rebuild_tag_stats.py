@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blogapp import tag_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule le nombre d'articles publiés par étiquette (global et par catégorie)"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = tag_stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{rows} compteur(s) d\'étiquettes recalculé(s)'))
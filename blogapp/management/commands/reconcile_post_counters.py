@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blogapp import counters
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs de notes, j'aime et commentaires des articles"
+
+    def handle(self, *args, **options):
+        updated = counters.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'{updated} article(s) recalculé(s)'))
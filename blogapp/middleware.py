@@ -0,0 +1,159 @@
+"""
+Instrumentation des requêtes : nombre de requêtes SQL, temps base de
+données, temps de rendu des templates et temps total de la vue.
+
+Seule une fraction des requêtes est mesurée (``REQUEST_TIMING_SAMPLE_RATE``,
+0 = désactivé) : une requête non échantillonnée ne coûte qu'un tirage
+aléatoire. Les requêtes mesurées reçoivent un en-tête ``Server-Timing`` et
+produisent une ligne JSON sur le logger ``blogapp.timing``. Une même requête
+SQL exécutée plusieurs fois avec des paramètres différents (N+1) y est
+signalée.
+
+Sous ASGI, les requêtes SQL d'une requête HTTP passent toutes par le même
+thread (``sync_to_async``); le compteur y est installé et retiré.
+"""
+import contextvars
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as BackendTemplate
+
+
+logger = logging.getLogger('blogapp.timing')
+
+_current = contextvars.ContextVar('blogapp_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        threshold = getattr(settings, 'REQUEST_TIMING_DUPLICATE_THRESHOLD', 2)
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+def _install_template_timer():
+    """Chronométrer le rendu des templates de premier niveau (les inclusions
+    sont comptées dans le template parent)"""
+    if getattr(BackendTemplate.render, '_timed', False):
+        return
+    original = BackendTemplate.render
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return original(self, context, request)
+        start = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+    render._timed = True
+    BackendTemplate.render = render
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def _sampled():
+    rate = getattr(settings, 'REQUEST_TIMING_SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def _wrap_connections(stats):
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(stats.execute_wrapper))
+    return stack
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        _install_template_timer()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not _sampled():
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            with _wrap_connections(stats):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not _sampled():
+            return await self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            stack = await sync_to_async(_wrap_connections)(stats)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def finish(self, request, response, stats, total):
+        response['Server-Timing'] = ', '.join([
+            'db;dur={};desc="{} SQL"'.format(_ms(stats.db_time), stats.queries),
+            'tpl;dur={}'.format(_ms(stats.template_time)),
+            'total;dur={}'.format(_ms(total)),
+        ])
+        self.log(request, response, stats, total)
+
+    def log(self, request, response, stats, total):
+        duplicates = stats.duplicates()
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': _ms(total),
+            'db_ms': _ms(stats.db_time),
+            'template_ms': _ms(stats.template_time),
+            'queries': stats.queries,
+            'duplicates': [{'sql': sql[:200], 'count': count} for sql, count in duplicates],
+        }
+        level = logging.WARNING if duplicates else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blogapp_search_index USING fts5("
+    "kind UNINDEXED, object_id UNINDEXED, title, excerpt, body, tags, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+DROP_SQL = 'DROP TABLE IF EXISTS blogapp_search_index'
+
+
+def create_index(apps, schema_editor):
+    # Index FTS5 disponible uniquement sous SQLite
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0004_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:50
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('blogapp', 'Post')
+    PostRating = apps.get_model('blogapp', 'PostRating')
+    Comment = apps.get_model('blogapp', 'Comment')
+
+    def total(model, aggregate, **filters):
+        return Coalesce(Subquery(
+            model.objects.filter(post=OuterRef('pk'), **filters).order_by()
+            .values('post').annotate(total=aggregate).values('total')[:1],
+            output_field=IntegerField(),
+        ), Value(0))
+
+    Post.objects.update(
+        rating_sum=total(PostRating, Sum('rating')),
+        rating_count=total(PostRating, Count('pk')),
+        like_count=total(PostRating, Count('pk', filter=Q(rating=5))),
+        comment_count=total(Comment, Count('pk'), is_approved=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Commentaires'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="J'aime"),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Nombre de notes'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Somme des notes'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0007_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Rang')),
+                ('score', models.FloatField(verbose_name='Score')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='blogapp.post')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_in', to='blogapp.post')),
+            ],
+            options={
+                'verbose_name': "Recommandation d'article",
+                'verbose_name_plural': "Recommandations d'articles",
+                'ordering': ['source', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('source', 'rank'), name='post_reco_source_rank_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Rang')),
+                ('score', models.FloatField(verbose_name='Score')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='blogapp.project')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_in', to='blogapp.project')),
+            ],
+            options={
+                'verbose_name': 'Recommandation de projet',
+                'verbose_name_plural': 'Recommandations de projets',
+                'ordering': ['source', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('source', 'rank'), name='project_reco_source_rank_uniq')],
+            },
+        ),
+    ]
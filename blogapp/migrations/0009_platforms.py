@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0008_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Platform',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nom')),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('tag_slugs', models.CharField(help_text='Slugs séparés par des virgules; « * » final pour un préfixe (ex. raspberry*)', max_length=500, verbose_name='Étiquettes')),
+                ('icon', models.CharField(default='fas fa-microchip', max_length=50, verbose_name='Icône')),
+                ('color', models.CharField(default='#2563eb', max_length=7, verbose_name='Couleur')),
+                ('color_dark', models.CharField(default='#1e40af', max_length=7, verbose_name='Couleur foncée')),
+                ('summary', models.TextField(blank=True, verbose_name='Résumé (page Robotique)')),
+                ('subtitle', models.TextField(blank=True, verbose_name='Sous-titre')),
+                ('description', models.TextField(blank=True, verbose_name='Présentation')),
+                ('image_url', models.URLField(blank=True, verbose_name='Image')),
+                ('variants_label', models.CharField(blank=True, max_length=20, verbose_name='Nombre de variantes')),
+                ('position', models.PositiveSmallIntegerField(default=0, verbose_name='Position')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('post_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Articles')),
+            ],
+            options={
+                'verbose_name': 'Plateforme',
+                'verbose_name_plural': 'Plateformes',
+                'ordering': ['position', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlatformMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_created_at', models.DateTimeField()),
+                ('platform', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='blogapp.platform')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='platform_memberships', to='blogapp.post')),
+            ],
+            options={
+                'verbose_name': 'Appartenance à une plateforme',
+                'verbose_name_plural': 'Appartenances aux plateformes',
+                'indexes': [models.Index(fields=['platform', 'post_created_at', 'post'], name='platform_membership_list_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'platform'), name='platform_membership_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+
+PLATFORMS = [
+    {
+        'name': 'Arduino', 'slug': 'arduino', 'tag_slugs': 'arduino*',
+        'icon': 'fas fa-microchip', 'color': '#00979d', 'color_dark': '#006064',
+        'summary': "Découvrez la programmation embarquée avec Arduino. De la LED clignotante aux projets complexes avec capteurs et actuateurs.",
+        'subtitle': "La plateforme de prototypage électronique open-source qui démocratise la création d'objets interactifs. Parfait pour débuter en électronique et robotique.",
+        'description': "Arduino est une plateforme de prototypage électronique open-source basée sur des logiciels et du matériel flexibles et faciles à utiliser. Elle s'adresse aux créateurs, aux étudiants et à toute personne souhaitant créer des objets ou des environnements interactifs. Les cartes Arduino peuvent lire des entrées (lumière sur un capteur, doigt sur un bouton, message Twitter) et les transformer en sorties (activer un moteur, allumer une LED, publier quelque chose en ligne).",
+        'image_url': 'https://www.positron-libre.com/electronique/arduino/images/arduino/carte-arduino-uno-made-in-italy.jpg',
+        'variants_label': '15+', 'position': 1,
+    },
+    {
+        'name': 'ESP32', 'slug': 'esp32', 'tag_slugs': 'esp32*',
+        'icon': 'fas fa-wifi', 'color': '#e94d36', 'color_dark': '#d32f2f',
+        'summary': "Explorez les possibilités infinies de l'ESP32 : WiFi, Bluetooth, IoT et bien plus. Créez des objets connectés performants.",
+        'subtitle': "Un microcontrôleur puissant avec WiFi et Bluetooth intégrés. L'outil idéal pour créer des objets connectés et des projets IoT innovants.",
+        'description': "L'ESP32 est un système sur puce (SoC) à faible coût et à faible consommation d'énergie avec Wi-Fi et Bluetooth intégrés. Il intègre toutes les fonctionnalités de pointe, notamment un commutateur d'antenne rapide, une technologie de gestion de l'alimentation RF, quatre SPI, deux I2C, deux I2S, trois UART, CAN et IR (TX/RX), ainsi que des GPIO, ADC, DAC, capacité tactile, capteur de température et amplificateur à faible bruit avec un récepteur RF.",
+        'image_url': 'https://tse3.mm.bing.net/th/id/OIP.RJk8hOQYn3GZStavmNYJCAHaHa?rs=1&pid=ImgDetMain&o=7&rm=3',
+        'variants_label': '8+', 'position': 2,
+    },
+    {
+        'name': 'Raspberry Pi', 'slug': 'raspberry-pi', 'tag_slugs': 'raspberry*',
+        'icon': 'fas fa-server', 'color': '#c51a4a', 'color_dark': '#b71c1c',
+        'summary': "Transformez votre Raspberry Pi en serveur, station IoT ou robot autonome. Python, GPIO et projets avancés.",
+        'subtitle': "Un nano-ordinateur complet sous Linux. Transformez vos idées en projets sophistiqués avec cette plateforme polyvalente.",
+        'description': "Le Raspberry Pi est un nano-ordinateur monocarte à processeur ARM de la taille d'une carte de crédit. Il est développé par la fondation Raspberry Pi pour démocratiser l'accès aux outils informatiques et à l'éducation informatique. Capable de faire tourner Linux, il peut servir d'ordinateur de bureau, de serveur, de station multimédia, de console de jeux rétro, ou de cerveau pour vos projets de robotique et domotique.",
+        'image_url': 'https://th.bing.com/th/id/R.9f2d69771a9e5f6c3df3363d879993ee?rik=vTvE3y4TYB09yA&pid=ImgRaw&r=0',
+        'variants_label': '12+', 'position': 3,
+    },
+]
+
+
+def seed_platforms(apps, schema_editor):
+    Platform = apps.get_model('blogapp', 'Platform')
+    PlatformMembership = apps.get_model('blogapp', 'PlatformMembership')
+    Post = apps.get_model('blogapp', 'Post')
+    Tag = apps.get_model('taggit', 'Tag')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    content_type = ContentType.objects.filter(app_label='blogapp', model='post').first()
+    for values in PLATFORMS:
+        platform, _ = Platform.objects.get_or_create(slug=values['slug'], defaults=values)
+        if content_type is None:
+            continue
+        prefix = platform.tag_slugs.rstrip('*')
+        tag_ids = Tag.objects.filter(slug__startswith=prefix).values_list('pk', flat=True)
+        post_ids = TaggedItem.objects.filter(
+            content_type=content_type, tag_id__in=list(tag_ids),
+        ).values_list('object_id', flat=True)
+        posts = Post.objects.filter(pk__in=set(post_ids), status='published').values_list('pk', 'created_at')
+        PlatformMembership.objects.bulk_create([
+            PlatformMembership(platform=platform, post_id=pk, post_created_at=created_at)
+            for pk, created_at in posts
+        ])
+        platform.post_count = len(posts)
+        platform.save(update_fields=['post_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0009_platforms'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_platforms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_tag_stats(apps, schema_editor):
+    Post = apps.get_model('blogapp', 'Post')
+    TagStat = apps.get_model('blogapp', 'TagStat')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    content_type = ContentType.objects.filter(app_label='blogapp', model='post').first()
+    if content_type is None:
+        return
+    categories = dict(Post.objects.filter(status='published').values_list('pk', 'category_id'))
+    counts = {}
+    for tag_id, object_id in TaggedItem.objects.filter(content_type=content_type).values_list('tag_id', 'object_id'):
+        if object_id not in categories:
+            continue
+        for key in ((tag_id, None), (tag_id, categories[object_id])):
+            counts[key] = counts.get(key, 0) + 1
+    TagStat.objects.bulk_create([
+        TagStat(tag_id=tag_id, category_id=category_id, published_count=count)
+        for (tag_id, category_id), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0010_seed_platforms'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('published_count', models.PositiveIntegerField(default=0, verbose_name='Articles publiés')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tag_stats', to='blogapp.category')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='taggit.tag')),
+            ],
+            options={
+                'verbose_name': "Statistique d'étiquette",
+                'verbose_name_plural': "Statistiques d'étiquettes",
+                'indexes': [models.Index(fields=['category', '-published_count', 'tag'], name='tag_stat_cloud_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('tag',), name='tag_stat_global_uniq'), models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('tag', 'category'), name='tag_stat_category_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_tag_stats, migrations.RunPython.noop),
+    ]
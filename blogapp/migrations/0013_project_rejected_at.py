@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0012_conditional_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='rejected_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Refusé le'),
+        ),
+    ]
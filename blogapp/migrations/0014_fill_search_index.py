@@ -0,0 +1,65 @@
+import html
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+
+TABLE = 'blogapp_search_index'
+
+
+def _text(value):
+    return html.unescape(strip_tags(value or '')).replace('\xa0', ' ')
+
+
+def fill_search_index(apps, schema_editor):
+    # La table créée par 0005 est vide : les articles et projets existants
+    # n'étaient pas trouvés tant que rebuild_search_index n'avait pas tourné
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('blogapp', 'Post')
+    Project = apps.get_model('blogapp', 'Project')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLE])
+        if cursor.fetchone() is None:
+            return
+
+    tags = {}
+    content_type = ContentType.objects.filter(app_label='blogapp', model='post').first()
+    if content_type is not None:
+        for object_id, name in TaggedItem.objects.filter(content_type=content_type).values_list(
+                'object_id', 'tag__name'):
+            tags.setdefault(object_id, []).append(name)
+
+    documents = [
+        ('post', pk, title, excerpt, _text(content), ' '.join(tags.get(pk, ())))
+        for pk, title, excerpt, content in Post.objects.filter(status='published').values_list(
+            'pk', 'title', 'excerpt', 'content').iterator()
+    ]
+    documents.extend(
+        ('project', pk, title, '', description, technologies.replace(',', ' '))
+        for pk, title, description, technologies in Project.objects.filter(
+            rejected_at__isnull=True).values_list('pk', 'title', 'description', 'technologies').iterator()
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DELETE FROM {}'.format(TABLE))
+        cursor.executemany(
+            'INSERT INTO {} (kind, object_id, title, excerpt, body, tags) '
+            'VALUES (%s, %s, %s, %s, %s, %s)'.format(TABLE),
+            documents,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0013_project_rejected_at'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
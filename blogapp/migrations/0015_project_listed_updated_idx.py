@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0014_fill_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('rejected_at__isnull', True)), fields=['updated_at'], name='project_listed_updated_idx'),
+        ),
+    ]
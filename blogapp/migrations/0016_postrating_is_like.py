@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:36
+
+from django.db import migrations, models
+
+
+def mark_likes(apps, schema_editor):
+    # Avant ce champ, un « j'aime » était enregistré comme une note de 5 :
+    # les notes existantes ne se distinguent pas, on garde les compteurs affichés
+    PostRating = apps.get_model('blogapp', 'PostRating')
+    PostRating.objects.filter(rating=5).update(is_like=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0015_project_listed_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postrating',
+            name='is_like',
+            field=models.BooleanField(default=False, verbose_name="J'aime"),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='views_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Vues'),
+        ),
+        migrations.RunPython(mark_likes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+from blogapp import recommendations
+
+
+def build_recommendations(apps, schema_editor):
+    # Les tables créées par 0008 sont vides : les pages de détail montraient
+    # les articles de repli tant que build_recommendations n'avait pas tourné
+    Post = apps.get_model('blogapp', 'Post')
+    Project = apps.get_model('blogapp', 'Project')
+    PostRecommendation = apps.get_model('blogapp', 'PostRecommendation')
+    ProjectRecommendation = apps.get_model('blogapp', 'ProjectRecommendation')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+
+    tags = {}
+    content_type = ContentType.objects.filter(app_label='blogapp', model='post').first()
+    if content_type is not None:
+        for object_id, slug in TaggedItem.objects.filter(content_type=content_type).values_list(
+                'object_id', 'tag__slug'):
+            tags.setdefault(object_id, []).append(slug)
+
+    posts = [
+        recommendations.Document(pk, tags.get(pk, ()), category_id, level, ' '.join((title, excerpt, content)))
+        for pk, category_id, level, title, excerpt, content in Post.objects.filter(
+            status='published').values_list(
+            'pk', 'category_id', 'difficulty_level', 'title', 'excerpt', 'content').iterator()
+    ]
+    projects = [
+        recommendations.Document(pk, technologies.split(','), project_type, None, ' '.join((title, description)))
+        for pk, project_type, technologies, title, description in Project.objects.filter(
+            is_approved=True).values_list(
+            'pk', 'project_type', 'technologies', 'title', 'description').iterator()
+    ]
+
+    for source, model, documents in (
+        (recommendations.POSTS, PostRecommendation, posts),
+        (recommendations.PROJECTS, ProjectRecommendation, projects),
+    ):
+        # Base neuve (ou base de test) : rien à précalculer ni à mettre en cache
+        if not documents:
+            continue
+        idf, neighbours = recommendations.compute(documents)
+        model.objects.all().delete()
+        model.objects.bulk_create([
+            model(source_id=pk, target_id=target, rank=rank, score=score)
+            for pk, found in neighbours.items()
+            for rank, (score, target) in enumerate(found, start=1)
+        ], batch_size=1000)
+        # IDF des mises à jour incrémentales (voir recommendations.update)
+        recommendations._save_idf(source, idf)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogapp', '0016_postrating_is_like'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_recommendations, migrations.RunPython.noop),
+    ]
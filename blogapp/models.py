@@ -5,7 +5,7 @@ from django.urls import reverse
 from django.utils.text import slugify
 from ckeditor_uploader.fields import RichTextUploadingField
 from taggit.managers import TaggableManager
-from PIL import Image
+from taggit.models import Tag
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
 
@@ -84,6 +84,12 @@ class Post(models.Model):
         null=True,
         verbose_name="Image mise en avant"
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Variantes de l'image"
+    )
     tags = TaggableManager(verbose_name="Tags")
     difficulty_level = models.CharField(
         max_length=12,
@@ -109,7 +115,12 @@ class Post(models.Model):
     )
     
     # Statistiques
-    views_count = models.PositiveIntegerField(default=0, verbose_name="Vues")
+    views_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Vues")
+    # Compteurs dénormalisés (tenus à jour par les signaux, voir counters.py)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False, verbose_name="Somme des notes")
+    rating_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Nombre de notes")
+    like_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="J'aime")
+    comment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Commentaires")
     reading_time = models.PositiveIntegerField(default=5, verbose_name="Temps de lecture (min)")
     
     # Versioning
@@ -131,6 +142,28 @@ class Post(models.Model):
         verbose_name = "Article"
         verbose_name_plural = "Articles"
         ordering = ['-created_at']
+        # Filtres des listes (voir views.py et query_plans.py) : l'ordre
+        # ``-created_at, -id`` est lu directement dans l'index
+        indexes = [
+            models.Index(fields=['status', 'created_at', 'id'], name='post_status_created_idx'),
+            models.Index(fields=['category', 'status', 'created_at', 'id'], name='post_category_status_idx'),
+            models.Index(fields=['author', 'created_at'], name='post_author_created_idx'),
+            # Validateur des requêtes conditionnelles (voir conditional.py)
+            models.Index(fields=['status', 'updated_at'], name='post_status_updated_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Mémoriser l'image chargée pour détecter un changement au save()
+        if 'featured_image' in field_names:
+            instance._loaded_featured_image = values[field_names.index('featured_image')] or ''
+        # Statut et catégorie chargés : statistiques d'étiquettes (tag_stats.py)
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        if 'category_id' in field_names:
+            instance._loaded_category_id = values[field_names.index('category_id')]
+        return instance
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -141,13 +174,29 @@ class Post(models.Model):
             word_count = len(self.content.split())
             self.reading_time = max(1, word_count // 200)
         
-        # Optimiser l'image
+        update_fields = kwargs.get('update_fields')
+        image_changed = (
+            (update_fields is None or 'featured_image' in update_fields) and
+            (self.featured_image.name or '') != getattr(self, '_loaded_featured_image', '')
+        )
+        # Les compteurs sont écrits par incréments (counters.py, view_counter.py) :
+        # une sauvegarde complète ne doit pas y remettre les valeurs chargées
+        if not self._state.adding:
+            from .counters import COUNTER_FIELDS
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name not in COUNTER_FIELDS]
         super().save(*args, **kwargs)
-        if self.featured_image:
-            img = Image.open(self.featured_image.path)
-            if img.height > 600 or img.width > 800:
-                img.thumbnail((800, 600))
-                img.save(self.featured_image.path)
+        
+        # Générer les variantes de l'image seulement si elle a changé
+        if image_changed:
+            self._loaded_featured_image = self.featured_image.name or ''
+            from .images import schedule_variants
+            schedule_variants(self)
+    
+    def get_image_variant(self, name):
+        from .images import variant_for
+        return variant_for(self, name)
     
     def __str__(self):
         return "{} ({})".format(self.title, self.get_status_display())
@@ -156,20 +205,40 @@ class Post(models.Model):
         return reverse('post_detail', kwargs={'slug': self.slug})
     
     def increment_views(self):
+        # Les vues sont tamponnées puis écrites par lots (voir view_counter)
+        from . import view_counter
+        view_counter.record(self.pk)
         self.views_count += 1
-        self.save(update_fields=['views_count'])
     
-    def get_next_post(self):
+    @property
+    def avg_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+    
+    def _next_posts(self):
         return Post.objects.filter(
             created_at__gt=self.created_at,
             status=PostStatus.PUBLISHED
-        ).order_by('created_at').first()
+        ).order_by('created_at')
     
-    def get_previous_post(self):
+    def _previous_posts(self):
         return Post.objects.filter(
             created_at__lt=self.created_at,
             status=PostStatus.PUBLISHED
-        ).order_by('-created_at').first()
+        ).order_by('-created_at')
+    
+    def get_next_post(self):
+        return self._next_posts().first()
+    
+    def get_previous_post(self):
+        return self._previous_posts().first()
+    
+    async def aget_next_post(self):
+        return await self._next_posts().afirst()
+    
+    async def aget_previous_post(self):
+        return await self._previous_posts().afirst()
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
@@ -189,6 +258,21 @@ class Comment(models.Model):
         verbose_name = "Commentaire"
         verbose_name_plural = "Commentaires"
         ordering = ['created_at']
+        # Les filtres booléens deviennent ``WHERE "is_approved"`` : seul un
+        # index partiel peut les servir
+        indexes = [
+            models.Index(
+                fields=['post', 'created_at', 'id'], condition=models.Q(is_approved=True),
+                name='comment_post_approved_idx',
+            ),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'is_approved' in field_names:
+            instance._loaded_is_approved = values[field_names.index('is_approved')]
+        return instance
     
     def __str__(self):
         return "Comment by {} on {}".format(
@@ -203,6 +287,8 @@ class PostRating(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='ratings')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     rating = models.PositiveIntegerField(choices=[(i, i) for i in range(1, 6)])
+    # « J'aime » donné par toggle_like (distinct d'une note de 5 étoiles)
+    is_like = models.BooleanField(default=False, verbose_name="J'aime")
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -210,6 +296,15 @@ class PostRating(models.Model):
         verbose_name = "Note"
         verbose_name_plural = "Notes"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'rating' in field_names:
+            instance._loaded_rating = values[field_names.index('rating')]
+        if 'is_like' in field_names:
+            instance._loaded_is_like = values[field_names.index('is_like')]
+        return instance
+    
     def __str__(self):
         return f'{self.user.username} - {self.post.title} - {self.rating}★'
 
@@ -248,6 +343,8 @@ class Project(models.Model):
         verbose_name="Statut"
     )
     is_approved = models.BooleanField(default=False, verbose_name="Approuvé")
+    # Un projet refusé reste en base, masqué du site sauf pour son auteur
+    rejected_at = models.DateTimeField(null=True, blank=True, verbose_name="Refusé le")
     
     # Liens et ressources
     github_url = models.URLField(blank=True, verbose_name="Lien GitHub")
@@ -289,6 +386,25 @@ class Project(models.Model):
         verbose_name = "Projet"
         verbose_name_plural = "Projets"
         ordering = ['-is_featured', '-created_at']
+        indexes = [
+            models.Index(fields=['is_featured', 'created_at', 'id'], name='project_featured_idx'),
+            models.Index(fields=['project_type', 'is_featured', 'created_at', 'id'], name='project_type_featured_idx'),
+            # Index partiels : les filtres booléens ne sont pas des égalités en SQL
+            models.Index(
+                fields=['created_at', 'id'], condition=models.Q(is_featured=True),
+                name='project_highlight_idx',
+            ),
+            models.Index(
+                fields=['is_featured', 'created_at'], condition=models.Q(is_approved=False),
+                name='project_pending_idx',
+            ),
+            models.Index(fields=['updated_at'], name='project_updated_idx'),
+            # Validateur de la liste des projets (conditional.py)
+            models.Index(
+                fields=['updated_at'], condition=models.Q(rejected_at__isnull=True),
+                name='project_listed_updated_idx',
+            ),
+        ]
         permissions = [
             ("can_publish_project", "Peut publier des projets"),
             ("can_publish_post", "Peut publier des articles"),
@@ -343,4 +459,141 @@ class UserProfile(models.Model):
         verbose_name_plural = "Profils utilisateurs"
     
     def __str__(self):
-        return f'Profil de {self.user.username}'
\ No newline at end of file
+        return f'Profil de {self.user.username}'
+
+class PostRecommendation(models.Model):
+    """Articles similaires précalculés (voir recommendations.py)"""
+    source = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='recommendations')
+    target = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='recommended_in')
+    rank = models.PositiveSmallIntegerField(verbose_name="Rang")
+    score = models.FloatField(verbose_name="Score")
+
+    class Meta:
+        verbose_name = "Recommandation d'article"
+        verbose_name_plural = "Recommandations d'articles"
+        ordering = ['source', 'rank']
+        # Sert aussi d'index à la lecture depuis la page de détail
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'rank'], name='post_reco_source_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.source_id} -> {self.target_id} ({self.score:.3f})'
+
+
+class ProjectRecommendation(models.Model):
+    """Projets similaires précalculés (voir recommendations.py)"""
+    source = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='recommendations')
+    target = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='recommended_in')
+    rank = models.PositiveSmallIntegerField(verbose_name="Rang")
+    score = models.FloatField(verbose_name="Score")
+
+    class Meta:
+        verbose_name = "Recommandation de projet"
+        verbose_name_plural = "Recommandations de projets"
+        ordering = ['source', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'rank'], name='project_reco_source_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.source_id} -> {self.target_id} ({self.score:.3f})'
+
+
+class Platform(models.Model):
+    """Plateforme matérielle (Arduino, ESP32...) : ses articles sont ceux qui
+    portent l'une de ses étiquettes (voir platforms.py)"""
+    name = models.CharField(max_length=100, unique=True, verbose_name="Nom")
+    slug = models.SlugField(max_length=100, unique=True)
+    tag_slugs = models.CharField(
+        max_length=500,
+        verbose_name="Étiquettes",
+        help_text="Slugs séparés par des virgules; « * » final pour un préfixe (ex. raspberry*)",
+    )
+    icon = models.CharField(max_length=50, default='fas fa-microchip', verbose_name="Icône")
+    color = models.CharField(max_length=7, default='#2563eb', verbose_name="Couleur")
+    color_dark = models.CharField(max_length=7, default='#1e40af', verbose_name="Couleur foncée")
+    summary = models.TextField(blank=True, verbose_name="Résumé (page Robotique)")
+    subtitle = models.TextField(blank=True, verbose_name="Sous-titre")
+    description = models.TextField(blank=True, verbose_name="Présentation")
+    image_url = models.URLField(blank=True, verbose_name="Image")
+    variants_label = models.CharField(max_length=20, blank=True, verbose_name="Nombre de variantes")
+    position = models.PositiveSmallIntegerField(default=0, verbose_name="Position")
+    is_active = models.BooleanField(default=True, verbose_name="Active")
+    post_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Articles")
+
+    class Meta:
+        verbose_name = "Plateforme"
+        verbose_name_plural = "Plateformes"
+        ordering = ['position', 'name']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Mémoriser les étiquettes chargées : seul leur changement oblige à
+        # recalculer l'appartenance des articles
+        if 'tag_slugs' in field_names:
+            instance._loaded_tag_slugs = values[field_names.index('tag_slugs')]
+        return instance
+
+    def __str__(self):
+        return self.name
+
+    def get_absolute_url(self):
+        return reverse('platform_detail', kwargs={'slug': self.slug})
+
+    def get_tag_patterns(self):
+        return [slug.strip().lower() for slug in self.tag_slugs.split(',') if slug.strip()]
+
+
+class PlatformMembership(models.Model):
+    """Article publié rattaché à une plateforme (table dérivée des étiquettes)"""
+    platform = models.ForeignKey(Platform, on_delete=models.CASCADE, related_name='memberships')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='platform_memberships')
+    # Copie de Post.created_at (jamais modifiée) : la liste d'une plateforme
+    # est lue dans l'ordre de l'index
+    post_created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Appartenance à une plateforme"
+        verbose_name_plural = "Appartenances aux plateformes"
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'platform'], name='platform_membership_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['platform', 'post_created_at', 'post'], name='platform_membership_list_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.platform_id} / {self.post_id}'
+
+
+class TagStat(models.Model):
+    """Nombre d'articles publiés par étiquette, au total (catégorie vide) et
+    par catégorie; tenu à jour par les signaux (voir tag_stats.py)"""
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='stats')
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, null=True, blank=True, related_name='tag_stats'
+    )
+    published_count = models.PositiveIntegerField(default=0, verbose_name="Articles publiés")
+
+    class Meta:
+        verbose_name = "Statistique d'étiquette"
+        verbose_name_plural = "Statistiques d'étiquettes"
+        constraints = [
+            # NULL n'est pas égal à NULL pour une contrainte d'unicité
+            models.UniqueConstraint(
+                fields=['tag'], condition=models.Q(category__isnull=True), name='tag_stat_global_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['tag', 'category'], condition=models.Q(category__isnull=False),
+                name='tag_stat_category_uniq',
+            ),
+        ]
+        indexes = [
+            # Nuage d'étiquettes : lecture dans l'ordre de l'index
+            models.Index(fields=['category', '-published_count', 'tag'], name='tag_stat_cloud_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.tag_id} / {self.category_id} : {self.published_count}'
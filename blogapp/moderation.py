@@ -0,0 +1,164 @@
+"""
+Modération en lot des articles et projets soumis.
+
+Chaque lot tient dans une transaction et passe par ``update()`` sur le
+queryset : pas de ``Post.save()`` (temps de lecture, image) ni de signal par
+objet. Les données dérivées que les signaux tiennent d'habitude à jour le
+sont une fois pour tout le lot : index de recherche, plateformes,
+statistiques d'étiquettes, recommandations (après le commit), instantané de
+l'accueil et pages en cache. ``auto_now`` ne s'applique pas à ``update()`` :
+``updated_at`` est avancé explicitement, les cartes et les ETags changent
+avec lui.
+
+Refuser un article le renvoie en brouillon chez son auteur. Refuser un
+projet ne le supprime pas : ``rejected_at`` le masque des listes, de la
+recherche et de l'accueil, sa page reste visible par son auteur (avec la
+mention du refus) et l'équipe peut encore l'approuver depuis l'admin.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import home_cache, page_cache, platforms, recommendations, search_index, tag_stats
+
+
+APPROVE = 'approve'
+REJECT = 'reject'
+ACTIONS = (APPROVE, REJECT)
+
+
+def _pending_posts(post_ids):
+    from .models import Post, PostStatus
+
+    return Post.objects.filter(pk__in=list(post_ids), status=PostStatus.PENDING)
+
+
+def _pending_projects(project_ids):
+    """Projets non approuvés, refusés compris (une approbation annule le refus)"""
+    from .models import Project
+
+    return Project.objects.filter(pk__in=list(project_ids), is_approved=False)
+
+
+def _post_tags(posts):
+    return {'post-list'} | {
+        tag for post in posts for tag in ('post:{}'.format(post.pk), 'category:{}'.format(post.category_id))
+    }
+
+
+def _project_tags(ids):
+    return {'project-list'} | {'project:{}'.format(pk) for pk in ids}
+
+
+def _refresh(tags, home):
+    """Pages en cache et instantané de l'accueil, une fois par requête de modération"""
+    if home:
+        home_cache.invalidate()
+    if tags:
+        page_cache.purge(*tags)
+
+
+# Les fonctions ``_approve_*`` / ``_reject_*`` renvoient (nombre, étiquettes de
+# pages à purger, accueil modifié) sans rien invalider : ``moderate()`` purge
+# une seule fois pour les articles et les projets d'un même lot.
+
+def _approve_posts(post_ids):
+    from .models import Post, PostStatus
+
+    ids = list(_pending_posts(post_ids).values_list('pk', flat=True))
+    if not ids:
+        return 0, set(), False
+    now = timezone.now()
+    Post.objects.filter(pk__in=ids).update(status=PostStatus.PUBLISHED, published_at=now, updated_at=now)
+
+    posts = list(Post.objects.filter(pk__in=ids).prefetch_related('tags'))
+    search_index.index_posts(posts)
+    platforms.sync_posts(posts)
+    tag_ids = {tag.pk for post in posts for tag in post.tags.all()}
+    if tag_ids:
+        tag_stats.refresh(tag_ids)
+    recommendations.schedule(recommendations.POSTS, *ids)
+    return len(ids), _post_tags(posts), True
+
+
+def _reject_posts(post_ids):
+    from .models import Post, PostStatus
+
+    posts = list(_pending_posts(post_ids).only('pk', 'category_id'))
+    if not posts:
+        return 0, set(), False
+    # Ni publiés avant ni après : index, plateformes, étiquettes et accueil inchangés
+    Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+        status=PostStatus.DRAFT, updated_at=timezone.now(),
+    )
+    return len(posts), _post_tags(posts), False
+
+
+def _approve_projects(project_ids):
+    from .models import Project
+
+    projects = list(_pending_projects(project_ids).only('pk', 'rejected_at'))
+    if not projects:
+        return 0, set(), False
+    ids = [project.pk for project in projects]
+    Project.objects.filter(pk__in=ids).update(is_approved=True, rejected_at=None, updated_at=timezone.now())
+    # L'index couvre déjà les projets en attente, pas ceux qui avaient été refusés
+    for project in Project.objects.filter(pk__in=[project.pk for project in projects if project.rejected_at]):
+        search_index.index_project(project)
+    recommendations.schedule(recommendations.PROJECTS, *ids)
+    return len(ids), _project_tags(ids), True
+
+
+def _reject_projects(project_ids):
+    from .models import Project
+
+    ids = list(_pending_projects(project_ids).filter(rejected_at__isnull=True).values_list('pk', flat=True))
+    if not ids:
+        return 0, set(), False
+    now = timezone.now()
+    Project.objects.filter(pk__in=ids).update(rejected_at=now, updated_at=now)
+    for pk in ids:
+        search_index.remove(search_index.PROJECT, pk)
+    # Jamais approuvés : absents des recommandations
+    return len(ids), _project_tags(ids), True
+
+
+def _single(helper, ids):
+    with transaction.atomic():
+        count, tags, home = helper(ids)
+        _refresh(tags, home)
+    return count
+
+
+def approve_posts(post_ids):
+    """Publier les articles en attente parmi ``post_ids``; renvoie leur nombre"""
+    return _single(_approve_posts, post_ids)
+
+
+def reject_posts(post_ids):
+    """Renvoyer en brouillon les articles en attente; renvoie leur nombre"""
+    return _single(_reject_posts, post_ids)
+
+
+def approve_projects(project_ids):
+    """Approuver les projets en attente; renvoie leur nombre"""
+    return _single(_approve_projects, project_ids)
+
+
+def reject_projects(project_ids):
+    """Masquer du site les projets en attente; renvoie leur nombre"""
+    return _single(_reject_projects, project_ids)
+
+
+def moderate(action, post_ids=(), project_ids=()):
+    """Appliquer ``action`` aux articles et projets en une seule transaction;
+    renvoie (nb articles, nb projets)"""
+    if action not in ACTIONS:
+        raise ValueError(action)
+    handle_posts, handle_projects = (
+        (_approve_posts, _approve_projects) if action == APPROVE else (_reject_posts, _reject_projects)
+    )
+    with transaction.atomic():
+        posts, post_tags, post_home = handle_posts(post_ids)
+        projects, project_tags, project_home = handle_projects(project_ids)
+        _refresh(post_tags | project_tags, post_home or project_home)
+    return posts, projects
@@ -0,0 +1,294 @@
+"""
+Cache de pages complètes pour les visiteurs anonymes.
+
+Les réponses sont stockées par chemin + query string normalisée. Chaque
+entrée porte des étiquettes (``post:12``, ``category:3``, ``post-list``...)
+posées par la vue; chaque étiquette a une version dans le cache. Purger une
+étiquette change sa version, ce qui invalide d'un coup toutes les pages qui en
+dépendent, sans avoir à les retrouver.
+
+Sont exclus : les requêtes autres que GET/HEAD, les visiteurs ayant une
+session (connectés ou avec des messages), les réponses qui posent des cookies
+ou qui contiennent des messages.
+
+La page est stockée minifiée, avec ses variantes brotli/gzip : un succès de
+cache renvoie directement la variante acceptée par le navigateur (voir
+compression.py).
+
+Les succès et échecs sont comptés en mémoire, par processus : un succès ne
+fait que des lectures dans le cache partagé. Tous les
+``PAGE_CACHE_STATS_LOG_EVERY`` accès (et à l'arrêt du processus), les
+compteurs de la période sont écrits en JSON sur le logger
+``blogapp.page_cache``; ``page_cache_stats`` additionne ces lignes.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from . import compression
+
+
+KEY_PREFIX = 'blogapp:page:'
+TAG_PREFIX = 'blogapp:tag:'
+STATS_EVENT = 'page_cache'
+
+logger = logging.getLogger('blogapp.page_cache')
+
+_stats_lock = threading.Lock()
+# Depuis le démarrage du processus, et depuis la dernière ligne de journal
+_totals = Counter()
+_window = Counter()
+
+# Paramètres sans effet sur le rendu
+IGNORED_PARAMS = {'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'fbclid', 'gclid'}
+
+
+def add_tags(request, *tags):
+    """Déclarer les objets dont dépend la page en cours de rendu"""
+    if not hasattr(request, '_page_cache_tags'):
+        request._page_cache_tags = set()
+    request._page_cache_tags.update(tags)
+
+
+def set_meta(request, **meta):
+    """Données gardées avec l'entrée et passées à ``on_hit`` (ex. l'id de l'article)"""
+    if not hasattr(request, '_page_cache_meta'):
+        request._page_cache_meta = {}
+    request._page_cache_meta.update(meta)
+
+
+def purge(*tags):
+    """Invalider toutes les pages portant l'une de ces étiquettes"""
+    if not tags:
+        return
+    _bump(tags)
+    # Une page a pu être recalculée avec l'ancien état avant le commit
+    transaction.on_commit(lambda: _bump(tags))
+
+
+def _bump(tags):
+    cache.set_many(
+        {TAG_PREFIX + tag: uuid.uuid4().hex for tag in tags},
+        timeout=None,
+    )
+
+
+def cache_key(request):
+    params = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        if key not in IGNORED_PARAMS
+        for value in values
+        if value != ''
+    )
+    raw = '{}?{}'.format(request.path, urlencode(params))
+    return KEY_PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Session = utilisateur connecté ou messages en attente
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    if 'messages' in request.COOKIES:
+        return False
+    return True
+
+
+def _is_cacheable_response(request, response):
+    if response.status_code != 200 or response.streaming:
+        return False
+    if response.cookies or request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+        return False
+    cache_control = response.get('Cache-Control', '')
+    if 'private' in cache_control or 'no-store' in cache_control:
+        return False
+    storage = getattr(request, '_messages', None)
+    if storage is not None and getattr(storage, '_queued_messages', None):
+        return False
+    return True
+
+
+def tag_versions(tags):
+    """Version courante de chaque étiquette (créée si absente)"""
+    keys = [TAG_PREFIX + tag for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return {key[len(TAG_PREFIX):]: value for key, value in versions.items()}
+
+
+def _is_fresh(entry):
+    tags = entry['tags']
+    if not tags:
+        return True
+    current = cache.get_many([TAG_PREFIX + tag for tag in tags])
+    return all(current.get(TAG_PREFIX + tag) == version for tag, version in tags.items())
+
+
+def _use_variant(request, response, encoded):
+    """Remplacer le corps par la variante compressée acceptée, si stockée"""
+    coding = compression.negotiate(request)
+    if coding in encoded:
+        response.content = encoded[coding]
+        compression.set_encoding(response, coding)
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+
+def _count(stat):
+    with _stats_lock:
+        _totals[stat] += 1
+        _window[stat] += 1
+        due = sum(_window.values()) >= getattr(settings, 'PAGE_CACHE_STATS_LOG_EVERY', 1000)
+    if due:
+        log_stats()
+
+
+def _with_rate(counts):
+    stats = {'hits': counts.get('hits', 0), 'misses': counts.get('misses', 0)}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def get_stats():
+    """Succès et échecs de ce processus depuis son démarrage"""
+    with _stats_lock:
+        return _with_rate(_totals)
+
+
+def reset_stats():
+    with _stats_lock:
+        _totals.clear()
+        _window.clear()
+
+
+@atexit.register
+def log_stats():
+    """Écrire les compteurs de la période en cours et les remettre à zéro"""
+    with _stats_lock:
+        window = dict(_window)
+        _window.clear()
+    if window:
+        logger.info(json.dumps({'event': STATS_EVENT, 'pid': os.getpid(), **_with_rate(window)}))
+
+
+def read_stats(lines):
+    """Additionner les lignes de ``log_stats`` d'un journal (tous processus)"""
+    totals = Counter()
+    for line in lines:
+        start = line.find('{')
+        if start < 0:
+            continue
+        try:
+            record = json.loads(line[start:])
+        except ValueError:
+            continue
+        if isinstance(record, dict) and record.get('event') == STATS_EVENT:
+            totals.update({'hits': record.get('hits', 0), 'misses': record.get('misses', 0)})
+    return _with_rate(totals)
+
+
+def _lookup(request, key, on_hit):
+    """Réponse servie depuis le cache, ``None`` si l'entrée manque ou est périmée"""
+    entry = cache.get(key)
+    if entry is None or not _is_fresh(entry):
+        _count('misses')
+        return None
+    _count('hits')
+    if on_hit is not None:
+        on_hit(request, entry['meta'])
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for header, value in entry['headers'].items():
+        response[header] = value
+    response._html_minified = True
+    _use_variant(request, response, entry.get('encoded', {}))
+    response['X-Page-Cache'] = 'HIT'
+    # Validateurs posés par la vue (voir conditional.py) : 304 sans renvoyer
+    # la page
+    if response.has_header('ETag'):
+        return get_conditional_response(request, etag=response['ETag'], response=response)
+    return response
+
+
+def _store(request, key, response):
+    if not _is_cacheable_response(request, response):
+        return
+    compression.minify_response(response)
+    encoded = {}
+    if compression.is_compressible(response) and getattr(settings, 'COMPRESSION_ENABLED', True):
+        encoded = compression.encode_variants(response.content)
+    tags = getattr(request, '_page_cache_tags', set())
+    headers = {
+        header: response[header]
+        for header in ('Content-Type', 'Content-Language', 'ETag', 'Last-Modified', 'Vary')
+        if response.has_header(header)
+    }
+    cache.set(key, {
+        'content': response.content,
+        'encoded': encoded,
+        'status': response.status_code,
+        'headers': headers,
+        'tags': tag_versions(sorted(tags)),
+        'meta': getattr(request, '_page_cache_meta', {}),
+    }, getattr(settings, 'PAGE_CACHE_TIMEOUT', 600))
+    response['X-Page-Cache'] = 'MISS'
+    _use_variant(request, response, encoded)
+
+
+def _is_enabled(request):
+    return getattr(settings, 'PAGE_CACHE_ENABLED', True) and _is_cacheable_request(request)
+
+
+def cache_page_for_anonymous(view=None, on_hit=None):
+    """Décorateur de vue (synchrone ou asynchrone); ``on_hit(request, meta)``
+    est appelé sur un succès de cache"""
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not _is_enabled(request):
+                    return await view_func(request, *args, **kwargs)
+                key = cache_key(request)
+                response = await sync_to_async(_lookup)(request, key, on_hit)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                    await sync_to_async(_store)(request, key, response)
+                return response
+
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _is_enabled(request):
+                return view_func(request, *args, **kwargs)
+            key = cache_key(request)
+            response = _lookup(request, key, on_hit)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                _store(request, key, response)
+            return response
+
+        return wrapper
+
+    if view is not None:
+        return decorator(view)
+    return decorator
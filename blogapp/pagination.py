@@ -0,0 +1,194 @@
+"""
+Pagination par curseur (keyset).
+
+Au lieu de ``COUNT(*)`` + ``OFFSET``, chaque page filtre sur la clé de tri de
+la dernière ligne vue (``created_at, id`` par exemple) : une page profonde
+coûte autant que la première. Les curseurs sont opaques (base64) et les
+anciens liens ``?page=N`` restent valides pour les premières pages.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorPage:
+    def __init__(self, object_list, per_page, has_next=False, has_previous=False,
+                 next_cursor=None, previous=None, number=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        # (paramètre, valeur) du lien précédent; valeur None = première page
+        self.previous = previous
+        self.number = number
+        self.count = None
+        self.first_query = self.next_query = self.previous_query = ''
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class CursorPaginator:
+    """Paginer un queryset selon ``ordering`` (ex. ``['-created_at', '-id']``)"""
+
+    def __init__(self, queryset, per_page, ordering, legacy_pages=None):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        if legacy_pages is None:
+            legacy_pages = getattr(settings, 'PAGINATION_LEGACY_PAGES', 5)
+        self.legacy_pages = legacy_pages
+
+    # Curseurs
+
+    def encode_cursor(self, obj):
+        values = []
+        for name, _ in self.ordering:
+            value = getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            values = json.loads(raw)
+        except (ValueError, TypeError) as exc:
+            raise InvalidCursor(token) from exc
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor(token)
+        model = self.queryset.model
+        try:
+            return [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, values)
+            ]
+        except Exception as exc:
+            raise InvalidCursor(token) from exc
+
+    def _seek(self, values, forward):
+        """Q() des lignes situées après (forward) ou avant la clé ``values``"""
+        condition = Q()
+        for i, (name, descending) in enumerate(self.ordering):
+            lookup = '{}__{}'.format(name, 'lt' if descending == forward else 'gt')
+            clause = Q(**{lookup: values[i]})
+            for j, (previous_name, _) in enumerate(self.ordering[:i]):
+                clause &= Q(**{previous_name: values[j]})
+            condition |= clause
+        return condition
+
+    def _reversed_ordering(self):
+        return [('' if descending else '-') + name for name, descending in self.ordering]
+
+    # Pages
+
+    def page_for_request(self, request, with_count=False, prefix=''):
+        """``prefix`` distingue les paramètres de plusieurs listes paginées
+        sur la même page (``posts_after``...)"""
+        params = request.GET.copy()
+        after = params.pop(prefix + 'after', [None])[-1]
+        before = params.pop(prefix + 'before', [None])[-1]
+        page = params.pop(prefix + 'page', [None])[-1]
+        base = params.urlencode()
+
+        try:
+            if after:
+                page_obj = self._page_after(self.decode_cursor(after))
+            elif before:
+                page_obj = self._page_before(self.decode_cursor(before))
+            else:
+                page_obj = self._legacy_page(page)
+        except InvalidCursor:
+            page_obj = self._legacy_page(None)
+
+        page_obj.first_query = base
+        if page_obj.has_next:
+            page_obj.next_query = self._query(base, prefix + 'after', page_obj.next_cursor)
+        if page_obj.has_previous:
+            key, value = page_obj.previous
+            page_obj.previous_query = self._query(base, prefix + key, value)
+        if with_count:
+            page_obj.count = self.queryset.count()
+        return page_obj
+
+    @staticmethod
+    def _query(base, key, value):
+        if value is None:
+            return base
+        part = '{}={}'.format(key, value)
+        return '{}&{}'.format(base, part) if base else part
+
+    def _legacy_page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if number < 1 or number > self.legacy_pages:
+            number = 1
+
+        offset = (number - 1) * self.per_page
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        if not rows and number > 1:
+            return self._legacy_page(1)
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows, self.per_page,
+            has_next=has_next,
+            has_previous=number > 1,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next else None,
+            previous=('page', number - 1 if number > 2 else None),
+            number=number,
+        )
+
+    def _page_after(self, values):
+        rows = list(self.queryset.filter(self._seek(values, forward=True))[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows, self.per_page,
+            has_next=has_next,
+            has_previous=True,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next else None,
+            previous=('before', self.encode_cursor(rows[0])) if rows else ('page', None),
+        )
+
+    def _page_before(self, values):
+        rows = list(
+            self.queryset.filter(self._seek(values, forward=False))
+            .order_by(*self._reversed_ordering())[:self.per_page + 1]
+        )
+        if len(rows) <= self.per_page:
+            # On est revenu au début de la liste
+            return self._legacy_page(1)
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(
+            rows, self.per_page,
+            has_next=True,
+            has_previous=True,
+            next_cursor=self.encode_cursor(rows[-1]),
+            previous=('before', self.encode_cursor(rows[0])),
+        )
+
+
+def paginate(request, queryset, per_page, ordering, with_count=False, prefix=''):
+    return CursorPaginator(queryset, per_page, ordering).page_for_request(
+        request, with_count=with_count, prefix=prefix
+    )
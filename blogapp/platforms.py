@@ -0,0 +1,180 @@
+"""
+Plateformes matérielles (Arduino, ESP32, Raspberry Pi...) et leurs articles.
+
+Une plateforme est une ligne de ``Platform`` (nom, couleurs, textes et
+étiquettes associées), modifiable dans l'admin : en ajouter une ne demande
+aucun changement de code. ``PlatformMembership`` relie chaque article publié
+aux plateformes dont il porte une étiquette; les signaux la tiennent à jour
+avec ``Platform.post_count``. Les pages lisent cette table par index au lieu
+d'un ``LIKE`` sur la jointure taggit, et la liste des plateformes actives est
+gardée dans le cache.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+CACHE_KEY = 'blogapp:platforms'
+
+
+def matches(patterns, slug):
+    """Vrai si le slug d'étiquette correspond à l'un des motifs (``*`` final = préfixe)"""
+    for pattern in patterns:
+        if pattern.endswith('*'):
+            if slug.startswith(pattern[:-1]):
+                return True
+        elif slug == pattern:
+            return True
+    return False
+
+
+def get_platforms():
+    """Plateformes actives, avec leur nombre d'articles"""
+    from .models import Platform
+
+    platforms = cache.get(CACHE_KEY)
+    if platforms is None:
+        platforms = list(Platform.objects.filter(is_active=True))
+        cache.set(CACHE_KEY, platforms, getattr(settings, 'PLATFORM_CACHE_TIMEOUT', 3600))
+    return platforms
+
+
+def get_platform(slug):
+    for platform in get_platforms():
+        if platform.slug == slug:
+            return platform
+    return None
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
+
+
+def refresh_counts(platform_ids=None):
+    from .models import Platform, PlatformMembership
+
+    counts = PlatformMembership.objects.filter(platform=OuterRef('pk')).order_by().values(
+        'platform').annotate(total=Count('*')).values('total')
+    platforms = Platform.objects.all()
+    if platform_ids is not None:
+        platforms = platforms.filter(pk__in=list(platform_ids))
+    platforms.update(post_count=Coalesce(Subquery(counts), Value(0)))
+    invalidate()
+
+
+def sync_post(post):
+    """Mettre à jour les plateformes d'un article (enregistrement, étiquettes)"""
+    sync_posts([post])
+
+
+def sync_posts(posts):
+    """Mettre à jour les plateformes de plusieurs articles en une fois
+    (étiquettes préchargées si possible)"""
+    from .models import Platform, PlatformMembership, PostStatus
+
+    posts = list(posts)
+    if not posts:
+        return
+    patterns = None
+    wanted = set()
+    for post in posts:
+        if post.status != PostStatus.PUBLISHED:
+            continue
+        slugs = [tag.slug for tag in post.tags.all()]
+        if not slugs:
+            continue
+        if patterns is None:
+            patterns = [(platform.pk, platform.get_tag_patterns()) for platform in Platform.objects.only('tag_slugs')]
+        for platform_id, platform_patterns in patterns:
+            if any(matches(platform_patterns, slug) for slug in slugs):
+                wanted.add((platform_id, post.pk))
+
+    current = set(PlatformMembership.objects.filter(
+        post_id__in=[post.pk for post in posts]).values_list('platform_id', 'post_id'))
+    if wanted == current:
+        return
+    removed = Q(pk__in=[])
+    for platform_id, post_id in current - wanted:
+        removed |= Q(platform_id=platform_id, post_id=post_id)
+    if current - wanted:
+        PlatformMembership.objects.filter(removed).delete()
+    created_at = {post.pk: post.created_at for post in posts}
+    PlatformMembership.objects.bulk_create([
+        PlatformMembership(platform_id=platform_id, post_id=post_id, post_created_at=created_at[post_id])
+        for platform_id, post_id in wanted - current
+    ])
+    refresh_counts({platform_id for platform_id, _ in wanted ^ current})
+
+
+def rebuild_platform(platform):
+    """Recalculer les articles d'une plateforme (étiquettes modifiées)"""
+    from django.contrib.contenttypes.models import ContentType
+    from taggit.models import Tag, TaggedItem
+    from .models import Post, PlatformMembership, PostStatus
+
+    condition = Q(pk__in=[])
+    for pattern in platform.get_tag_patterns():
+        if pattern.endswith('*'):
+            condition |= Q(slug__startswith=pattern[:-1])
+        else:
+            condition |= Q(slug=pattern)
+    tagged = TaggedItem.objects.filter(
+        content_type=ContentType.objects.get_for_model(Post),
+        tag__in=Tag.objects.filter(condition),
+    ).values('object_id')
+    posts = Post.objects.filter(pk__in=tagged, status=PostStatus.PUBLISHED).values_list('pk', 'created_at')
+
+    PlatformMembership.objects.filter(platform=platform).delete()
+    PlatformMembership.objects.bulk_create([
+        PlatformMembership(platform=platform, post_id=pk, post_created_at=created_at)
+        for pk, created_at in posts.iterator(chunk_size=2000)
+    ], batch_size=1000)
+    refresh_counts([platform.pk])
+
+
+def rebuild():
+    """Recalculer toutes les appartenances; retourne le nombre de plateformes"""
+    from .models import Platform
+
+    platforms = list(Platform.objects.all())
+    for platform in platforms:
+        rebuild_platform(platform)
+    return len(platforms)
+
+
+def posts_for(platform):
+    """Articles publiés d'une plateforme (objet ou id), du plus récent au plus ancien"""
+    from .models import Post, PostStatus
+
+    return Post.objects.filter(
+        platform_memberships__platform_id=getattr(platform, 'pk', platform), status=PostStatus.PUBLISHED,
+    ).order_by('-platform_memberships__post_created_at', '-platform_memberships__post_id')
+
+
+def latest_queryset(platform_ids, per_platform=3):
+    """Les ``per_platform`` derniers articles de chaque plateforme : une
+    sous-requête par plateforme, lue dans l'index, réunies en UNION ALL.
+    L'ORM refuse LIMIT dans une requête composée sous SQLite : chaque partie
+    est donc enveloppée dans un SELECT."""
+    from .models import Post
+
+    parts, params = [], []
+    for pk in platform_ids:
+        queryset = posts_for(pk).annotate(platform_id=Value(pk))[:per_platform]
+        sql, part_params = queryset.query.sql_with_params()
+        parts.append('SELECT * FROM ({})'.format(sql))
+        params.extend(part_params)
+    if not parts:
+        return []
+    return Post.objects.raw(' UNION ALL '.join(parts), params)
+
+
+def latest_posts(platforms, per_platform=3):
+    """Derniers articles de chaque plateforme en une requête : {platform_id: [post, ...]}"""
+    latest = {platform.pk: [] for platform in platforms}
+    for post in latest_queryset(latest, per_platform):
+        latest[post.platform_id].append(post)
+    return latest
@@ -0,0 +1,172 @@
+"""
+Vérification des plans d'exécution des requêtes chaudes.
+
+Chaque entrée de ``_checks()`` reproduit un queryset de ``views.py`` (mêmes
+filtres, même tri, même LIMIT). ``check()`` passe chacun à ``EXPLAIN QUERY
+PLAN`` et signale les parcours complets de table et les tris en B-tree
+temporaire : un index manquant ou un tri modifié se voit ainsi en test, pas
+en production. SQLite uniquement.
+"""
+import re
+from datetime import datetime, timezone
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+
+_SCAN_RE = re.compile(r'\bSCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+_TEMP_SORT = 'USE TEMP B-TREE'
+
+# Valeurs fictives : le plan ne dépend pas des lignes présentes
+_SAMPLE_ID = 1
+_SAMPLE_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class Check:
+    def __init__(self, name, build, allow_index_scan=False):
+        self.name = name
+        self.build = build
+        # Parcours ordonné d'un index avec LIMIT (liste sans filtre)
+        self.allow_index_scan = allow_index_scan
+
+
+def _posts_page(queryset, cursor=False):
+    from .pagination import CursorPaginator
+    from .views import POST_ORDERING
+
+    paginator = CursorPaginator(queryset, 9, POST_ORDERING)
+    if cursor:
+        return paginator.queryset.filter(
+            paginator._seek([_SAMPLE_DATE, _SAMPLE_ID], forward=True)
+        )[:10]
+    return paginator.queryset[:10]
+
+
+def _projects_page(queryset):
+    from .pagination import CursorPaginator
+    from .views import PROJECT_ORDERING
+
+    return CursorPaginator(queryset, 6, PROJECT_ORDERING).queryset[:7]
+
+
+def _published():
+    from .models import Post, PostStatus
+
+    return Post.objects.filter(status=PostStatus.PUBLISHED)
+
+
+def _tag_cloud(category_id):
+    from .models import TagStat
+
+    return TagStat.objects.filter(category_id=category_id).select_related(
+        'tag').order_by('-published_count', 'tag')[:10]
+
+
+def _platform_posts():
+    from .platforms import posts_for
+
+    return posts_for(_SAMPLE_ID).select_related('author', 'category')
+
+
+def _latest_platform_posts():
+    from .platforms import latest_queryset
+
+    return latest_queryset([_SAMPLE_ID, _SAMPLE_ID + 1])
+
+
+def _checks():
+    from .conditional import newest, post_detail_row
+    from .models import Comment, Post, PostStatus, Project
+
+    return [
+        Check('post_list', lambda: _posts_page(
+            _published().select_related('author', 'category'))),
+        Check('post_list (curseur)', lambda: _posts_page(
+            _published().select_related('author', 'category'), cursor=True)),
+        Check('category_posts', lambda: _posts_page(
+            _published().filter(category_id=_SAMPLE_ID).select_related('author'))),
+        Check('post_list (étiquettes populaires)', lambda: _tag_cloud(None)),
+        Check('category_posts (étiquettes)', lambda: _tag_cloud(_SAMPLE_ID)),
+        Check('category_posts (total)', lambda: _published().filter(category_id=_SAMPLE_ID).order_by()),
+        Check('post_detail (similaires)', lambda: _published().filter(
+            category_id=_SAMPLE_ID).exclude(id=_SAMPLE_ID)[:3]),
+        Check('post_detail (recommandations)', lambda: _published().filter(
+            recommended_in__source_id=_SAMPLE_ID).order_by('recommended_in__rank')[:3]),
+        Check('post_detail (précédent)', lambda: _published().filter(
+            created_at__lt=_SAMPLE_DATE).order_by('-created_at')[:1]),
+        Check('post_detail (suivant)', lambda: _published().filter(
+            created_at__gt=_SAMPLE_DATE).order_by('created_at')[:1]),
+        Check('post_detail (commentaires)', lambda: Comment.objects.filter(
+            post_id=_SAMPLE_ID, is_approved=True).select_related('author').order_by('created_at', 'id')),
+        Check('home (articles récents)', lambda: _published().select_related(
+            'author', 'category').defer('content')[:6]),
+        Check('home (projets mis en avant)', lambda: Project.objects.filter(
+            is_featured=True, rejected_at__isnull=True).order_by('-created_at')[:3]),
+        Check('platform_detail', lambda: _platform_posts()[:6]),
+        Check('robotics_posts (plateformes)', _latest_platform_posts),
+        Check('profile (articles)', lambda: _posts_page(
+            Post.objects.filter(author_id=_SAMPLE_ID).select_related('category'))),
+        Check('projects', lambda: _projects_page(Project.objects.filter(rejected_at__isnull=True)),
+              allow_index_scan=True),
+        Check('projects (type)', lambda: _projects_page(
+            Project.objects.filter(project_type='robotics', rejected_at__isnull=True))),
+        Check('project_detail (similaires)', lambda: Project.objects.filter(
+            project_type='robotics', rejected_at__isnull=True).exclude(id=_SAMPLE_ID)[:3]),
+        Check('project_detail (recommandations)', lambda: Project.objects.filter(
+            recommended_in__source_id=_SAMPLE_ID).order_by('recommended_in__rank')[:3]),
+        Check('post_list (validateur)', lambda: newest(_published())),
+        Check('post_detail (validateur)', lambda: post_detail_row('exemple')[:1]),
+        Check('projects (validateur)', lambda: newest(Project.objects.filter(rejected_at__isnull=True)),
+              allow_index_scan=True),
+        Check('project_detail (validateur)', lambda: Project.objects.filter(slug='exemple').values_list(
+            'pk', 'updated_at')[:1]),
+        Check('moderation (articles)', lambda: _posts_page(
+            Post.objects.filter(status=PostStatus.PENDING).select_related('submitted_by', 'category'))),
+        Check('moderation (projets)', lambda: _projects_page(
+            Project.objects.filter(is_approved=False, rejected_at__isnull=True).select_related('submitted_by'))),
+    ]
+
+
+def explain(queryset):
+    """Lignes de ``EXPLAIN QUERY PLAN`` du queryset (ou d'une requête ``raw()``)"""
+    if hasattr(queryset.query, 'sql_with_params'):
+        sql, params = queryset.query.sql_with_params()
+    else:
+        sql, params = queryset.query.sql, queryset.query.params
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def partial_indexes():
+    """Noms des index partiels : les parcourir ne lit que les lignes filtrées"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")
+        return {name for name, sql in cursor.fetchall() if ' WHERE ' in sql.upper()}
+
+
+def problems(plan, allow_index_scan=False, partial=frozenset()):
+    found = []
+    for line in plan:
+        if _TEMP_SORT in line:
+            found.append(line)
+            continue
+        match = _SCAN_RE.search(line)
+        if match is None:
+            continue
+        index = match.group(2)
+        if index is None or not (allow_index_scan or index in partial):
+            found.append(line)
+    return found
+
+
+def check():
+    """Liste de (nom, plan, problèmes) pour chaque requête vérifiée"""
+    if connection.vendor != 'sqlite':
+        raise ImproperlyConfigured('La vérification des plans ne gère que SQLite')
+    partial = partial_indexes()
+    results = []
+    for item in _checks():
+        plan = explain(item.build())
+        results.append((item.name, plan, problems(plan, item.allow_index_scan, partial)))
+    return results
@@ -0,0 +1,486 @@
+"""
+Recommandations précalculées (« articles similaires », « projets similaires »).
+
+Chaque article publié et chaque projet approuvé est décrit par un vecteur
+creux (dictionnaire caractéristique -> poids) en quatre blocs : étiquettes
+(technologies pour un projet), catégorie (type de projet), niveau de
+difficulté et TF-IDF du texte sans HTML. Chaque bloc est normalisé puis
+pondéré par ``WEIGHTS``, et le vecteur entier est ramené à une norme de 1 :
+le produit scalaire de deux vecteurs est leur cosinus.
+
+``build()`` calcule les ``TOP_K`` voisins de chaque document et remplace le
+contenu de ``PostRecommendation`` / ``ProjectRecommendation``; les pages de
+détail les lisent en une requête indexée. Les candidats viennent d'un index
+inversé limité aux ``MAX_POSTINGS`` documents les plus récents par
+caractéristique, sans les termes trop fréquents : le calcul reste
+proportionnel au nombre de documents.
+
+``update_post()`` / ``update_project()`` ne recalculent que le voisinage d'un
+document modifié : sa propre liste et sa place dans celles des documents qui
+le recommandent ou devraient le recommander. Les IDF utilisés sont ceux du
+dernier calcul complet, gardés en cache; s'ils n'y sont plus, la mise à jour
+attend le prochain ``build()`` (``build_recommendations``) plutôt que de
+relire tout le corpus pendant une requête.
+"""
+import heapq
+import html
+import math
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from . import page_cache
+
+
+TOP_K = 6
+# Taille maximale d'une liste de l'index inversé (documents les plus récents)
+MAX_POSTINGS = 100
+# Un terme présent dans plus de cette part des documents ne sert pas à
+# trouver des candidats (il compte quand même dans le score)
+MAX_DF = 0.2
+# Termes gardés par document, et termes utilisés pour chercher des candidats
+TERMS_PER_DOC = 30
+QUERY_TERMS = 10
+# Candidats dont le score exact est calculé, en multiple de TOP_K
+RESCORE_FACTOR = 4
+
+WEIGHTS = {'tag': 0.45, 'text': 0.35, 'group': 0.15, 'level': 0.05}
+
+IDF_CACHE_KEY = 'blogapp:reco-idf:{}'
+
+_WORD_RE = re.compile(r'[^\W\d_]{3,}', re.UNICODE)
+# Seuls les mots comptent : inutile de passer par un vrai analyseur HTML
+_TAG_RE = re.compile(r'<[^>]*>')
+
+STOP_WORDS = frozenset('''
+    les des une est pas que qui dans pour par sur avec plus son ses aux
+    mais comme tout tous tres bien peut sont ont cette ces nous vous ils
+    elle elles leur leurs notre votre entre sans sous fait faire aussi
+    donc alors encore avant apres quand comment etre avoir the and for
+    with this that from are you your can will not have has
+'''.split())
+
+
+def term_counts(text):
+    """Occurrences des mots d'un texte (HTML accepté), sans les mots vides"""
+    counts = Counter(_WORD_RE.findall(html.unescape(_TAG_RE.sub(' ', text or '')).lower()))
+    for word in STOP_WORDS & counts.keys():
+        del counts[word]
+    return counts
+
+
+class Document:
+    def __init__(self, pk, tags, group, level, text):
+        self.pk = pk
+        self.tags = {tag.strip().lower() for tag in tags if tag.strip()}
+        self.group = group
+        self.level = level
+        self.terms = term_counts(text)
+        self.vector = {}
+        # Caractéristiques utilisées pour trouver des candidats
+        self.keys = []
+
+
+def _block(features, weight):
+    norm = math.sqrt(sum(value * value for value in features.values()))
+    if not norm:
+        return {}
+    scale = math.sqrt(weight) / norm
+    return {key: value * scale for key, value in features.items()}
+
+
+class Idf:
+    """Fréquences documentaires du corpus"""
+
+    def __init__(self, documents=0, frequencies=None):
+        self.documents = documents
+        self.frequencies = frequencies or {}
+
+    @classmethod
+    def from_documents(cls, documents):
+        frequencies = Counter()
+        for document in documents:
+            frequencies.update(document.terms.keys())
+        return cls(len(documents), dict(frequencies))
+
+    def weight(self, term):
+        return math.log((1 + self.documents) / (1 + self.frequencies.get(term, 0))) + 1
+
+    def is_selective(self, term):
+        return self.frequencies.get(term, 0) <= max(1, MAX_DF * self.documents)
+
+
+def vectorize(document, idf):
+    weighted = {
+        term: (1 + math.log(count)) * idf.weight(term)
+        for term, count in document.terms.items()
+    }
+    top_terms = heapq.nlargest(TERMS_PER_DOC, weighted.items(), key=itemgetter(1))
+
+    vector = {}
+    vector.update(_block({'t:' + tag: 1.0 for tag in document.tags}, WEIGHTS['tag']))
+    vector.update(_block({'w:' + term: weight for term, weight in top_terms}, WEIGHTS['text']))
+    if document.group:
+        vector.update(_block({'g:{}'.format(document.group): 1.0}, WEIGHTS['group']))
+    if document.level:
+        vector.update(_block({'l:' + document.level: 1.0}, WEIGHTS['level']))
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if norm:
+        vector = {key: value / norm for key, value in vector.items()}
+
+    document.vector = vector
+    document.keys = ['t:' + tag for tag in document.tags] + [
+        'w:' + term for term, _ in top_terms[:QUERY_TERMS] if idf.is_selective(term)
+    ]
+    return vector
+
+
+def similarity(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b[key] for key, value in a.items() if key in b)
+
+
+class Neighbourhood:
+    """Index inversé : caractéristique -> documents les plus récents"""
+
+    def __init__(self, documents):
+        self.documents = {document.pk: document for document in documents}
+        self.postings = defaultdict(list)
+        self.groups = defaultdict(list)
+        for document in sorted(documents, key=lambda d: d.pk, reverse=True):
+            for key in document.keys:
+                posting = self.postings[key]
+                if len(posting) < MAX_POSTINGS:
+                    posting.append(document)
+            group = self.groups[document.group]
+            if len(group) < MAX_POSTINGS:
+                group.append(document)
+
+    def neighbours(self, document, k=TOP_K):
+        """Liste de (score, pk) des k documents les plus proches"""
+        partial = defaultdict(float)
+        for key in document.keys:
+            weight = document.vector[key]
+            for other in self.postings.get(key, ()):
+                partial[other.pk] += weight * other.vector[key]
+        partial.pop(document.pk, None)
+
+        candidates = heapq.nlargest(k * RESCORE_FACTOR, partial.items(), key=itemgetter(1))
+        candidates = {pk for pk, _ in candidates}
+        if len(candidates) < k:
+            # Document isolé : compléter avec les plus récents du même groupe
+            candidates.update(other.pk for other in self.groups.get(document.group, ()))
+            candidates.discard(document.pk)
+
+        scored = (
+            (similarity(document.vector, self.documents[pk].vector), pk)
+            for pk in candidates
+        )
+        return heapq.nlargest(k, (item for item in scored if item[0] > 0))
+
+
+class Source(ABC):
+    """Accès aux documents d'un type (articles ou projets)"""
+
+    kind = None
+
+    @property
+    @abstractmethod
+    def model(self):
+        pass
+
+    @abstractmethod
+    def documents(self, pks=None):
+        pass
+
+    @abstractmethod
+    def related_ids(self, document):
+        """Documents partageant une étiquette ou le groupe (incrémental)"""
+
+    @abstractmethod
+    def purge(self, pks):
+        pass
+
+    @abstractmethod
+    def purge_all(self):
+        pass
+
+
+class PostSource(Source):
+    kind = 'post'
+
+    @property
+    def model(self):
+        from .models import PostRecommendation
+        return PostRecommendation
+
+    def published(self):
+        from .models import Post, PostStatus
+        return Post.objects.filter(status=PostStatus.PUBLISHED)
+
+    def _tagged_items(self):
+        from django.contrib.contenttypes.models import ContentType
+        from taggit.models import TaggedItem
+        from .models import Post
+
+        return TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(Post))
+
+    def _tags(self, pks=None):
+        items = self._tagged_items()
+        if pks is not None:
+            items = items.filter(object_id__in=pks)
+        tags = defaultdict(list)
+        for object_id, slug in items.values_list('object_id', 'tag__slug').iterator(chunk_size=5000):
+            tags[object_id].append(slug)
+        return tags
+
+    def documents(self, pks=None):
+        queryset = self.published().order_by()
+        if pks is not None:
+            pks = list(pks)
+            queryset = queryset.filter(pk__in=pks)
+        tags = self._tags(pks)
+        rows = queryset.values_list(
+            'pk', 'category_id', 'difficulty_level', 'title', 'excerpt', 'content'
+        ).iterator(chunk_size=1000)
+        return [
+            Document(pk, tags.get(pk, ()), category_id, level,
+                     ' '.join((title, excerpt, content)))
+            for pk, category_id, level, title, excerpt, content in rows
+        ]
+
+    def related_ids(self, document):
+        ids = set(self.published().filter(category_id=document.group).order_by(
+            '-created_at', '-id').values_list('pk', flat=True)[:MAX_POSTINGS])
+        if document.tags:
+            ids.update(self._tagged_items().filter(tag__slug__in=document.tags).order_by(
+                '-object_id').values_list('object_id', flat=True)[:MAX_POSTINGS * len(document.tags)])
+        return ids
+
+    def purge(self, pks):
+        page_cache.purge(*('post:{}'.format(pk) for pk in pks))
+
+    def purge_all(self):
+        # Chaque page d'article porte l'étiquette de sa catégorie
+        from .models import Category
+        page_cache.purge('post-list', *(
+            'category:{}'.format(pk) for pk in Category.objects.values_list('pk', flat=True)
+        ))
+
+
+class ProjectSource(Source):
+    kind = 'project'
+
+    @property
+    def model(self):
+        from .models import ProjectRecommendation
+        return ProjectRecommendation
+
+    def published(self):
+        from .models import Project
+        return Project.objects.filter(is_approved=True)
+
+    def documents(self, pks=None):
+        queryset = self.published().order_by()
+        if pks is not None:
+            queryset = queryset.filter(pk__in=list(pks))
+        rows = queryset.values_list(
+            'pk', 'project_type', 'technologies', 'title', 'description'
+        ).iterator(chunk_size=1000)
+        return [
+            Document(pk, technologies.split(','), project_type, None,
+                     ' '.join((title, description)))
+            for pk, project_type, technologies, title, description in rows
+        ]
+
+    def related_ids(self, document):
+        queryset = self.published().order_by('-created_at', '-id')
+        ids = set(queryset.filter(project_type=document.group).values_list('pk', flat=True)[:MAX_POSTINGS])
+        for tag in document.tags:
+            ids.update(queryset.filter(technologies__icontains=tag).values_list('pk', flat=True)[:MAX_POSTINGS])
+        return ids
+
+    def purge(self, pks):
+        page_cache.purge(*('project:{}'.format(pk) for pk in pks))
+
+    def purge_all(self):
+        page_cache.purge('project-list')
+
+
+POSTS = PostSource()
+PROJECTS = ProjectSource()
+
+
+def _rows(source, pk, neighbours):
+    return [
+        source.model(source_id=pk, target_id=target, rank=rank, score=score)
+        for rank, (score, target) in enumerate(neighbours, start=1)
+    ]
+
+
+def _save_idf(source, idf):
+    cache.set(IDF_CACHE_KEY.format(source.kind), (idf.documents, idf.frequencies), timeout=None)
+
+
+def _load_idf(source):
+    """IDF du dernier calcul complet, ou None s'ils ne sont plus en cache"""
+    stored = cache.get(IDF_CACHE_KEY.format(source.kind))
+    return None if stored is None else Idf(*stored)
+
+
+def compute(documents, k=TOP_K):
+    """Voisins de chaque document du corpus : (idf, {pk: [(score, pk), ...]})"""
+    idf = Idf.from_documents(documents)
+    for document in documents:
+        vectorize(document, idf)
+    neighbourhood = Neighbourhood(documents)
+    return idf, {document.pk: neighbourhood.neighbours(document, k) for document in documents}
+
+
+def build(source, k=TOP_K, batch_size=1000):
+    """Recalculer toutes les recommandations d'un type; retourne (documents, lignes)"""
+    documents = source.documents()
+    idf, neighbours = compute(documents, k)
+
+    rows = []
+    for pk, found in neighbours.items():
+        rows.extend(_rows(source, pk, found))
+
+    with transaction.atomic():
+        source.model.objects.all().delete()
+        source.model.objects.bulk_create(rows, batch_size=batch_size)
+    _save_idf(source, idf)
+    source.purge_all()
+    return len(documents), len(rows)
+
+
+def build_all(k=TOP_K):
+    return {'posts': build(POSTS, k), 'projects': build(PROJECTS, k)}
+
+
+def update(source, pk, k=TOP_K):
+    """Recalculer le voisinage d'un document après modification"""
+    model = source.model
+    found = source.documents([pk])
+    current_sources = set(model.objects.filter(target_id=pk).values_list('source_id', flat=True))
+
+    with transaction.atomic():
+        if not found:
+            # Dépublié : il sort des listes (elles gardent un voisin de moins
+            # jusqu'au prochain calcul complet)
+            model.objects.filter(Q(source_id=pk) | Q(target_id=pk)).delete()
+            source.purge(current_sources)
+            return
+
+        document = found[0]
+        idf = _load_idf(source)
+        if idf is None:
+            return
+        vectorize(document, idf)
+        candidates = source.documents((source.related_ids(document) | current_sources) - {pk})
+        for candidate in candidates:
+            vectorize(candidate, idf)
+
+        own = heapq.nlargest(k, (
+            item for item in ((similarity(document.vector, c.vector), c.pk) for c in candidates)
+            if item[0] > 0
+        ))
+
+        # Place du document dans la liste de chaque candidat
+        existing = defaultdict(list)
+        for source_id, target_id, score in model.objects.filter(
+            source_id__in=[candidate.pk for candidate in candidates]
+        ).values_list('source_id', 'target_id', 'score'):
+            existing[source_id].append((score, target_id))
+
+        changed = {}
+        for candidate in candidates:
+            before = sorted(existing[candidate.pk], reverse=True)
+            others = [item for item in before if item[1] != pk]
+            score = similarity(candidate.vector, document.vector)
+            after = heapq.nlargest(k, others + ([(score, pk)] if score > 0 else []))
+            if [target for _, target in after] != [target for _, target in before]:
+                changed[candidate.pk] = after
+
+        model.objects.filter(source_id__in=[pk, *changed]).delete()
+        rows = _rows(source, pk, own)
+        for source_id, neighbours in changed.items():
+            rows.extend(_rows(source, source_id, neighbours))
+        model.objects.bulk_create(rows)
+    source.purge([pk, *changed])
+
+
+def update_post(pk):
+    update(POSTS, pk)
+
+
+def update_project(pk):
+    update(PROJECTS, pk)
+
+
+_scheduled = threading.local()
+
+
+def _pending():
+    if not hasattr(_scheduled, 'pks'):
+        _scheduled.pks = defaultdict(set)
+    return _scheduled.pks
+
+
+def schedule(source, *pks):
+    """Mettre à jour le voisinage après le commit (appelé par les signaux et
+    la modération en lot). Les identifiants d'une transaction sont regroupés :
+    un article enregistré puis ré-étiqueté n'est recalculé qu'une fois."""
+    if not pks or not getattr(settings, 'RECOMMENDATIONS_AUTO_UPDATE', True):
+        return
+    _pending()[source].update(pks)
+    # Le premier rappel exécuté traite tout le lot, les suivants n'ont plus
+    # rien à faire. Les identifiants d'une transaction annulée partent avec
+    # le commit suivant : update() relit l'état de la base.
+    transaction.on_commit(_run_scheduled)
+
+
+def _run_scheduled():
+    pending = _pending()
+    batches = list(pending.items())
+    pending.clear()
+    for source, pks in batches:
+        for pk in sorted(pks):
+            update(source, pk)
+
+
+def _fallback_posts(post, limit):
+    from .models import Post, PostStatus
+    return list(Post.objects.filter(
+        category=post.category_id, status=PostStatus.PUBLISHED
+    ).exclude(id=post.id)[:limit])
+
+
+def similar_posts(post, limit=3):
+    """Articles recommandés, ou à défaut les derniers de la même catégorie"""
+    from .models import Post, PostStatus
+
+    posts = list(Post.objects.filter(
+        recommended_in__source_id=post.pk, status=PostStatus.PUBLISHED
+    ).order_by('recommended_in__rank')[:limit])
+    return posts or _fallback_posts(post, limit)
+
+
+def similar_projects(project, limit=3):
+    """Projets recommandés, ou à défaut les autres projets du même type"""
+    from .models import Project
+
+    projects = list(Project.objects.filter(
+        recommended_in__source_id=project.pk
+    ).order_by('recommended_in__rank')[:limit])
+    return projects or list(Project.objects.filter(
+        project_type=project.project_type, rejected_at__isnull=True
+    ).exclude(id=project.id)[:limit])
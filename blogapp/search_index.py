@@ -0,0 +1,203 @@
+"""
+Index plein texte des articles et projets (SQLite FTS5).
+
+La table virtuelle ``blogapp_search_index`` contient une ligne par article
+publié et par projet. Elle est tenue à jour par les signaux (voir
+``signals.py``), classée avec BM25 et renvoie des extraits surlignés. Sur un
+autre moteur que SQLite, ou si FTS5 est absent, la recherche retombe sur des
+filtres ``icontains``.
+"""
+import html
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+
+TABLE = 'blogapp_search_index'
+
+POST = 'post'
+PROJECT = 'project'
+
+# Poids BM25 des colonnes : kind, object_id, title, excerpt, body, tags
+WEIGHTS = (0.0, 0.0, 10.0, 4.0, 1.0, 6.0)
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {} USING fts5("
+    "kind UNINDEXED, object_id UNINDEXED, title, excerpt, body, tags, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+).format(TABLE)
+DROP_SQL = 'DROP TABLE IF EXISTS {}'.format(TABLE)
+
+# Marqueurs insérés par FTS5 puis remplacés par <mark> après échappement
+_OPEN, _CLOSE = '\ue000', '\ue001'
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_available = None
+
+
+def is_available():
+    """Vrai si la base est SQLite et que la table FTS5 existe"""
+    global _available
+    if connection.vendor != 'sqlite':
+        return False
+    if _available is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLE]
+            )
+            _available = cursor.fetchone() is not None
+    return _available
+
+
+def reset_availability():
+    global _available
+    _available = None
+
+
+def html_to_text(value):
+    return html.unescape(strip_tags(value or '')).replace('\xa0', ' ')
+
+
+def build_query(text):
+    """Transformer une saisie libre en requête FTS5 sûre (préfixes, ET implicite)"""
+    tokens = _TOKEN_RE.findall(text or '')
+    return ' '.join('"{}"*'.format(token) for token in tokens)
+
+
+def post_document(post, tag_names=None):
+    if tag_names is None:
+        tag_names = post.tags.names()
+    return (
+        POST, post.pk, post.title, post.excerpt,
+        html_to_text(post.content), ' '.join(tag_names),
+    )
+
+
+def project_document(project):
+    return (
+        PROJECT, project.pk, project.title, '',
+        project.description, project.technologies.replace(',', ' '),
+    )
+
+
+def _delete(cursor, kind, object_ids):
+    cursor.execute(
+        'DELETE FROM {} WHERE kind = %s AND object_id IN ({})'.format(
+            TABLE, ', '.join(['%s'] * len(object_ids))
+        ),
+        [kind, *object_ids],
+    )
+
+
+def _insert(cursor, documents):
+    cursor.executemany(
+        'INSERT INTO {} (kind, object_id, title, excerpt, body, tags) '
+        'VALUES (%s, %s, %s, %s, %s, %s)'.format(TABLE),
+        list(documents),
+    )
+
+
+def index_post(post):
+    index_posts([post])
+
+
+def index_posts(posts):
+    """Réindexer des articles (étiquettes lues dans ``prefetch_related('tags')``
+    si elles sont préchargées)"""
+    from .models import PostStatus
+
+    posts = list(posts)
+    if not posts or not is_available():
+        return
+    with connection.cursor() as cursor:
+        _delete(cursor, POST, [post.pk for post in posts])
+        _insert(cursor, [
+            post_document(post, [tag.name for tag in post.tags.all()])
+            for post in posts if post.status == PostStatus.PUBLISHED
+        ])
+
+
+def index_project(project):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        _delete(cursor, PROJECT, [project.pk])
+        _insert(cursor, [project_document(project)])
+
+
+def remove(kind, object_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        _delete(cursor, kind, [object_id])
+
+
+def rebuild(batch_size=500):
+    """Reconstruire tout l'index; retourne (nb articles, nb projets)"""
+    from .models import Post, PostStatus, Project
+
+    reset_availability()
+    with connection.cursor() as cursor:
+        cursor.execute(DROP_SQL)
+        cursor.execute(CREATE_SQL)
+    reset_availability()
+
+    counts = []
+    querysets = (
+        (Post.objects.filter(status=PostStatus.PUBLISHED).prefetch_related('tags'),
+         lambda post: post_document(post, [tag.name for tag in post.tags.all()])),
+        (Project.objects.filter(rejected_at__isnull=True), project_document),
+    )
+    for queryset, to_document in querysets:
+        total = 0
+        batch = []
+        with connection.cursor() as cursor:
+            for obj in queryset.order_by('pk').iterator(chunk_size=batch_size):
+                batch.append(to_document(obj))
+                if len(batch) >= batch_size:
+                    _insert(cursor, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                _insert(cursor, batch)
+                total += len(batch)
+            counts.append(total)
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO {0} ({0}) VALUES ('optimize')".format(TABLE))
+    return tuple(counts)
+
+
+def matching_ids_sql(text, kind):
+    """Sous-requête des identifiants correspondants, pour ``pk__in=``.
+    Une recherche sans mot (ponctuation seule) ne correspond à rien : FTS5
+    refuserait une expression ``MATCH`` vide."""
+    query = build_query(text)
+    if not query:
+        return RawSQL('SELECT object_id FROM {} WHERE 0'.format(TABLE), [])
+    return RawSQL(
+        'SELECT object_id FROM {} WHERE {} MATCH %s AND kind = %s'.format(TABLE, TABLE),
+        [query, kind],
+    )
+
+
+def search(text, kind, limit=10):
+    """Résultats classés par BM25 : liste de (id, titre surligné, extrait surligné)"""
+    query = build_query(text)
+    if not query or not is_available():
+        return []
+    sql = (
+        'SELECT object_id, highlight({t}, 2, %s, %s), snippet({t}, -1, %s, %s, %s, 24) '
+        'FROM {t} WHERE {t} MATCH %s AND kind = %s '
+        'ORDER BY bm25({t}, {w}) LIMIT %s'
+    ).format(t=TABLE, w=', '.join(str(w) for w in WEIGHTS))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_OPEN, _CLOSE, _OPEN, _CLOSE, '…', query, kind, limit])
+        rows = cursor.fetchall()
+    return [(int(pk), _mark(title), _mark(snippet)) for pk, title, snippet in rows]
+
+
+def _mark(value):
+    return mark_safe(escape(value or '').replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
@@ -0,0 +1,166 @@
+"""
+Signaux de l'application : maintiennent à jour les données dérivées
+(index de recherche, compteurs, ...) quand les articles, projets,
+commentaires et notes changent.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import cards, counters, home_cache, page_cache, platforms, recommendations, search_index, tag_stats
+from .models import Category, Comment, Platform, Post, PostRating, Project
+
+
+def _purge_post_pages(post):
+    page_cache.purge(
+        'post:{}'.format(post.pk), 'category:{}'.format(post.category_id), 'post-list'
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    search_index.index_post(instance)
+    platforms.sync_post(instance)
+    tag_stats.post_changed(instance, created)
+    recommendations.schedule(recommendations.POSTS, instance.pk)
+    home_cache.invalidate()
+    _purge_post_pages(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # Les étiquettes sont supprimées avant post_delete
+    tag_stats.post_deleting(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    search_index.remove(search_index.POST, instance.pk)
+    # Les appartenances aux plateformes sont supprimées en cascade
+    platforms.refresh_counts()
+    home_cache.invalidate()
+    _purge_post_pages(instance)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender, instance, action, pk_set=None, **kwargs):
+    if not isinstance(instance, Post):
+        return
+    if action == 'pre_clear':
+        instance._cleared_tag_ids = list(instance.tags.values_list('pk', flat=True))
+    elif action == 'post_add':
+        tag_stats.tags_added(instance, pk_set or ())
+    elif action == 'post_remove':
+        tag_stats.tags_removed(instance, pk_set or ())
+    elif action == 'post_clear':
+        tag_stats.tags_removed(instance, getattr(instance, '_cleared_tag_ids', ()))
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        search_index.index_post(instance)
+        platforms.sync_post(instance)
+        recommendations.schedule(recommendations.POSTS, instance.pk)
+        # Les étiquettes ne changent pas updated_at
+        cards.invalidate(instance)
+        _purge_post_pages(instance)
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.rejected_at:
+        search_index.remove(search_index.PROJECT, instance.pk)
+    else:
+        search_index.index_project(instance)
+    recommendations.schedule(recommendations.PROJECTS, instance.pk)
+    home_cache.invalidate()
+    page_cache.purge('project:{}'.format(instance.pk), 'project-list')
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    search_index.remove(search_index.PROJECT, instance.pk)
+    home_cache.invalidate()
+    page_cache.purge('project:{}'.format(instance.pk), 'project-list')
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, raw=False, **kwargs):
+    home_cache.invalidate()
+    # Le nom de la catégorie figure sur les cartes de ses articles
+    if not kwargs.get('created'):
+        cards.bump_generation()
+    page_cache.purge('category:{}'.format(instance.pk), 'post-list')
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Nom de l'auteur affiché sur les cartes (pas last_login à chaque connexion)
+    if raw or created:
+        return
+    if update_fields is None or {'username', 'first_name', 'last_name'} & set(update_fields):
+        cards.bump_generation()
+
+
+@receiver(post_save, sender=Platform)
+def platform_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created or instance.tag_slugs != getattr(instance, '_loaded_tag_slugs', None):
+        platforms.rebuild_platform(instance)
+        instance._loaded_tag_slugs = instance.tag_slugs
+    platforms.invalidate()
+    page_cache.purge('platform-list')
+
+
+@receiver(post_delete, sender=Platform)
+def platform_deleted(sender, instance, **kwargs):
+    platforms.invalidate()
+    page_cache.purge('platform-list')
+
+
+@receiver(post_save, sender=PostRating)
+def rating_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_rating = None if created else getattr(instance, '_loaded_rating', None)
+    was_like = not created and getattr(instance, '_loaded_is_like', False)
+    counters.rating_changed(instance.post_id, old_rating, instance.rating, was_like, instance.is_like)
+    instance._loaded_rating = instance.rating
+    instance._loaded_is_like = instance.is_like
+    page_cache.purge('post:{}'.format(instance.post_id))
+
+
+@receiver(post_delete, sender=PostRating)
+def rating_deleted(sender, instance, **kwargs):
+    counters.rating_changed(
+        instance.post_id, getattr(instance, '_loaded_rating', instance.rating), None,
+        was_like=getattr(instance, '_loaded_is_like', instance.is_like),
+    )
+    page_cache.purge('post:{}'.format(instance.post_id))
+
+
+def _purge_comment_pages(post_id, count_changed):
+    # Le nombre de commentaires est affiché sur les listes (et dans leur ETag)
+    if count_changed:
+        page_cache.purge('post:{}'.format(post_id), 'post-list')
+    else:
+        page_cache.purge('post:{}'.format(post_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    was_approved = False if created else getattr(instance, '_loaded_is_approved', False)
+    counters.comment_changed(instance.post_id, was_approved, instance.is_approved)
+    instance._loaded_is_approved = instance.is_approved
+    _purge_comment_pages(instance.post_id, was_approved != instance.is_approved)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    was_approved = getattr(instance, '_loaded_is_approved', instance.is_approved)
+    counters.comment_changed(instance.post_id, was_approved, False)
+    _purge_comment_pages(instance.post_id, was_approved)
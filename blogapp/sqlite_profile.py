@@ -0,0 +1,213 @@
+"""
+Profil SQLite de production (``settings.SQLITE_PRAGMAS``) et banc d'essai
+de concurrence en écriture.
+
+Le banc d'essai copie la base deux fois (API de sauvegarde de sqlite3, qui
+fonctionne aussi avec la base en mémoire des tests) et envoie le même mélange
+d'opérations, depuis plusieurs threads, à chaque copie :
+
+- ``django`` : réglages par défaut de Django (journal DELETE, transactions
+  différées, attente de 5 s du module sqlite3);
+- ``production`` : les ``OPTIONS`` de ``settings.DATABASES['default']``
+  (WAL, busy_timeout, synchronous=NORMAL..., ``BEGIN IMMEDIATE``).
+
+Les opérations reprennent les écritures du site (commentaire et compteur de
+l'article dans une transaction qui lit avant d'écrire, note, vue) et des
+lectures de listes. Elles passent par ``bulk_create`` et ``update()`` : aucun
+signal n'écrit dans la base principale pendant la mesure. Une
+``OperationalError`` est comptée comme une réponse 500 : les « database is
+locked » apparaissent dans ``lock_errors`` du rapport de ``loadtest``.
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from . import loadtest
+
+
+OPERATIONS = [
+    {'name': 'comment', 'weight': 20},
+    {'name': 'rating', 'weight': 10},
+    {'name': 'view', 'weight': 20},
+    {'name': 'read', 'weight': 50},
+]
+
+
+def alias_for(profile):
+    return 'sqlite_profile_{}'.format(profile)
+
+
+def profiles():
+    """Options de connexion comparées : {nom: OPTIONS}"""
+    return {
+        'django': {},
+        'production': dict(settings.DATABASES['default'].get('OPTIONS', {})),
+    }
+
+
+def pragmas(connection):
+    """Valeurs effectives des pragmas du profil sur une connexion"""
+    with connection.cursor() as cursor:
+        values = {}
+        for name in settings.SQLITE_PRAGMAS:
+            cursor.execute('PRAGMA {}'.format(name))
+            values[name] = cursor.fetchone()[0]
+    return values
+
+
+def copy_database(path, using='default'):
+    """Copier la base ``using`` dans le fichier ``path``, en journal DELETE
+    (le mode WAL est enregistré dans le fichier : chaque profil le choisit)"""
+    source = connections[using]
+    source.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        source.connection.backup(target)
+        target.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        target.close()
+
+
+def register(alias, path, options):
+    """Déclarer une connexion ``alias`` vers ``path`` avec ces options"""
+    connections.settings[alias] = {
+        **connections.settings['default'],
+        'NAME': path,
+        'OPTIONS': options,
+        'CONN_MAX_AGE': 0,
+    }
+
+
+def unregister(alias):
+    connections.settings.pop(alias, None)
+    try:
+        del connections[alias]
+    except AttributeError:
+        pass
+
+
+class Workload:
+    """Opérations du mélange sur la base ``alias``. ``work`` simule le travail
+    de la vue entre la lecture et l'écriture d'une transaction."""
+
+    def __init__(self, alias, rng, work=0.005):
+        from .models import Post, PostStatus
+
+        self.alias = alias
+        self.rng = rng
+        self.work = work
+        self.posts = list(Post.objects.using(alias).filter(
+            status=PostStatus.PUBLISHED).values_list('pk', flat=True)[:50])
+        self.users = list(Post.objects.using(alias).values_list('author_id', flat=True).distinct()[:20])
+        if not self.posts or not self.users:
+            raise ValueError('La base ne contient aucun article publié')
+
+    def run(self, name, post, user):
+        getattr(self, name)(post, user)
+
+    def comment(self, post, user):
+        from .models import Comment, Post
+
+        with transaction.atomic(using=self.alias):
+            if not Post.objects.using(self.alias).filter(pk=post).exists():
+                return
+            time.sleep(self.work)
+            Comment.objects.using(self.alias).bulk_create([
+                Comment(post_id=post, author_id=user, content='Banc d\'essai SQLite'),
+            ])
+            Post.objects.using(self.alias).filter(pk=post).update(comment_count=F('comment_count') + 1)
+
+    def rating(self, post, user):
+        from .models import Post
+
+        with transaction.atomic(using=self.alias):
+            Post.objects.using(self.alias).filter(pk=post).values_list('rating_sum', 'rating_count').first()
+            time.sleep(self.work)
+            Post.objects.using(self.alias).filter(pk=post).update(
+                rating_count=F('rating_count') + 1, rating_sum=F('rating_sum') + self.rng.randint(1, 5),
+            )
+
+    def view(self, post, user):
+        from .models import Post
+
+        Post.objects.using(self.alias).filter(pk=post).update(views_count=F('views_count') + 1)
+
+    def read(self, post, user):
+        from .models import Post, PostStatus
+
+        posts = Post.objects.using(self.alias).filter(status=PostStatus.PUBLISHED)
+        list(posts.order_by('-created_at').values_list('pk', 'title')[:10])
+        posts.count()
+
+
+def sample_operations(count, rng):
+    """``count`` noms d'opérations tirés du mélange"""
+    traffic = loadtest.Traffic(routes=OPERATIONS, rng=rng)
+    return [traffic.next()['name'] for _ in range(count)]
+
+
+def run(alias, operations, threads=8, work=0.005, seed=0):
+    """Exécuter ``operations`` (noms du mélange) sur ``alias`` depuis
+    ``threads`` threads; renvoie un ``loadtest.Results``"""
+    rng = random.Random(seed)
+    workload = Workload(alias, rng, work)
+    jobs = iter([(name, rng.choice(workload.posts), rng.choice(workload.users)) for name in operations])
+    results = loadtest.Results()
+    lock = threading.Lock()
+
+    def next_job():
+        with lock:
+            return next(jobs, None)
+
+    def client():
+        try:
+            while (job := next_job()) is not None:
+                name = job[0]
+                start = time.monotonic()
+                try:
+                    workload.run(*job)
+                except OperationalError as exc:
+                    with lock:
+                        results.record(name, time.monotonic() - start, 500, str(exc).encode())
+                    continue
+                except Exception as exc:
+                    with lock:
+                        results.record(name, time.monotonic() - start, error=exc)
+                    continue
+                with lock:
+                    results.record(name, time.monotonic() - start, 200)
+        finally:
+            connections[alias].close()
+
+    results.started = time.monotonic()
+    with ThreadPoolExecutor(threads) as pool:
+        for _ in range(threads):
+            pool.submit(client)
+    results.finished = time.monotonic()
+    return results
+
+
+def compare_profiles(directory, operations, threads=8, work=0.005, seed=0, using='default'):
+    """Rapport de chaque profil sur une copie de la base ``using`` :
+    {nom: {'pragmas': ..., **summary}}"""
+    reports = {}
+    for name, options in profiles().items():
+        alias = alias_for(name)
+        path = os.path.join(directory, '{}.sqlite3'.format(name))
+        copy_database(path, using)
+        register(alias, path, options)
+        try:
+            report = {'pragmas': pragmas(connections[alias])}
+            report.update(run(alias, operations, threads, work, seed).summary())
+        finally:
+            connections[alias].close()
+            unregister(alias)
+        reports[name] = report
+    return reports
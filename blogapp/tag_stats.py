@@ -0,0 +1,142 @@
+"""
+Statistiques d'étiquettes : nombre d'articles publiés par étiquette.
+
+``TagStat`` garde une ligne par étiquette pour l'ensemble du blog (catégorie
+vide) et une par (étiquette, catégorie). Les signaux appliquent des deltas
+quand les étiquettes d'un article publié changent ou quand un article change
+de statut ou de catégorie, sans jamais parcourir toute la table taggit. Le
+nuage d'étiquettes est ensuite une lecture ordonnée de l'index
+``tag_stat_cloud_idx``. ``refresh()`` et ``rebuild()`` recalculent les
+compteurs depuis les articles (mises à jour en masse, réparation).
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F
+
+
+def _is_counted(status):
+    from .models import PostStatus
+    return status == PostStatus.PUBLISHED
+
+
+def apply(tag_ids, category_id, delta):
+    """Ajouter ``delta`` aux compteurs globaux et de la catégorie"""
+    from .models import TagStat
+
+    tag_ids = list(tag_ids)
+    if not tag_ids or not delta:
+        return
+    for category in (None, category_id):
+        if delta > 0:
+            TagStat.objects.bulk_create(
+                [TagStat(tag_id=pk, category_id=category) for pk in tag_ids], ignore_conflicts=True,
+            )
+        rows = TagStat.objects.filter(tag_id__in=tag_ids, category_id=category)
+        rows.update(published_count=F('published_count') + delta)
+        if delta < 0:
+            rows.filter(published_count__lte=0).delete()
+
+
+def post_changed(post, created):
+    """Après l'enregistrement d'un article : statut ou catégorie modifié"""
+    if not created and not hasattr(post, '_loaded_status'):
+        # Instance chargée sans son statut (only/defer) : état précédent inconnu
+        refresh([tag.pk for tag in post.tags.all()])
+        post._loaded_status = post.status
+        post._loaded_category_id = post.category_id
+        return
+    was = _is_counted(getattr(post, '_loaded_status', None))
+    now = _is_counted(post.status)
+    old_category = getattr(post, '_loaded_category_id', post.category_id)
+    post._loaded_status = post.status
+    post._loaded_category_id = post.category_id
+    if was == now and (not now or old_category == post.category_id):
+        return
+    tag_ids = [tag.pk for tag in post.tags.all()]
+    if was:
+        apply(tag_ids, old_category, -1)
+    if now:
+        apply(tag_ids, post.category_id, 1)
+
+
+def _saved_state(post):
+    """(compté, catégorie) tels qu'enregistrés en base"""
+    status = getattr(post, '_loaded_status', post.status)
+    return _is_counted(status), getattr(post, '_loaded_category_id', post.category_id)
+
+
+def tags_added(post, tag_ids):
+    counted, category_id = _saved_state(post)
+    if counted:
+        apply(tag_ids, category_id, 1)
+
+
+def tags_removed(post, tag_ids):
+    counted, category_id = _saved_state(post)
+    if counted:
+        apply(tag_ids, category_id, -1)
+
+
+def post_deleting(post):
+    counted, category_id = _saved_state(post)
+    if counted:
+        apply(post.tags.values_list('pk', flat=True), category_id, -1)
+
+
+def popular_tags(limit=10, category=None):
+    """Étiquettes les plus utilisées (``tag.num_times`` comme ``most_common()``)"""
+    from .models import TagStat
+
+    stats = TagStat.objects.filter(
+        category_id=getattr(category, 'pk', category),
+    ).select_related('tag').order_by('-published_count', 'tag')[:limit]
+    tags = []
+    for stat in stats:
+        stat.tag.num_times = stat.published_count
+        tags.append(stat.tag)
+    return tags
+
+
+def _published_items(tag_ids=None):
+    from taggit.models import TaggedItem
+    from .models import Post, PostStatus
+
+    items = TaggedItem.objects.filter(
+        content_type=ContentType.objects.get_for_model(Post),
+        object_id__in=Post.objects.filter(status=PostStatus.PUBLISHED).values('pk'),
+    )
+    if tag_ids is not None:
+        items = items.filter(tag_id__in=list(tag_ids))
+    return items
+
+
+def refresh(tag_ids=None):
+    """Recalculer les compteurs de ces étiquettes (toutes si ``None``)"""
+    from .models import Post, TagStat
+
+    if tag_ids is not None:
+        tag_ids = list(tag_ids)
+    items = _published_items(tag_ids)
+    categories = dict(Post.objects.filter(
+        pk__in=items.values('object_id')).values_list('pk', 'category_id').iterator(chunk_size=5000))
+
+    counts = {}
+    for tag_id, object_id in items.values_list('tag_id', 'object_id').iterator(chunk_size=5000):
+        for key in ((tag_id, None), (tag_id, categories[object_id])):
+            counts[key] = counts.get(key, 0) + 1
+
+    existing = TagStat.objects.all()
+    if tag_ids is not None:
+        tag_ids = list(tag_ids)
+        if not tag_ids:
+            return 0
+        existing = existing.filter(tag_id__in=tag_ids)
+    existing.delete()
+    TagStat.objects.bulk_create([
+        TagStat(tag_id=tag_id, category_id=category_id, published_count=count)
+        for (tag_id, category_id), count in counts.items()
+    ], batch_size=1000)
+    return len(counts)
+
+
+def rebuild():
+    return refresh()
@@ -0,0 +1,29 @@
+from django import template
+
+from .. import cards
+
+
+register = template.Library()
+
+
+@register.inclusion_tag('blogapp/includes/post_image.html')
+def post_image(post, variant='card', css_class='', lazy=True):
+    """Afficher la variante redimensionnée de l'image d'un article (WebP si supporté)"""
+    return {
+        'post': post,
+        'image': post.get_image_variant(variant),
+        'css_class': css_class,
+        'lazy': lazy,
+    }
+
+
+@register.filter
+def image_variant(post, variant):
+    """Données (URL, dimensions) d'une variante de l'image d'un article"""
+    return post.get_image_variant(variant)
+
+
+@register.simple_tag
+def render_cards(objects, variant):
+    """Cartes en cache des articles ou projets d'une liste (voir cards.py)"""
+    return cards.render(objects, variant)
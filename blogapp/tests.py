@@ -1,3 +1,1513 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import random
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+from urllib.parse import urlsplit
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import LiveServerTestCase, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from PIL import Image
+
+from . import (
+    assets, benchmark, cards, compression, dataset, db_router, file_serving, home_cache, images, loadtest, moderation, page_cache, platforms, query_plans, recommendations, search_index,
+    sqlite_profile, tag_stats, view_counter, views,
+)
+from .comments import load_comment_tree
+from .middleware import RequestStats
+from .models import (
+    Category, Comment, Platform, PlatformMembership, Post, PostRating, PostRecommendation, PostStatus,
+    Project, TagStat, UserProfile,
+)
+from .pagination import CursorPaginator
+
+
+# Les tests n'écrivent pas dans le cache du site, quel que soit le lanceur
+# (manage.py test, pytest...)
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    }
+}
+
+
+def make_post(author, category, **kwargs):
+    defaults = {
+        'title': 'Article de test',
+        'excerpt': 'Extrait',
+        'content': '<p>Contenu de test</p>',
+        'status': PostStatus.PUBLISHED,
+    }
+    defaults.update(kwargs)
+    return Post.objects.create(author=author, category=category, **defaults)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+        self.post = make_post(self.user, self.category)
+        self.addCleanup(view_counter.discard)
+
+    @override_settings(VIEW_COUNTER_FLUSH_THRESHOLD=1000, VIEW_COUNTER_FLUSH_INTERVAL=3600)
+    def test_views_are_buffered_then_flushed_in_one_update(self):
+        for _ in range(5):
+            self.client.get(self.post.get_absolute_url())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 0)
+        self.assertEqual(view_counter.pending(self.post.pk), 5)
+
+        with self.assertNumQueries(3):  # SAVEPOINT, UPDATE, RELEASE
+            self.assertEqual(view_counter.flush(), 5)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 5)
+
+    @override_settings(VIEW_COUNTER_FLUSH_THRESHOLD=3, VIEW_COUNTER_FLUSH_INTERVAL=3600)
+    def test_threshold_triggers_flush(self):
+        for _ in range(3):
+            view_counter.record(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 3)
+        self.assertEqual(view_counter.pending(self.post.pk), 0)
+
+    @override_settings(VIEW_COUNTER_FLUSH_THRESHOLD=2, VIEW_COUNTER_FLUSH_INTERVAL=3600)
+    def test_failed_flush_keeps_views_without_breaking_the_request(self):
+        error = OperationalError('database is locked')
+        with mock.patch('blogapp.models.Post.objects.filter', side_effect=error), \
+                mock.patch.object(view_counter.threading, 'Timer') as timer, \
+                self.assertLogs('blogapp.view_counter', 'ERROR'):
+            view_counter.record(self.post.pk, 2)
+        self.assertEqual(view_counter.pending(self.post.pk), 2)
+        # Nouvel essai programmé, même si plus aucune vue n'arrive
+        timer.assert_called_once_with(3600, view_counter._flush_from_timer)
+        timer.return_value.start.assert_called_once_with()
+
+        with mock.patch('blogapp.models.Post.objects.filter', side_effect=error):
+            with self.assertRaises(OperationalError):
+                view_counter.flush()
+        self.assertEqual(view_counter.flush(), 2)
+
+
+def make_image(name='photo.jpg', size=(1600, 1200)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_VARIANTS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+
+    def test_variants_built_once_when_image_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = make_post(self.user, self.category, featured_image=make_image())
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants['card']['width'], 400)
+        self.assertEqual(post.image_variants['og']['height'], 630)
+        self.assertTrue(post.image_variants['detail']['webp'].endswith('.webp'))
+        self.assertTrue(post.get_image_variant('card')['webp_url'])
+
+        with mock.patch('blogapp.images.schedule_variants') as schedule:
+            post.title = 'Nouveau titre'
+            post.save()
+            post.increment_views()
+        schedule.assert_not_called()
+
+    def test_variant_names_follow_image_content(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = make_post(self.user, self.category, featured_image=make_image())
+        post.refresh_from_db()
+        before = post.image_variants['card']['jpeg']
+
+        # Même nom de fichier, autre contenu
+        source = post.featured_image.name
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 1200), (30, 30, 200)).save(buffer, 'JPEG')
+        default_storage.delete(source)
+        default_storage.save(source, ContentFile(buffer.getvalue()))
+        variants = images.build_variants(post.pk, source)
+        self.assertEqual(variants['source'], source)
+        self.assertNotEqual(variants['card']['jpeg'], before)
+        self.assertNotEqual(variants['digest'], post.image_variants['digest'])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+        self.post = make_post(
+            self.user, self.category,
+            title='Piloter un servomoteur',
+            content='<p>Le <strong>servomoteur</strong> se commande en PWM &amp; 5V.</p>',
+        )
+        self.post.tags.add('arduino')
+        make_post(self.user, self.category, title='Brouillon servo', slug='brouillon',
+                  status=PostStatus.DRAFT)
+
+    def test_index_follows_saves_tags_and_status(self):
+        hits = search_index.search('servo', search_index.POST)
+        self.assertEqual([pk for pk, _, _ in hits], [self.post.pk])
+        self.assertIn('<mark>servomoteur</mark>', hits[0][1])
+        self.assertEqual(len(search_index.search('arduino', search_index.POST)), 1)
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search_index.search('servo', search_index.POST)), 1)
+
+        self.post.status = PostStatus.DRAFT
+        self.post.save()
+        self.assertEqual(search_index.search('servo', search_index.POST), [])
+
+    def test_search_views_use_index(self):
+        response = self.client.get('/recherche/', {'q': 'servomoteur'})
+        self.assertContains(response, '<mark>servomoteur</mark>')
+        self.assertNotContains(response, 'Brouillon servo')
+
+        response = self.client.get('/blog/', {'search': 'PWM'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_punctuation_only_search_matches_nothing(self):
+        for search in ('!!!', '---', '"'):
+            response = self.client.get('/blog/', {'search': search})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context['page_obj']), [])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CommentTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+        self.post = make_post(self.user, self.category)
+
+    def test_tree_is_loaded_in_one_query_at_any_depth(self):
+        root = Comment.objects.create(post=self.post, author=self.user, content='racine')
+        child = Comment.objects.create(post=self.post, author=self.user, content='enfant', parent=root)
+        grandchild = Comment.objects.create(post=self.post, author=self.user, content='petit', parent=child)
+        hidden = Comment.objects.create(post=self.post, author=self.user, content='masqué',
+                                        parent=root, is_approved=False)
+        Comment.objects.create(post=self.post, author=self.user, content='orphelin', parent=hidden)
+
+        with self.assertNumQueries(1):
+            tree = load_comment_tree(self.post)
+            self.assertEqual(tree.count, 3)
+            self.assertEqual(list(tree), [root])
+            self.assertEqual(tree.roots[0].children, [child])
+            self.assertEqual(tree.roots[0].children[0].children[0].depth, 2)
+            self.assertEqual(tree.roots[0].children[0].children[0].author.username, 'auteur')
+
+        response = self.client.get(self.post.get_absolute_url())
+        self.assertContains(response, 'Commentaires (3)')
+        self.assertContains(response, 'petit')
+        self.assertNotContains(response, 'orphelin')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class EngagementCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.reader = User.objects.create_user('lecteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+        self.post = make_post(self.user, self.category)
+
+    def test_counters_follow_ratings_likes_and_comments(self):
+        PostRating.objects.create(post=self.post, user=self.user, rating=3)
+        self.client.force_login(self.reader)
+        response = self.client.post(f'/ajax/post/{self.post.pk}/like/')
+        self.assertEqual(response.json()['likes_count'], 1)
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.rating_sum, self.post.rating_count, self.post.like_count), (8, 2, 1))
+        self.assertEqual(self.post.avg_rating, 4)
+
+        # Une note de 5 étoiles n'est pas un « j'aime »
+        rating = PostRating.objects.get(user=self.user)
+        rating.rating = 5
+        rating.save()
+        response = self.client.post(f'/ajax/post/{self.post.pk}/like/')
+        self.assertEqual(response.json(), {'success': True, 'liked': False, 'likes_count': 0})
+
+        comment = Comment.objects.create(post=self.post, author=self.reader, content='Merci')
+        Comment.objects.create(post=self.post, author=self.reader, content='Réponse', parent=comment)
+        comment.is_approved = False
+        comment.save()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.rating_sum, self.post.rating_count, self.post.like_count), (5, 1, 0))
+        self.assertEqual(self.post.comment_count, 1)
+
+        comment.delete()
+        Post.objects.filter(pk=self.post.pk).update(rating_sum=99, like_count=7, comment_count=42)
+        call_command('reconcile_post_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.rating_sum, self.post.like_count, self.post.comment_count), (5, 0, 0))
+
+    def test_full_save_keeps_counters(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        # Note « j'aime » d'un utilisateur qui avait déjà noté : sa note est conservée
+        PostRating.objects.create(post=self.post, user=self.reader, rating=2)
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.post(f'/ajax/post/{self.post.pk}/like/').json()['likes_count'], 1)
+        Comment.objects.create(post=self.post, author=self.reader, content='Merci')
+        Post.objects.filter(pk=self.post.pk).update(views_count=F('views_count') + 3)
+
+        stale.title = 'Titre corrigé'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, 'Titre corrigé')
+        self.assertEqual(
+            (self.post.rating_sum, self.post.rating_count, self.post.like_count,
+             self.post.comment_count, self.post.views_count),
+            (2, 1, 1, 1, 3),
+        )
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique', slug='robotique')
+        for i in range(25):
+            make_post(self.user, self.category, title=f'Article {i}', slug=f'article-{i}')
+        self.expected = list(Post.objects.order_by('-created_at', '-id'))
+
+    def walk(self, url, params=None):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            page_obj = response.context['page_obj']
+            pages.append(list(page_obj))
+            if not page_obj.has_next:
+                return pages, page_obj
+            response = self.client.get(url + '?' + page_obj.next_query)
+
+    def test_cursor_walk_covers_every_post_once(self):
+        pages, last = self.walk('/blog/')
+        self.assertEqual([len(page) for page in pages], [9, 9, 7])
+        self.assertEqual(sum(pages, []), self.expected)
+
+        response = self.client.get('/blog/?' + last.previous_query)
+        self.assertEqual(list(response.context['page_obj']), self.expected[9:18])
+
+    def test_deep_page_costs_the_same_as_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 9, ['-created_at', '-id'])
+        cursor = paginator.encode_cursor(self.expected[17])
+        request = RequestFactory().get('/blog/', {'after': cursor})
+        with self.assertNumQueries(1):
+            page = paginator.page_for_request(request)
+        self.assertEqual(list(page), self.expected[18:])
+
+    def test_legacy_page_links_and_filters_are_kept(self):
+        response = self.client.get('/blog/', {'page': 2, 'category': 'robotique'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(list(page_obj), self.expected[9:18])
+        self.assertIn('category=robotique', page_obj.next_query)
+        self.assertEqual(page_obj.previous_query, 'category=robotique')
+
+        response = self.client.get('/categorie/robotique/', {'after': 'pas-un-curseur'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(response.context['page_obj'].count, 25)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class HomeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+        self.post = make_post(self.user, self.category, title='Premier article')
+
+    def test_home_is_served_from_snapshot_until_data_changes(self):
+        self.client.get('/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/')
+        self.assertContains(response, 'Premier article')
+        self.assertEqual(response.context['stats']['total_posts'], 1)
+
+        make_post(self.user, self.category, title='Second article', slug='second')
+        response = self.client.get('/')
+        self.assertContains(response, 'Second article')
+        self.assertEqual(response.context['stats']['total_posts'], 2)
+
+        Category.objects.create(name='Web')
+        self.assertIsNone(cache.get(home_cache.CACHE_KEY))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+        self.post = make_post(self.user, self.category, title='Article en cache')
+        page_cache.reset_stats()
+        self.addCleanup(page_cache.reset_stats)
+
+    # Pas de vidage du compteur de vues pendant le test (intervalle global)
+    @override_settings(VIEW_COUNTER_FLUSH_INTERVAL=3600, VIEW_COUNTER_FLUSH_THRESHOLD=1000)
+    def test_anonymous_detail_is_cached_and_purged_on_comment(self):
+        url = self.post.get_absolute_url()
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertContains(response, 'Article en cache')
+        # Les vues servies depuis le cache sont comptées
+        self.assertEqual(view_counter.pending(self.post.pk), 2)
+
+        Comment.objects.create(
+            post=self.post, author=self.user, content='Un commentaire visible',
+        )
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Un commentaire visible')
+
+        stats = page_cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    @override_settings(PAGE_CACHE_STATS_LOG_EVERY=2)
+    def test_hits_do_not_write_to_the_cache_and_stats_are_logged(self):
+        url = self.post.get_absolute_url()
+        self.client.get(url)
+        with mock.patch.object(cache, 'set') as set_, mock.patch.object(cache, 'add') as add, \
+                mock.patch.object(cache, 'incr') as incr, \
+                self.assertLogs('blogapp.page_cache', 'INFO') as logs:
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'HIT')
+        for method in (set_, add, incr):
+            method.assert_not_called()
+
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'django.log')
+        with open(path, 'w', encoding='utf-8') as log:
+            log.write('\n'.join(logs.output * 2) + '\nligne sans rapport\n')
+        out = StringIO()
+        call_command('page_cache_stats', path, stdout=out)
+        self.assertIn('Succès : 2  Échecs : 2', out.getvalue())
+
+    def test_listing_is_purged_when_a_post_is_published(self):
+        self.client.get('/blog/')
+        self.assertEqual(self.client.get('/blog/')['X-Page-Cache'], 'HIT')
+        make_post(self.user, self.category, title='Nouvel article', slug='nouvel-article')
+        response = self.client.get('/blog/')
+        self.assertContains(response, 'Nouvel article')
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.client.force_login(self.user)
+        url = self.post.get_absolute_url()
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+        self.post = make_post(self.user, self.category, title='Article conditionnel')
+
+    # Le tampon du compteur de vues ne doit pas se vider pendant le test
+    @override_settings(PAGE_CACHE_ENABLED=False, VIEW_COUNTER_FLUSH_INTERVAL=3600,
+                       VIEW_COUNTER_FLUSH_THRESHOLD=1000)
+    def test_unchanged_post_answers_304_and_counts_the_view(self):
+        url = self.post.get_absolute_url()
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        # Une seule requête : le validateur, sans exécuter la vue
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count + view_counter.pending(self.post.pk), 2)
+
+        Comment.objects.create(post=self.post, author=self.user, content='Nouveau commentaire')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_etag_depends_on_the_user(self):
+        url = self.post.get_absolute_url()
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_listing_etag_changes_on_publish_and_delete(self):
+        etag = self.client.get('/blog/')['ETag']
+        self.assertEqual(self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        other = make_post(self.user, self.category, title='Autre article', slug='autre-article')
+        response = self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        Post.objects.filter(pk=other.pk).delete()
+        self.assertEqual(self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_listing_etag_follows_tags_and_counters(self):
+        url = '/blog/?tag=capteur'
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Article conditionnel')
+        etag = response['ETag']
+
+        self.post.tags.add('capteur')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Article conditionnel')
+        etag = response['ETag']
+
+        Comment.objects.create(post=self.post, author=self.user, content='Compté sous la carte')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # Les vues ne changent pas l'ETag : la liste reste en 304
+        Post.objects.filter(pk=self.post.pk).update(views_count=F('views_count') + 10)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_page_cache_hit_answers_304(self):
+        etag = self.client.get('/blog/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryPlanTests(TestCase):
+    def test_hot_querysets_use_their_indexes(self):
+        failures = {name: plan for name, plan, problems in query_plans.check() if problems}
+        self.assertEqual(failures, {})
+
+    def test_full_scans_and_temp_sorts_are_reported(self):
+        self.assertTrue(query_plans.problems(['SCAN blogapp_post']))
+        self.assertTrue(query_plans.problems(['USE TEMP B-TREE FOR ORDER BY']))
+        self.assertFalse(query_plans.problems(['SEARCH blogapp_post USING INDEX post_status_created_idx (status=?)']))
+
+    def test_other_backends_are_refused(self):
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            with self.assertRaises(CommandError):
+                call_command('check_query_plans', stdout=StringIO())
+
+
+@override_settings(CACHES=TEST_CACHES, REQUEST_TIMING_SAMPLE_RATE=1.0, PAGE_CACHE_ENABLED=False)
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+
+    def test_sampled_request_gets_server_timing_and_log_line(self):
+        with self.assertLogs('blogapp.timing', level='INFO') as logs:
+            response = self.client.get('/projets/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['path'], '/projets/')
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+
+    def test_repeated_statements_are_flagged(self):
+        stats = RequestStats()
+        for post_id in (1, 2, 3):
+            stats.execute_wrapper(lambda *args: None, 'SELECT * FROM t WHERE id = %s', [post_id], False, {})
+        self.assertEqual(stats.duplicates(), [('SELECT * FROM t WHERE id = %s', 3)])
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_untouched(self):
+        response = self.client.get('/projets/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+def seed_content(author, staff, size, offset=0):
+    """Jeu de données réaliste : ``size`` articles par catégorie, avec tags,
+    commentaires, réponses, notes et projets"""
+    robotics, _ = Category.objects.get_or_create(name='Robotique', defaults={'slug': 'robotique'})
+    web, _ = Category.objects.get_or_create(name='Web', defaults={'slug': 'web'})
+    platforms = ('arduino', 'esp32', 'raspberry-pi')
+    for i in range(offset, offset + size):
+        for category in (robotics, web):
+            post = make_post(
+                author, category,
+                title=f'{category.name} {i}', slug=f'{category.slug}-{i}',
+                content='<p>' + 'Lorem ipsum dolor sit amet. ' * 20 + '</p>',
+            )
+            post.tags.add(platforms[i % 3], f'tag-{i}', f'sujet-{i % 5}')
+            root = Comment.objects.create(post=post, author=staff, content=f'Question {i}')
+            Comment.objects.create(post=post, author=author, parent=root, content=f'Réponse {i}')
+            PostRating.objects.create(post=post, user=staff, rating=i % 5 + 1)
+        make_post(author, robotics, title=f'En attente {i}', slug=f'attente-{i}', status=PostStatus.PENDING)
+        Project.objects.create(
+            title=f'Projet {i}', slug=f'projet-{i}', description='Description du projet',
+            project_type='robotics', technologies='Python, C++', start_date='2024-01-01',
+            is_featured=i % 2 == 0, is_approved=i % 3 != 0,
+        )
+
+
+ANONYMOUS, USER, STAFF = 'anonyme', 'utilisateur', 'staff'
+
+# (nom, méthode, url, plafond de requêtes par rôle, taille maximale en Ko).
+# Un rôle absent n'a pas accès à la page (404) et n'est pas mesuré.
+# ``{post}``, ``{pending_post}`` et ``{pending_project}`` sont remplacés au
+# moment de la mesure.
+ROUTES = [
+    ('home', 'get', '/', {ANONYMOUS: 5, USER: 7, STAFF: 7}, 80),
+    ('post_list', 'get', '/blog/', {ANONYMOUS: 5, USER: 7, STAFF: 7}, 80),
+    ('post_list (filtres)', 'get', '/blog/?category=robotique&tag=arduino&difficulty=beginner&search=robotique',
+     {ANONYMOUS: 5, USER: 7, STAFF: 7}, 80),
+    ('projects', 'get', '/projets/', {ANONYMOUS: 2, USER: 4, STAFF: 4}, 64),
+    ('robotics_posts', 'get', '/robotique/', {ANONYMOUS: 8, USER: 10, STAFF: 10}, 100),
+    ('search', 'get', '/recherche/?q=robotique', {ANONYMOUS: 3, USER: 5, STAFF: 5}, 40),
+    ('create_post', 'get', '/blog/nouveau/', {ANONYMOUS: 0, USER: 5, STAFF: 3}, 64),
+    ('post_detail', 'get', '/blog/{post.slug}/', {ANONYMOUS: 7, USER: 10, STAFF: 10}, 100),
+    ('edit_post', 'get', '/blog/{post.slug}/modifier/', {ANONYMOUS: 0, USER: 5}, 64),
+    ('category_posts', 'get', '/categorie/robotique/', {ANONYMOUS: 5, USER: 7, STAFF: 7}, 80),
+    ('project_detail', 'get', '/projet/projet-1/', {ANONYMOUS: 3, USER: 5, STAFF: 5}, 64),
+    ('profile', 'get', '/profil/', {ANONYMOUS: 0, USER: 5, STAFF: 2}, 80),
+    ('edit_profile', 'get', '/profil/modifier/', {ANONYMOUS: 0, USER: 4, STAFF: 4}, 64),
+    ('login', 'get', '/login/', {ANONYMOUS: 0, USER: 2, STAFF: 2}, 40),
+    ('register', 'get', '/register/', {ANONYMOUS: 0, USER: 2, STAFF: 2}, 40),
+    ('admin_profile', 'get', '/admin-profile/', {ANONYMOUS: 0, USER: 2, STAFF: 11}, 64),
+    ('toggle_like', 'post', '/ajax/post/{post.pk}/like/', {ANONYMOUS: 0, USER: 11, STAFF: 11}, 1),
+    ('create_project', 'get', '/projects/create/', {ANONYMOUS: 0, USER: 2, STAFF: 2}, 40),
+    ('moderation_dashboard', 'get', '/moderation/', {ANONYMOUS: 0, USER: 2, STAFF: 8}, 64),
+    ('approve_project', 'get', '/projects/{pending_project.slug}/approve/', {ANONYMOUS: 0, USER: 2, STAFF: 7}, 1),
+    ('approve_post', 'get', '/posts/{pending_post.slug}/approve/', {ANONYMOUS: 0, USER: 2, STAFF: 12}, 1),
+    ('arduino_detail', 'get', '/robotique/arduino/', {ANONYMOUS: 3, USER: 5, STAFF: 5}, 64),
+    ('esp32_detail', 'get', '/robotique/esp32/', {ANONYMOUS: 3, USER: 5, STAFF: 5}, 64),
+    ('raspberry_pi_detail', 'get', '/robotique/raspberry-pi/', {ANONYMOUS: 3, USER: 5, STAFF: 5}, 100),
+    ('logout', 'get', '/logout/', {ANONYMOUS: 0, USER: 4, STAFF: 4}, 1),
+]
+
+
+# Le tampon du compteur de vues ne doit pas se vider au milieu d'une mesure
+@override_settings(CACHES=TEST_CACHES, PAGE_CACHE_ENABLED=False, IMAGE_VARIANTS_ASYNC=False,
+                   VIEW_COUNTER_FLUSH_INTERVAL=3600, VIEW_COUNTER_FLUSH_THRESHOLD=10 ** 6)
+class QueryBudgetTests(TestCase):
+    """Plafond de requêtes SQL et de taille de page pour chaque route.
+
+    Chaque page est mesurée avec un petit jeu de données puis après en avoir
+    ajouté beaucoup plus : le nombre de requêtes doit rester le même (pas de
+    N+1) et sous le plafond de la route.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.author = User.objects.create_user('auteur', password='pass')
+        self.staff = User.objects.create_user('admin', password='pass', is_staff=True, is_superuser=True)
+        for user in (self.author, self.staff):
+            UserProfile.objects.create(user=user)
+        seed_content(self.author, self.staff, size=3)
+        recommendations.build_all()
+        self.post = Post.objects.get(slug='robotique-0')
+
+    def grow_dataset(self):
+        seed_content(self.author, self.staff, size=12, offset=3)
+        for i in range(10):
+            parent = Comment.objects.create(post=self.post, author=self.staff, content=f'Commentaire {i}')
+            Comment.objects.create(post=self.post, author=self.author, parent=parent, content=f'Réponse {i}')
+        self.post.tags.add(*[f'extra-{i}' for i in range(10)])
+        recommendations.build_all()
+
+    def client_for(self, role):
+        client = self.client_class()
+        if role == USER:
+            client.force_login(self.author)
+        elif role == STAFF:
+            client.force_login(self.staff)
+        return client
+
+    def measure(self, role, method, url):
+        # Les routes qui modifient des données partent toujours du même état
+        PostRating.objects.filter(post=self.post).delete()
+        targets = {'post': self.post}
+        if '{pending_post' in url:
+            targets['pending_post'] = make_post(
+                self.author, self.post.category, title='À valider', status=PostStatus.PENDING,
+                slug=f'a-valider-{Post.objects.count()}',
+            )
+        if '{pending_project' in url:
+            targets['pending_project'] = Project.objects.create(
+                title='Projet à valider', slug=f'projet-a-valider-{Project.objects.count()}',
+                description='Description', technologies='C', start_date='2024-01-01', is_approved=False,
+            )
+        client = self.client_for(role)
+        cache.clear()
+        view_counter.discard()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(url.format(**targets))
+        return len(queries), len(response.content)
+
+    def measure_all(self):
+        return {
+            (name, role): self.measure(role, method, url)
+            for name, method, url, budgets, _ in ROUTES
+            for role in budgets
+        }
+
+    def test_query_counts_stay_within_budget_and_do_not_grow(self):
+        # Premier passage pour remplir les caches du processus (ContentType...)
+        self.measure_all()
+        small = self.measure_all()
+        self.grow_dataset()
+        large = self.measure_all()
+
+        for name, method, url, budgets, max_kb in ROUTES:
+            for role, budget in budgets.items():
+                with self.subTest(route=name, role=role):
+                    (small_queries, _), (large_queries, large_size) = small[name, role], large[name, role]
+                    self.assertLessEqual(large_queries, budget)
+                    self.assertEqual(large_queries, small_queries, 'le nombre de requêtes croît avec les données')
+                    self.assertLessEqual(large_size, max_kb * 1024)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class DatasetGeneratorTests(TestCase):
+    def setUp(self):
+        self.addCleanup(view_counter.discard)
+        search_index.reset_availability()
+        self.addCleanup(search_index.reset_availability)
+
+    def test_generation_is_reproducible_and_rebuilds_counters(self):
+        with mock.patch('blogapp.images.schedule_variants') as schedule:
+            totals = dataset.generate(
+                users=5, categories=3, posts=20, comments=60, ratings=20, projects=4, seed=7, prefix='a',
+            )
+            dataset.generate(users=5, categories=3, posts=20, comments=60, ratings=20, projects=4, seed=7, prefix='b')
+        schedule.assert_not_called()
+        self.assertEqual(totals['posts'], 20)
+        self.assertEqual(Comment.objects.count(), 120)
+        self.assertTrue(Comment.objects.filter(parent__isnull=False).exists())
+
+        titles = lambda prefix: list(
+            Post.objects.filter(slug__startswith=prefix + '-').order_by('pk').values_list('title', flat=True)
+        )
+        self.assertEqual(titles('a'), titles('b'))
+
+        post = Post.objects.filter(comments__is_approved=True).first()
+        self.assertEqual(post.comment_count, post.comments.filter(is_approved=True).count())
+        self.assertTrue(post.tags.exists())
+        self.assertEqual(len(search_index.search(post.title, search_index.POST)) > 0,
+                         post.status == PostStatus.PUBLISHED)
+
+    def test_existing_prefix_is_refused(self):
+        User.objects.create_user('gen-0')
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', posts=1, stdout=StringIO())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LoadTestToolTests(TestCase):
+    def test_access_log_is_mapped_to_routes(self):
+        entries = loadtest.parse_access_log([
+            '1.2.3.4 - - [10/Oct/2026:13:55:36 +0000] "GET /blog/?tag=esp32 HTTP/1.1" 200 512 "-" "Mozilla"',
+            '1.2.3.4 - - [10/Oct/2026:13:55:36 +0000] "GET /static/css/site.css HTTP/1.1" 200 512 "-" "-"',
+            '1.2.3.4 - - [10/Oct/2026:13:55:37 +0000] "POST /ajax/post/4/like/ HTTP/1.1" 200 20 "-" "-"',
+            '1.2.3.4 - - [10/Oct/2026:13:55:38 +0000] "POST /login/ HTTP/1.1" 302 0 "-" "-"',
+        ])
+        self.assertEqual([(entry['name'], entry.get('auth', False)) for entry in entries],
+                         [('post_list', False), ('toggle_like', True)])
+
+    def test_percentiles_use_nearest_rank(self):
+        values = [i / 1000 for i in range(1, 101)]
+        self.assertEqual(loadtest.percentile(values, 0.5), 0.05)
+        self.assertEqual(loadtest.percentile(values, 0.99), 0.099)
+        self.assertIsNone(loadtest.percentile([], 0.5))
+
+    def test_auth_routes_are_dropped_without_credentials(self):
+        traffic = loadtest.Traffic(rng=random.Random(1)).anonymous()
+        self.assertFalse(any(traffic.next().get('auth') for _ in range(100)))
+        with self.assertRaises(ValueError):
+            loadtest.Traffic(routes=[route for route in loadtest.DEFAULT_MIX if route.get('auth')]).anonymous()
+
+
+@override_settings(CACHES=TEST_CACHES, PAGE_CACHE_ENABLED=False)
+class LoadTestLiveTests(LiveServerTestCase):
+    # Pas de post_migrate après chaque vidage de la base (permissions personnalisées)
+    available_apps = [
+        'django.contrib.admin', 'django.contrib.auth', 'django.contrib.contenttypes',
+        'django.contrib.sessions', 'django.contrib.messages', 'blogapp', 'taggit',
+    ]
+    # Hors transaction, les lectures passent par la réplique
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('lecteur', password='secret')
+        self.post = make_post(self.user, Category.objects.create(name='Robotique'), title='Article chargé')
+        Comment.objects.create(post=self.post, author=self.user, content='Premier')
+
+    def test_mix_runs_with_login_and_csrf(self):
+        url = urlsplit(self.live_server_url)
+        results = asyncio.run(loadtest.run(
+            url.hostname, url.port,
+            loadtest.Traffic(rng=random.Random(1)),
+            loadtest.Sampler(loadtest.load_samples(), random.Random(1)),
+            concurrency=2, duration=30, max_requests=30,
+            credentials=[('lecteur', 'secret')],
+        ))
+        report = results.summary()
+        self.assertEqual(report['requests'], 30)
+        self.assertEqual(report['error_rate'], 0)
+        for name, route in report['routes'].items():
+            self.assertEqual(set(route['statuses']), {'200'}, name)
+
+    def test_failed_login_is_reported_as_an_error(self):
+        url = urlsplit(self.live_server_url)
+        results = asyncio.run(loadtest.run(
+            url.hostname, url.port,
+            loadtest.Traffic(routes=[route for route in loadtest.DEFAULT_MIX if route.get('auth')],
+                             rng=random.Random(1)),
+            loadtest.Sampler(loadtest.load_samples(), random.Random(1)),
+            concurrency=1, duration=30, max_requests=3,
+            credentials=[('lecteur', 'mauvais')],
+        ))
+        report = results.summary()
+        self.assertEqual(list(report['routes']), ['login'])
+        self.assertEqual(report['routes']['login']['statuses'], {'HttpError': 3})
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+        other = Category.objects.create(name='Web')
+        self.servo = make_post(self.user, self.category, title='Piloter un servomoteur',
+                               content='<p>Servomoteur, signal PWM et alimentation 5V.</p>')
+        self.servo.tags.add('arduino', 'servo')
+        self.twin = make_post(self.user, other, title='Servomoteur et PWM', slug='servo-pwm',
+                              content='<p>Le signal PWM règle l&#x27;angle du servomoteur.</p>')
+        self.twin.tags.add('arduino', 'servo')
+        self.unrelated = make_post(self.user, self.category, title='Installer Django', slug='django',
+                                   content='<p>Un serveur web en Python.</p>')
+        self.unrelated.tags.add('python')
+        make_post(self.user, self.category, title='Brouillon servo', slug='brouillon',
+                  status=PostStatus.DRAFT).tags.add('arduino', 'servo')
+
+    def test_build_stores_neighbours_read_by_detail_page(self):
+        # Sans calcul : repli sur la même catégorie
+        self.assertEqual(recommendations.similar_posts(self.servo), [self.unrelated])
+
+        call_command('build_recommendations', stdout=StringIO())
+        stored = list(self.servo.recommendations.values_list('target_id', flat=True))
+        self.assertEqual(stored[0], self.twin.pk)
+        self.assertNotIn(self.servo.pk, stored)
+        self.assertEqual(PostRecommendation.objects.filter(target__status=PostStatus.DRAFT).count(), 0)
+
+        response = self.client.get(self.servo.get_absolute_url())
+        self.assertEqual(response.context['similar_posts'][0], self.twin)
+
+    def test_incremental_update_touches_the_neighbourhood(self):
+        recommendations.build_all()
+        with self.captureOnCommitCallbacks(execute=True):
+            newcomer = make_post(self.user, self.category, title='Servomoteur continu', slug='continu',
+                                 content='<p>Un servomoteur à rotation continue en PWM.</p>')
+            newcomer.tags.add('servo')
+        self.assertEqual(newcomer.recommendations.first().target_id, self.servo.pk)
+        self.assertIn(newcomer.pk, self.servo.recommendations.values_list('target_id', flat=True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            newcomer.status = PostStatus.DRAFT
+            newcomer.save()
+        self.assertFalse(PostRecommendation.objects.filter(target=newcomer).exists())
+        self.assertFalse(newcomer.recommendations.exists())
+
+    def test_updates_are_grouped_per_transaction_and_never_rebuild_idf(self):
+        recommendations.build_all()
+        with mock.patch.object(recommendations, 'update', wraps=recommendations.update) as update:
+            with self.captureOnCommitCallbacks(execute=True):
+                newcomer = make_post(self.user, self.category, title='Servomoteur continu', slug='continu',
+                                     content='<p>Un servomoteur à rotation continue en PWM.</p>')
+                newcomer.tags.add('servo')
+                newcomer.tags.remove('servo')
+                newcomer.tags.add('arduino')
+        self.assertEqual(update.call_args_list.count(mock.call(recommendations.POSTS, newcomer.pk)), 1)
+
+        # IDF évincés du cache : pas de relecture du corpus pendant la requête
+        cache.delete(recommendations.IDF_CACHE_KEY.format(recommendations.POSTS.kind))
+        with mock.patch.object(recommendations.Idf, 'from_documents') as from_documents:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.twin.title = 'Servomoteur, PWM et alimentation'
+                self.twin.save()
+        from_documents.assert_not_called()
+
+    def test_projects_are_matched_on_technologies(self):
+        common = {'description': 'Robot', 'start_date': '2024-01-01', 'is_approved': True,
+                  'project_type': 'robotics'}
+        rover = Project.objects.create(title='Rover', technologies='ESP32, ROS', **common)
+        arm = Project.objects.create(title='Bras', technologies='ROS, Python', **common)
+        Project.objects.create(title='Station', technologies='Raspberry Pi', **common)
+        recommendations.build(recommendations.PROJECTS)
+        self.assertEqual(recommendations.similar_projects(rover)[0], arm)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PlatformTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.get_or_create(name='Robotique', defaults={'slug': 'robotique'})[0]
+        self.post = make_post(self.user, self.category, title='Capteur sur ESP32', slug='capteur-esp32')
+        self.post.tags.add('esp32-s3', 'capteurs')
+
+    def test_membership_follows_tags_and_status(self):
+        esp32 = Platform.objects.get(slug='esp32')
+        self.assertEqual(list(platforms.posts_for(esp32)), [self.post])
+        self.assertEqual(platforms.get_platform('esp32').post_count, 1)
+
+        self.post.tags.remove('esp32-s3')
+        self.assertFalse(platforms.posts_for(esp32).exists())
+        self.post.tags.add('esp32')
+        self.post.status = PostStatus.DRAFT
+        self.post.save()
+        self.assertFalse(PlatformMembership.objects.filter(post=self.post).exists())
+        self.assertEqual(platforms.get_platform('esp32').post_count, 0)
+
+    def test_new_platform_needs_no_code(self):
+        make_post(self.user, self.category, title='Horloge STM32', slug='horloge').tags.add('stm32')
+        Platform.objects.create(name='STM32', slug='stm32', tag_slugs='stm32', subtitle='Cortex-M')
+
+        response = self.client.get('/robotique/stm32/')
+        self.assertContains(response, 'Horloge STM32')
+        self.assertContains(response, 'Cortex-M')
+        self.assertEqual(response.context['tutorials_count'], 1)
+
+        response = self.client.get('/robotique/')
+        sections = {platform.slug: posts for platform, posts in response.context['platforms']}
+        self.assertEqual([post.title for post in sections['stm32']], ['Horloge STM32'])
+        self.assertEqual(sections['esp32'], [self.post])
+
+    def test_legacy_url_names_use_the_generic_view(self):
+        self.assertEqual(reverse('raspberry_pi_detail'), '/robotique/raspberry-pi/')
+        response = self.client.get(reverse('esp32_detail'))
+        self.assertEqual(response.context['platform'].name, 'ESP32')
+        self.assertContains(response, 'Capteur sur ESP32')
+        self.assertContains(response, 'Dual-core 240MHz')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TagStatTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.robotics = Category.objects.create(name='Robotique')
+        self.web = Category.objects.create(name='Web')
+        self.post = make_post(self.user, self.robotics, title='Moteurs', slug='moteurs')
+        self.post.tags.add('arduino', 'moteurs')
+        other = make_post(self.user, self.web, title='API', slug='api')
+        other.tags.add('arduino', 'django')
+        make_post(self.user, self.web, title='Brouillon', slug='brouillon',
+                  status=PostStatus.DRAFT).tags.add('django', 'brouillon')
+
+    def counts(self, category=None):
+        return {tag.name: tag.num_times for tag in tag_stats.popular_tags(10, category)}
+
+    def assert_matches_rebuild(self):
+        stats = lambda: set(TagStat.objects.values_list('tag_id', 'category_id', 'published_count'))
+        incremental = stats()
+        tag_stats.rebuild()
+        self.assertEqual(incremental, stats())
+
+    def test_counts_follow_tags_status_and_category(self):
+        self.assertEqual(self.counts(), {'arduino': 2, 'moteurs': 1, 'django': 1})
+        self.assertEqual(self.counts(self.web), {'arduino': 1, 'django': 1})
+        # À égalité, ordre de création des étiquettes
+        self.assertEqual(list(self.counts()), ['arduino', 'moteurs', 'django'])
+
+        self.post.tags.set(['arduino', 'servo'])
+        self.post.category = self.web
+        self.post.save()
+        self.assertEqual(self.counts(self.robotics), {})
+        self.assertEqual(self.counts(self.web), {'arduino': 2, 'django': 1, 'servo': 1})
+
+        self.post.status = PostStatus.DRAFT
+        self.post.save()
+        self.assertEqual(self.counts(), {'arduino': 1, 'django': 1})
+        self.assert_matches_rebuild()
+
+        Post.objects.get(slug='api').delete()
+        self.post.tags.clear()
+        self.assertEqual(self.counts(), {})
+        self.assert_matches_rebuild()
+
+    def test_sidebars_read_the_stats(self):
+        response = self.client.get('/blog/')
+        self.assertEqual([tag.name for tag in response.context['popular_tags']], ['arduino', 'moteurs', 'django'])
+        response = self.client.get(self.robotics.get_absolute_url())
+        self.assertEqual([tag.name for tag in response.context['category_tags']], ['arduino', 'moteurs'])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ModerationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.author = User.objects.create_user('auteur', password='pass')
+        self.staff = User.objects.create_user('admin', password='pass', is_staff=True, is_superuser=True)
+        self.category = Category.objects.create(name='Robotique')
+        self.posts = []
+        for i in range(3):
+            post = make_post(self.author, self.category, title=f'Capteur ESP32 {i}', slug=f'capteur-{i}',
+                             status=PostStatus.PENDING, submitted_by=self.author)
+            post.tags.add('esp32')
+            self.posts.append(post)
+        self.projects = [
+            Project.objects.create(
+                title=f'Projet {i}', slug=f'projet-{i}', description='Description', technologies='C',
+                start_date='2024-01-01', is_approved=False,
+            )
+            for i in range(2)
+        ]
+        self.client.force_login(self.staff)
+
+    def bulk(self, action, posts=(), projects=()):
+        return self.client.post(reverse('bulk_moderation'), {
+            'action': action,
+            'post_ids': [post.pk for post in posts],
+            'project_ids': [project.pk for project in projects],
+        })
+
+    def test_bulk_approve_updates_derived_data_once_per_batch(self):
+        with mock.patch.object(Post, 'save') as save, \
+                mock.patch.object(page_cache, 'purge', wraps=page_cache.purge) as purge, \
+                mock.patch.object(home_cache, 'invalidate', wraps=home_cache.invalidate) as invalidate:
+            response = self.bulk('approve', self.posts, self.projects)
+        self.assertRedirects(response, reverse('moderation_dashboard'), fetch_redirect_response=False)
+        save.assert_not_called()
+        # Articles et projets du lot : une seule invalidation
+        self.assertEqual(purge.call_count, 1)
+        self.assertEqual(invalidate.call_count, 1)
+        self.assertIn('project-list', purge.call_args.args)
+        self.assertIn('post:{}'.format(self.posts[0].pk), purge.call_args.args)
+
+        for post in Post.objects.filter(pk__in=[post.pk for post in self.posts]):
+            self.assertEqual(post.status, PostStatus.PUBLISHED)
+            self.assertIsNotNone(post.published_at)
+            self.assertGreater(post.updated_at, self.posts[0].updated_at)
+        self.assertFalse(Project.objects.filter(is_approved=False).exists())
+        self.assertEqual({tag.name: tag.num_times for tag in tag_stats.popular_tags()}, {'esp32': 3})
+        self.assertEqual(platforms.get_platform('esp32').post_count, 3)
+        if search_index.is_available():
+            self.assertEqual(len(search_index.search('capteur', search_index.POST)), 3)
+
+    def test_bulk_reject_sends_posts_back_to_draft_and_hides_projects(self):
+        published = make_post(self.author, self.category, title='Publié', slug='publie')
+        rejected = self.projects[0]
+        Project.objects.filter(pk=rejected.pk).update(submitted_by=self.author)
+        response = self.bulk('reject', [*self.posts[:2], published], [rejected])
+        self.assertRedirects(response, reverse('moderation_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(
+            dict(Post.objects.values_list('slug', 'status')),
+            {'capteur-0': PostStatus.DRAFT, 'capteur-1': PostStatus.DRAFT, 'capteur-2': PostStatus.PENDING,
+             'publie': PostStatus.PUBLISHED},
+        )
+        # Rien n'est supprimé : le projet sort du tableau de bord et des listes
+        rejected.refresh_from_db()
+        self.assertIsNotNone(rejected.rejected_at)
+        self.assertFalse(rejected.is_approved)
+        response = self.client.get(reverse('moderation_dashboard'))
+        self.assertEqual(list(response.context['pending_projects']), [self.projects[1]])
+        self.client.logout()
+        response = self.client.get(reverse('projects'))
+        self.assertNotContains(response, 'Projet 0')
+        self.assertContains(response, 'Projet 1')
+
+        # Seul son auteur voit encore sa page, avec la mention du refus
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(reverse('project_detail', args=[rejected.slug])), 'Refusé par la modération')
+
+        # Une approbation depuis l'admin annule le refus
+        self.assertEqual(moderation.approve_projects([rejected.pk]), 1)
+        rejected.refresh_from_db()
+        self.assertEqual((rejected.is_approved, rejected.rejected_at), (True, None))
+
+    def test_admin_actions_use_the_batch(self):
+        response = self.client.post(reverse('admin:blogapp_post_changelist'), {
+            'action': 'approve_selected', '_selected_action': [post.pk for post in self.posts[:2]],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Post.objects.filter(status=PostStatus.PUBLISHED).count(), 2)
+
+    def test_dashboard_is_paginated(self):
+        for i in range(views.MODERATION_PAGE_SIZE):
+            make_post(self.author, self.category, title=f'En attente {i}', slug=f'attente-{i}',
+                      status=PostStatus.PENDING, submitted_by=self.author)
+        response = self.client.get(reverse('moderation_dashboard'))
+        page = response.context['pending_posts']
+        self.assertEqual(len(page), views.MODERATION_PAGE_SIZE)
+        self.assertEqual(response.context['pending_posts_count'], views.MODERATION_PAGE_SIZE + 3)
+        self.assertEqual(response.context['total_pending'], views.MODERATION_PAGE_SIZE + 5)
+        self.assertTrue(page.next_query.startswith('posts_after='))
+
+        response = self.client.get(reverse('moderation_dashboard') + '?' + page.next_query)
+        self.assertEqual(len(response.context['pending_posts']), 3)
+        self.assertEqual(len(response.context['pending_projects']), 2)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+        self.first = make_post(self.user, self.category, title='Premier', slug='premier')
+        self.second = make_post(self.user, self.category, title='Second', slug='second')
+        self.first.tags.add('arduino')
+
+    def render(self):
+        posts = list(Post.objects.filter(pk__in=[self.first.pk, self.second.pk])
+                     .select_related('author', 'category').order_by('pk'))
+        with mock.patch('blogapp.cards.render_to_string', wraps=cards.render_to_string) as rendered:
+            html = [str(card) for card in cards.render(posts, 'post-list')]
+        return [call.args[1]['post'].pk for call in rendered.call_args_list], html
+
+    def test_only_changed_cards_are_rendered_again(self):
+        self.assertEqual(self.render()[0], [self.first.pk, self.second.pk])
+        self.assertEqual(self.render()[0], [])
+
+        self.second.title = 'Second modifié'
+        self.second.save()
+        rendered, html = self.render()
+        self.assertEqual(rendered, [self.second.pk])
+        self.assertIn('Second modifié', html[1])
+
+        # Les étiquettes ne changent pas updated_at : invalidation explicite
+        self.first.tags.add('moteurs')
+        rendered, html = self.render()
+        self.assertEqual(rendered, [self.first.pk])
+        self.assertIn('moteurs', html[0])
+
+        self.category.name = 'Électronique'
+        self.category.save()
+        self.assertEqual(self.render()[0], [self.first.pk, self.second.pk])
+
+    def test_new_image_variants_change_the_card(self):
+        self.render()
+        variants = {'source': 'posts/photo.jpg', 'digest': 'aaaa', 'card': {}}
+        Post.objects.filter(pk=self.first.pk).update(image_variants=variants)
+        self.assertEqual(self.render()[0], [self.first.pk])
+        # Image remplacée sous le même nom : nouvelles variantes, même updated_at
+        Post.objects.filter(pk=self.first.pk).update(image_variants={**variants, 'digest': 'bbbb'})
+        self.assertEqual(self.render()[0], [self.first.pk])
+        self.assertEqual(self.render()[0], [])
+
+    def test_evicted_generation_does_not_revive_old_cards(self):
+        self.render()
+        self.category.name = 'Électronique'
+        self.category.save()
+        cache.delete(cards.GENERATION_KEY)
+        rendered, html = self.render()
+        self.assertEqual(rendered, [self.first.pk, self.second.pk])
+        self.assertIn('Électronique', html[0])
+
+    def test_listing_reads_cached_cards_with_live_counters(self):
+        # Connecté : le cache de pages est contourné, pas celui des cartes
+        self.client.force_login(self.user)
+        self.client.get('/blog/')
+        Post.objects.filter(pk=self.first.pk).update(views_count=42)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/blog/')
+        self.assertFalse(any('taggit_taggeditem' in query['sql'] for query in queries))
+        self.assertContains(response, 'arduino')
+        self.assertContains(response, '42')
+        self.assertNotContains(response, cards.SLOT)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class StaticAssetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def test_minify_css_keeps_strings(self):
+        css = "/* L'en-tête */\n.a > .b ,\n.c {\n    content: 'x  /* y */';\n    margin: 0 auto ;\n}\n"
+        self.assertEqual(assets.minify_css(css), ".a>.b,.c{content:'x  /* y */';margin:0 auto}")
+
+    def test_collect_minifies_hashes_and_precompresses(self):
+        source = os.path.join(self.root, 'src')
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'site.css'), 'w') as handle:
+            handle.write('.bloc {\n    color: red;\n}\n' * 40)
+        storage = assets.CompressedManifestStaticFilesStorage(location=os.path.join(self.root, 'out'))
+        # Copie faite par collectstatic avant le post-traitement
+        with open(os.path.join(source, 'css', 'site.css'), 'rb') as handle:
+            storage.save('css/site.css', handle)
+        list(storage.post_process({'css/site.css': (FileSystemStorage(location=source), 'css/site.css')}))
+
+        hashed = storage.hashed_files['css/site.css']
+        self.assertRegex(hashed, r'^css/site\.[0-9a-f]{12}\.css$')
+        with storage.open(hashed) as handle:
+            self.assertEqual(handle.read(), b'.bloc{color:red}' * 40)
+        with storage.open(hashed + '.gz') as handle:
+            self.assertEqual(gzip.decompress(handle.read()), b'.bloc{color:red}' * 40)
+        self.assertEqual(storage.exists(hashed + '.br'), assets.brotli is not None)
+        self.assertTrue(storage.exists('css/site.css.gz'))
+
+    def test_serve_negotiates_encoding_and_caches_hashed_names(self):
+        os.makedirs(os.path.join(self.root, 'css'))
+        for name, body in (('site.0123456789ab.css', b'.a{}' * 100), ('site.0123456789ab.css.gz', b'gz')):
+            with open(os.path.join(self.root, 'css', name), 'wb') as handle:
+                handle.write(body)
+        with override_settings(STATIC_ROOT=self.root):
+            response = self.client.get('/static/css/site.0123456789ab.css', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertEqual(b''.join(response.streaming_content), b'gz')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+            response = self.client.get('/static/css/site.0123456789ab.css')
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(len(b''.join(response.streaming_content)), 400)
+
+            # Fichier source pas encore collecté : nom non haché, revalidé
+            response = self.client.get('/static/css/base.css')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_pages_link_stylesheets_instead_of_inlining_them(self):
+        user = User.objects.create_user('auteur', password='pass')
+        post = make_post(user, Category.objects.create(name='Robotique'))
+        response = self.client.get(post.get_absolute_url())
+        self.assertNotContains(response, '<style>')
+        self.assertContains(response, '/static/css/base.css')
+        self.assertContains(response, '/static/blogapp/css/post_detail.css')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.body = bytes(range(256)) * 1024
+        os.makedirs(os.path.join(self.root, 'posts', 'variants', '3'))
+        for name in ('posts/photo.jpg', 'posts/variants/3/card-0123456789.jpg'):
+            with open(os.path.join(self.root, name), 'wb') as handle:
+                handle.write(self.body)
+        override = override_settings(MEDIA_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_parse_range(self):
+        self.assertEqual(file_serving.parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(file_serving.parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(file_serving.parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(file_serving.parse_range('bytes=990-2000', 1000), (990, 999))
+        self.assertIsNone(file_serving.parse_range('bytes=0-1,5-9', 1000))
+        self.assertIsNone(file_serving.parse_range('bytes=9-1', 1000))
+        with self.assertRaises(file_serving.RangeNotSatisfiable):
+            file_serving.parse_range('bytes=1000-', 1000)
+
+    def test_conditional_get_and_ranges(self):
+        response = self.client.get('/media/posts/photo.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client.get('/media/posts/photo.jpg', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get('/media/posts/photo.jpg', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/{}'.format(len(self.body)))
+        self.assertEqual(b''.join(response.streaming_content), self.body[100:200])
+
+        # Fichier modifié depuis la première lecture : tout le fichier
+        response = self.client.get('/media/posts/photo.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"autre"')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/media/posts/photo.jpg', HTTP_RANGE='bytes={}-'.format(len(self.body)))
+        self.assertEqual(response.status_code, 416)
+
+        response = self.client.get('/media/posts/variants/3/card-0123456789.jpg')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    @override_settings(SENDFILE_BACKEND='x-accel-redirect')
+    def test_offload_to_web_server(self):
+        response = self.client.get('/media/posts/photo.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/_sendfile/media/posts/photo.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CompressionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('auteur', password='pass')
+        self.category = Category.objects.create(name='Robotique')
+        self.post = make_post(self.user, self.category, title='Article compressé')
+
+    def test_minify_keeps_whitespace_sensitive_blocks(self):
+        html = (b'<div>\n        <p>Un   texte</p>\n\n    </div>\n'
+                b'<pre>  ligne 1\n    ligne 2</pre><CODE>a  =  1</CODE>\n  <script>\n  var a;\n</script>')
+        self.assertEqual(compression.minify_html(html), (
+            b'<div>\n<p>Un texte</p>\n</div>\n'
+            b'<pre>  ligne 1\n    ligne 2</pre><CODE>a  =  1</CODE>\n<script>\n  var a;\n</script>'
+        ))
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_pages_are_minified_and_compressed(self):
+        plain = self.client.get('/blog/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        self.assertIn(b'\n<nav class="navbar" id="navbar">\n<div', plain.content)
+        self.assertEqual(plain['Content-Length'], str(len(plain.content)))
+
+        response = self.client.get('/blog/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn(b'Article compress', gzip.decompress(response.content))
+
+    def test_streaming_responses_are_compressed_chunk_by_chunk(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        chunks = [b'<p>bloc %d</p>\n' % i * 50 for i in range(3)]
+        middleware = compression.CompressionMiddleware(lambda request: StreamingHttpResponse(iter(chunks)))
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        # Chaque bloc est vidé aussitôt : un morceau compressé par bloc
+        parts = list(response.streaming_content)
+        self.assertEqual(len(parts), len(chunks) + 1)
+        self.assertEqual(gzip.decompress(b''.join(parts)), b''.join(chunks))
+
+    def test_encoded_and_file_responses_are_left_alone(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        encoded = HttpResponse(b'x' * 1000, content_type='text/css')
+        encoded['Content-Encoding'] = 'br'
+        response = compression.CompressionMiddleware(lambda request: encoded)(request)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response.content, b'x' * 1000)
+
+        small = compression.CompressionMiddleware(lambda request: HttpResponse(b'<p>court</p>'))(request)
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+    def test_cached_pages_keep_their_compressed_variants(self):
+        self.assertEqual(self.client.get('/blog/', HTTP_ACCEPT_ENCODING='gzip')['X-Page-Cache'], 'MISS')
+        with mock.patch('blogapp.compression.compress_body') as compress_body, self.assertNumQueries(0):
+            response = self.client.get('/blog/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        compress_body.assert_not_called()
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.client.get('/blog/').content)
+
+
+@override_settings(CACHES=TEST_CACHES, ROOT_URLCONF='monblog.asgi_urls', PAGE_CACHE_ENABLED=False,
+                   VIEW_COUNTER_FLUSH_INTERVAL=3600, VIEW_COUNTER_FLUSH_THRESHOLD=10 ** 6)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        self.author = User.objects.create_user('auteur', password='pass')
+        self.staff = User.objects.create_user('admin', password='pass', is_staff=True, is_superuser=True)
+        seed_content(self.author, self.staff, size=3)
+        self.post = Post.objects.get(slug='robotique-1')
+
+    def test_read_pages_are_async_and_match_sync_queries(self):
+        for url in ('/', '/robotique/', self.post.get_absolute_url()):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func), url)
+            with CaptureQueriesContext(connection) as sync_queries, override_settings(ROOT_URLCONF='monblog.urls'):
+                expected = self.client.get(url)
+            cache.clear()
+            with CaptureQueriesContext(connection) as async_queries:
+                response = async_to_sync(self.async_client.get)(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.context['request'].resolver_match.func.__module__, 'blogapp.async_views')
+            self.assertLessEqual(len(async_queries), len(sync_queries), url)
+            self.assertEqual(
+                [(key, response.context[key]) for key in ('all_posts', 'similar_posts', 'previous_post', 'next_post')
+                 if key in response.context],
+                [(key, expected.context[key]) for key in ('all_posts', 'similar_posts', 'previous_post', 'next_post')
+                 if key in expected.context],
+            )
+        self.assertContains(response, 'Question 1')
+
+    def test_other_routes_keep_their_sync_views(self):
+        self.assertEqual(resolve('/blog/nouveau/').url_name, 'create_post')
+        self.assertFalse(asyncio.iscoroutinefunction(resolve('/blog/').func))
+
+    def test_drafts_and_forms_fall_back_to_the_sync_view(self):
+        pending = Post.objects.get(slug='attente-0')
+        async_to_sync(self.async_client.aforce_login)(self.author)
+        response = async_to_sync(self.async_client.get)(pending.get_absolute_url())
+        self.assertContains(response, 'Votre article est en attente')
+
+        response = async_to_sync(self.async_client.post)(self.post.get_absolute_url(), {
+            'comment_submit': '1', 'content': 'Commentaire asynchrone',
+        })
+        self.assertRedirects(response, self.post.get_absolute_url(), fetch_redirect_response=False)
+        self.assertTrue(Comment.objects.filter(post=self.post, content='Commentaire asynchrone').exists())
+
+    @override_settings(PAGE_CACHE_ENABLED=True)
+    def test_page_cache_and_conditional_get_wrap_async_views(self):
+        url = self.post.get_absolute_url()
+        response = async_to_sync(self.async_client.get)(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = async_to_sync(self.async_client.get)(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(view_counter.pending(self.post.pk), 2)
+
+
+@override_settings(CACHES=TEST_CACHES, PAGE_CACHE_ENABLED=False)
+class BenchmarkTests(TransactionTestCase):
+    available_apps = LoadTestLiveTests.available_apps
+    databases = LoadTestLiveTests.databases
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(view_counter.discard)
+        user = User.objects.create_user('auteur', password='pass')
+        seed_content(user, user, size=2)
+
+    def test_wsgi_and_asgi_serve_the_same_pages(self):
+        from monblog.asgi import application as asgi_application
+        from monblog.wsgi import application as wsgi_application
+
+        rng = random.Random(1)
+        paths = benchmark.sample_requests(
+            12, loadtest.Traffic(routes=benchmark.READ_MIX, rng=rng), loadtest.Sampler(loadtest.load_samples(), rng),
+        )
+        wsgi = benchmark.run_wsgi(wsgi_application, paths, threads=2, concurrency=4).summary()
+        asgi = asyncio.run(benchmark.run_asgi(asgi_application, paths, concurrency=4)).summary()
+        for report in (wsgi, asgi):
+            self.assertEqual(report['requests'], 12)
+            for name, route in report['routes'].items():
+                self.assertEqual(route['statuses'], {'200': route['requests']}, name)
+        self.assertEqual(set(loadtest.compare(asgi, wsgi)), set(asgi['routes']))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SQLiteProfileTests(TransactionTestCase):
+    available_apps = LoadTestLiveTests.available_apps
+    databases = LoadTestLiveTests.databases
+
+    def setUp(self):
+        self.addCleanup(view_counter.discard)
+        user = User.objects.create_user('auteur', password='pass')
+        seed_content(user, user, size=2)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        # Connexions déclarées par le banc d'essai, absentes de DATABASES
+        aliases = {*self.databases, *map(sqlite_profile.alias_for, sqlite_profile.profiles())}
+        patcher = mock.patch.object(type(self), 'databases', aliases)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pragmas_applied_to_new_connections(self):
+        alias = sqlite_profile.alias_for('production')
+        path = os.path.join(self.directory, 'profil.sqlite3')
+        sqlite_profile.copy_database(path)
+        sqlite_profile.register(alias, path, sqlite_profile.profiles()['production'])
+        self.addCleanup(sqlite_profile.unregister, alias)
+        profile = connections[alias]
+        self.addCleanup(profile.close)
+        self.assertEqual(sqlite_profile.pragmas(profile), {
+            'journal_mode': 'wal', 'busy_timeout': 5000, 'synchronous': 1,
+            'mmap_size': 128 * 1024 * 1024, 'cache_size': -20000, 'temp_store': 2,
+        })
+        self.assertEqual(profile.transaction_mode, 'IMMEDIATE')
+
+    def test_compare_profiles_reports_both_profiles(self):
+        operations = sqlite_profile.sample_operations(40, random.Random(0))
+        reports = sqlite_profile.compare_profiles(self.directory, operations, threads=4, work=0)
+        self.assertEqual(set(reports), {'django', 'production'})
+        self.assertEqual(reports['production']['requests'], 40)
+        self.assertEqual(reports['production']['pragmas']['journal_mode'], 'wal')
+        self.assertEqual(reports['django']['pragmas']['journal_mode'], 'delete')
+        self.assertEqual(reports['production']['lock_errors'], 0)
+        self.assertNotIn(sqlite_profile.alias_for('production'), connections.settings)
+
+
+@override_settings(CACHES=TEST_CACHES, PAGE_CACHE_ENABLED=False)
+class ReadReplicaRouterTests(TransactionTestCase):
+    available_apps = LoadTestLiveTests.available_apps
+    databases = LoadTestLiveTests.databases
+
+    def setUp(self):
+        self.addCleanup(view_counter.discard)
+        self.user = User.objects.create_user('lecteur', password='secret')
+        self.post = make_post(self.user, Category.objects.create(name='Robotique'), title='Article répliqué')
+
+    def get_queries(self, *args, **kwargs):
+        with CaptureQueriesContext(connections['replica']) as replica, CaptureQueriesContext(connection) as primary:
+            response = self.client.get(*args, **kwargs)
+        return response, len(replica), len(primary)
+
+    def test_reads_use_the_replica_outside_transactions(self):
+        response, replica, primary = self.get_queries('/blog/')
+        self.assertContains(response, 'Article répliqué')
+        self.assertGreater(replica, 0)
+        self.assertEqual(primary, 0)
+        self.assertEqual(Post.objects.all().db, 'replica')
+        with transaction.atomic():
+            self.assertEqual(Post.objects.all().db, 'default')
+        self.assertEqual(Post.objects.all().db, 'replica')
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        self.client.force_login(self.user)
+        url = self.post.get_absolute_url()
+        response = self.client.post(url, {'comment_submit': '1', 'content': 'Lu sur la base principale'})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+
+        response, replica, primary = self.get_queries(url)
+        self.assertContains(response, 'Lu sur la base principale')
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+
+        del self.client.cookies[db_router.PIN_COOKIE]
+        _, replica, _ = self.get_queries(url)
+        self.assertGreater(replica, 0)
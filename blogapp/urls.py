@@ -41,6 +41,7 @@ urlpatterns = [
 
  
     path('moderation/', views.moderation_dashboard, name='moderation_dashboard'),
+    path('moderation/lot/', views.bulk_moderation, name='bulk_moderation'),
     path('projects/<slug:slug>/approve/', views.approve_project, name='approve_project'),
     path('posts/<slug:slug>/approve/', views.approve_post, name='approve_post'),
 
@@ -48,8 +49,10 @@ urlpatterns = [
 
 
 
-    path('robotique/arduino/', views.arduino_detail, name='arduino_detail'),
-    path('robotique/esp32/', views.esp32_detail, name='esp32_detail'),
-    path('robotique/raspberry-pi/', views.raspberry_pi_detail, name='raspberry_pi_detail'),
+    # Anciennes adresses nommées des trois premières plateformes
+    path('robotique/arduino/', views.platform_detail, {'slug': 'arduino'}, name='arduino_detail'),
+    path('robotique/esp32/', views.platform_detail, {'slug': 'esp32'}, name='esp32_detail'),
+    path('robotique/raspberry-pi/', views.platform_detail, {'slug': 'raspberry-pi'}, name='raspberry_pi_detail'),
+    path('robotique/<slug:slug>/', views.platform_detail, name='platform_detail'),
 ]
  
\ No newline at end of file
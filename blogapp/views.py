@@ -5,10 +5,11 @@ from django.contrib.auth import login, authenticate , logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q, Count, Avg
+from django.db import transaction
+from django.db.models import Q, Count, Sum
 from django.http import JsonResponse, Http404
-from django.views.decorators.http import require_http_methods
+from django.template.loader import select_template
+from django.views.decorators.http import require_http_methods, require_POST
 from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.decorators import permission_required, user_passes_test
@@ -19,6 +20,11 @@ from .models import (
     Post, Category, Comment, PostRating, Project, 
     UserProfile, PostStatus, DifficultyLevel
 )
+from . import conditional, home_cache, moderation, page_cache, platforms, recommendations, search_index, tag_stats, view_counter
+from .comments import load_comment_tree
+from .counters import LIKE_RATING
+from .page_cache import cache_page_for_anonymous
+from .pagination import paginate
 from .forms import (
     PostForm, CommentForm, RatingForm, ProjectForm, 
     UserProfileForm, CustomUserCreationForm
@@ -26,45 +32,31 @@ from .forms import (
 
 
 
+# Ordres stables pour la pagination par curseur
+POST_ORDERING = ['-created_at', '-id']
+PROJECT_ORDERING = ['-is_featured', '-created_at', '-id']
+MODERATION_PAGE_SIZE = 20
+
+
 def is_admin(user):
     return user.is_staff or user.is_superuser
 
 
 def home(request):
     """Vue d'accueil"""
-    # Articles récents
-    recent_posts = Post.objects.filter(
-        status=PostStatus.PUBLISHED
-    ).select_related('author', 'category').prefetch_related('tags')[:6]
-    
-    # Projets mis en avant
-    featured_projects = Project.objects.filter(is_featured=True)[:3]
-    
-    # Catégories avec compteurs
-    categories = Category.objects.annotate(
-        post_count=Count('posts', filter=Q(posts__status=PostStatus.PUBLISHED))
-    ).filter(post_count__gt=0)[:6]
-    
-    # Statistiques
-    stats = {
-        'total_posts': Post.objects.filter(status=PostStatus.PUBLISHED).count(),
-        'total_projects': Project.objects.count(),
-        'total_categories': categories.count(),
-    }
-    
-    context = {
-        'recent_posts': recent_posts,
-        'featured_projects': featured_projects,
-        'categories': categories,
-        'stats': stats,
-    }
+    # Articles récents, projets mis en avant, catégories et statistiques
+    # viennent d'un instantané en cache (voir home_cache)
+    context = dict(home_cache.get_snapshot())
     return render(request, 'blogapp/home.html', context)
 
+@cache_page_for_anonymous
+@conditional.condition(conditional.post_list_state)
 def post_list(request):
     """Liste des articles avec filtres et recherche"""
+    # Étiquettes chargées seulement pour les cartes absentes du cache (cards.py)
     posts = Post.objects.filter(status=PostStatus.PUBLISHED).select_related(
         'author', 'category'
-    ).prefetch_related('tags')
+    )
     
     # Filtres
     category_slug = request.GET.get('category')
@@ -82,20 +74,24 @@ def post_list(request):
         posts = posts.filter(difficulty_level=difficulty)
     
     if search:
-        posts = posts.filter(
-            Q(title__icontains=search) |
-            Q(excerpt__icontains=search) |
-            Q(content__icontains=search)
-        )
+        if search_index.is_available():
+            posts = posts.filter(pk__in=search_index.matching_ids_sql(search, search_index.POST))
+        else:
+            posts = posts.filter(
+                Q(title__icontains=search) |
+                Q(excerpt__icontains=search) |
+                Q(content__icontains=search)
+            )
     
-    # Pagination
-    paginator = Paginator(posts, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination par curseur
+    page_obj = paginate(request, posts, 9, POST_ORDERING)
     
     # Données pour les filtres
     categories = Category.objects.all()
-    popular_tags = Post.tags.most_common()[:10]
+    # Compteurs tenus à jour par les signaux (voir tag_stats.py)
+    popular_tags = tag_stats.popular_tags(10)
+    
+    page_cache.add_tags(request, 'post-list')
     
     context = {
         'page_obj': page_obj,
@@ -109,8 +105,11 @@ def post_list(request):
     }
     return render(request, 'blogapp/post_list.html', context)
 
+@cache_page_for_anonymous
 def robotics_posts(request):
     """Page spéciale Robotique"""
+    page_cache.add_tags(request, 'post-list', 'project-list', 'platform-list')
+    platform_list = platforms.get_platforms()
     try:
         robotics_category = Category.objects.get(slug='robotique')
     except Category.DoesNotExist:
@@ -118,9 +117,7 @@ def robotics_posts(request):
         context = {
             'category': None,
             'all_posts': [],
-            'arduino_posts': [],
-            'esp32_posts': [],
-            'raspberry_posts': [],
+            'platforms': [],
             'robotics_projects': [],
             'error_message': 'Aucune catégorie Robotique trouvée'
         }
@@ -129,28 +126,36 @@ def robotics_posts(request):
     posts = Post.objects.filter(
         category=robotics_category,
         status=PostStatus.PUBLISHED
-    ).select_related('author').prefetch_related('tags')
+    ).select_related('author')
     
-    # Sous-catégories par tags
-    arduino_posts = posts.filter(tags__name__icontains='arduino')
-    esp32_posts = posts.filter(tags__name__icontains='esp32')
-    raspberry_posts = posts.filter(tags__name__icontains='raspberry')
+    # Derniers articles de chaque plateforme (une seule requête)
+    latest = platforms.latest_posts(platform_list, 3)
     
     # Projets robotique
-    robotics_projects = Project.objects.filter(
-        project_type='robotics'
-    ).order_by('-is_featured', '-created_at')
+    robotics_projects = list(Project.objects.filter(
+        project_type='robotics', rejected_at__isnull=True
+    ).order_by('-is_featured', '-created_at')[:4])
     
     context = {
         'category': robotics_category,
-        'all_posts': posts,
-        'arduino_posts': arduino_posts[:3],
-        'esp32_posts': esp32_posts[:3],
-        'raspberry_posts': raspberry_posts[:3],
-        'robotics_projects': robotics_projects[:4],
+        'all_posts': list(posts[:6]),
+        'all_posts_count': posts.count(),
+        'platforms': [(platform, latest[platform.pk]) for platform in platform_list],
+        'robotics_projects': robotics_projects,
     }
     return render(request, 'blogapp/robotics_posts.html', context)
 
+def _count_cached_view(request, meta):
+    """Une page servie depuis le cache compte quand même comme une vue"""
+    if meta.get('post_id'):
+        view_counter.record(meta['post_id'])
+
+def _count_not_modified_view(request, parts):
+    """Une réponse 304 (page déjà chez le lecteur) compte aussi"""
+    view_counter.record(parts[0])
+
+@cache_page_for_anonymous(on_hit=_count_cached_view)
+@conditional.condition(conditional.post_detail_state, on_not_modified=_count_not_modified_view)
 def post_detail(request, slug):
     """Détail d'un article"""
     # Récupérer l'article même s'il n'est pas publié
@@ -182,16 +187,13 @@ def post_detail(request, slug):
     
     # Commentaires (seulement pour les articles publiés ou en attente d'approbation)
     if post.status == PostStatus.PUBLISHED:
-        comments = post.comments.filter(
-            is_approved=True,
-            parent=None
-        ).select_related('author').prefetch_related('replies')
+        comments = load_comment_tree(post)
     else:
         comments = []  # Pas de commentaires pour les articles non publiés
     
     # Note moyenne (seulement pour les articles publiés)
     if post.status == PostStatus.PUBLISHED:
-        avg_rating = post.ratings.aggregate(avg_rating=Avg('rating'))['avg_rating']
+        avg_rating = post.avg_rating
         user_rating = None
         
         if request.user.is_authenticated:
@@ -205,13 +207,24 @@ def post_detail(request, slug):
     
     # Articles similaires (seulement pour les articles publiés)
     if post.status == PostStatus.PUBLISHED:
-        similar_posts = Post.objects.filter(
-            category=post.category,
-            status=PostStatus.PUBLISHED
-        ).exclude(id=post.id)[:3]
+        similar_posts = recommendations.similar_posts(post)
     else:
         similar_posts = []
     
+    # Navigation entre articles
+    previous_post = post.get_previous_post()
+    next_post = post.get_next_post()
+    
+    # Objets affichés sur la page (pour l'invalidation du cache de page)
+    page_cache.add_tags(
+        request,
+        'post:{}'.format(post.pk),
+        'category:{}'.format(post.category_id),
+        *['post:{}'.format(other.pk) for other in (*similar_posts, previous_post, next_post) if other]
+    )
+    if post.status == PostStatus.PUBLISHED:
+        page_cache.set_meta(request, post_id=post.pk)
+    
     # Formulaires
     comment_form = CommentForm()
     rating_form = RatingForm()
@@ -237,14 +250,16 @@ def post_detail(request, slug):
             elif 'rating_submit' in request.POST:
                 rating_form = RatingForm(request.POST)
                 if rating_form.is_valid():
-                    rating, created = PostRating.objects.get_or_create(
-                        post=post,
-                        user=request.user,
-                        defaults={'rating': rating_form.cleaned_data['rating']}
-                    )
-                    if not created:
-                        rating.rating = rating_form.cleaned_data['rating']
-                        rating.save()
+                    # La note et les compteurs de l'article changent ensemble
+                    with transaction.atomic():
+                        rating, created = PostRating.objects.get_or_create(
+                            post=post,
+                            user=request.user,
+                            defaults={'rating': rating_form.cleaned_data['rating']}
+                        )
+                        if not created:
+                            rating.rating = rating_form.cleaned_data['rating']
+                            rating.save()
                     messages.success(request, 'Note enregistrée!')
                     return redirect('post_detail', slug=slug)
         else:
@@ -253,7 +268,10 @@ def post_detail(request, slug):
     context = {
         'post': post,
         'comments': comments,
+        'comments_count': comments.count if comments else 0,
         'similar_posts': similar_posts,
+        'previous_post': previous_post,
+        'next_post': next_post,
         'comment_form': comment_form,
         'rating_form': rating_form,
         'avg_rating': avg_rating,
@@ -320,9 +338,12 @@ def edit_post(request, slug):
         'title': 'Modifier Article'
     })
 
+@cache_page_for_anonymous
+@conditional.condition(conditional.projects_state)
 def projects(request):
     """Liste des projets"""
-    projects_list = Project.objects.all().order_by('-is_featured', '-created_at')
+    page_cache.add_tags(request, 'project-list')
+    projects_list = Project.objects.filter(rejected_at__isnull=True).order_by('-is_featured', '-created_at')
     
     # Filtres
     project_type = request.GET.get('type')
@@ -334,10 +355,8 @@ def projects(request):
     if status:
         projects_list = projects_list.filter(status=status)
     
-    # Pagination
-    paginator = Paginator(projects_list, 6)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination par curseur
+    page_obj = paginate(request, projects_list, 6, PROJECT_ORDERING)
     
     context = {
         'page_obj': page_obj,
@@ -348,14 +367,18 @@ def projects(request):
     }
     return render(request, 'blogapp/projects.html', context)
 
+@cache_page_for_anonymous
+@conditional.condition(conditional.project_detail_state)
 def project_detail(request, slug):
     """Détail d'un projet"""
     project = get_object_or_404(Project, slug=slug)
+    # Un projet refusé n'est plus visible que par son auteur et l'équipe
+    if project.rejected_at and not (request.user.is_staff or request.user == project.submitted_by):
+        raise Http404("Page non trouvée")
+    page_cache.add_tags(request, 'project:{}'.format(project.pk), 'project-list')
     
     # Projets similaires
-    similar_projects = Project.objects.filter(
-        project_type=project.project_type
-    ).exclude(id=project.id)[:3]
+    similar_projects = recommendations.similar_projects(project)
     
     context = {
         'project': project,
@@ -363,22 +386,23 @@ def project_detail(request, slug):
     }
     return render(request, 'blogapp/project_detail.html', context)
 
+@cache_page_for_anonymous
 def category_posts(request, slug):
     """Articles d'une catégorie"""
     category = get_object_or_404(Category, slug=slug)
+    page_cache.add_tags(request, 'category:{}'.format(category.pk), 'post-list')
     posts = Post.objects.filter(
         category=category,
         status=PostStatus.PUBLISHED
-    ).select_related('author').prefetch_related('tags')
+    ).select_related('author')
     
-    # Pagination
-    paginator = Paginator(posts, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination par curseur (le total est affiché dans l'en-tête)
+    page_obj = paginate(request, posts, 9, POST_ORDERING, with_count=True)
     
     context = {
         'category': category,
         'page_obj': page_obj,
+        'category_tags': tag_stats.popular_tags(15, category),
     }
     return render(request, 'blogapp/category_posts.html', context)
 
@@ -388,11 +412,27 @@ def profile(request):
     if is_admin(request.user):
         return redirect('admin_profile')
     user_profile, created = UserProfile.objects.get_or_create(user=request.user)
-    user_posts = Post.objects.filter(author=request.user).order_by('-created_at')
+    user_posts = Post.objects.filter(author=request.user).select_related('category')
+    
+    # Pagination par curseur; les totaux viennent d'une seule agrégation
+    page_obj = paginate(request, user_posts, 10, POST_ORDERING)
+    post_stats = user_posts.aggregate(
+        total=Count('pk'),
+        published=Count('pk', filter=Q(status=PostStatus.PUBLISHED)),
+        draft=Count('pk', filter=Q(status=PostStatus.DRAFT)),
+        views=Sum('views_count'),
+    )
+    if page_obj.number == 1:
+        recent_posts = page_obj.object_list[:3]
+    else:
+        recent_posts = list(user_posts.order_by('-created_at')[:3])
     
     context = {
         'user_profile': user_profile,
-        'user_posts': user_posts,
+        'page_obj': page_obj,
+        'post_stats': post_stats,
+        'recent_posts': recent_posts,
+        'total_views': post_stats['views'] or 0,
     }
     return render(request, 'blogapp/profile.html', context)
 
@@ -471,26 +511,32 @@ def toggle_like(request, post_id):
     """Like/Unlike un article"""
     post = get_object_or_404(Post, id=post_id)
     
-    # Ici vous pourriez implémenter un système de likes
-    # Pour simplifier, on utilise les ratings
-    rating, created = PostRating.objects.get_or_create(
-        post=post,
-        user=request.user,
-        defaults={'rating': 5}
-    )
-    
-    if not created:
-        rating.delete()
-        liked = False
-    else:
-        liked = True
+    # Le « j'aime » est porté par la note de l'utilisateur (is_like)
+    with transaction.atomic():
+        rating, created = PostRating.objects.get_or_create(
+            post=post,
+            user=request.user,
+            defaults={'rating': LIKE_RATING, 'is_like': True}
+        )
+        
+        if created:
+            liked = True
+        elif rating.is_like:
+            rating.delete()
+            liked = False
+        else:
+            # Note déjà donnée avec le formulaire : elle est conservée
+            rating.is_like = True
+            rating.save(update_fields=['is_like'])
+            liked = True
     
-    likes_count = post.ratings.count()
+    # Compteur dénormalisé, mis à jour par les signaux
+    post.refresh_from_db(fields=['like_count'])
     
     return JsonResponse({
         'success': True,
         'liked': liked,
-        'likes_count': likes_count
+        'likes_count': post.like_count
     })
 
 def search(request):
@@ -499,19 +545,31 @@ def search(request):
     results = []
     
     if query and len(query) >= 3:
-        # Recherche dans les posts
-        posts = Post.objects.filter(
-            Q(title__icontains=query) |
-            Q(excerpt__icontains=query) |
-            Q(content__icontains=query),
-            status=PostStatus.PUBLISHED
-        ).select_related('author', 'category')[:10]
-        
-        # Recherche dans les projets
-        projects = Project.objects.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query)
-        )[:5]
+        if search_index.is_available():
+            # Index plein texte : résultats classés (BM25) avec extraits surlignés
+            posts = _ranked_results(
+                Post.objects.select_related('author', 'category'),
+                search_index.search(query, search_index.POST, limit=10)
+            )
+            projects = _ranked_results(
+                Project.objects.all(),
+                search_index.search(query, search_index.PROJECT, limit=5)
+            )
+        else:
+            # Recherche dans les posts
+            posts = Post.objects.filter(
+                Q(title__icontains=query) |
+                Q(excerpt__icontains=query) |
+                Q(content__icontains=query),
+                status=PostStatus.PUBLISHED
+            ).select_related('author', 'category')[:10]
+            
+            # Recherche dans les projets
+            projects = Project.objects.filter(
+                Q(title__icontains=query) |
+                Q(description__icontains=query),
+                rejected_at__isnull=True
+            )[:5]
         
         results = {
             'posts': posts,
@@ -523,6 +581,18 @@ def search(request):
         'query': query
     })
 
+def _ranked_results(queryset, hits):
+    """Charger les objets trouvés dans l'ordre du classement, avec leurs extraits"""
+    objects = queryset.in_bulk([pk for pk, _, _ in hits])
+    results = []
+    for pk, title, snippet in hits:
+        obj = objects.get(pk)
+        if obj is not None:
+            obj.search_title = title
+            obj.search_snippet = snippet
+            results.append(obj)
+    return results
+
 # Vue pour les erreurs 404
 def custom_404(request, exception):
     return render(request, 'errors/404.html', status=404)
@@ -651,8 +721,7 @@ def approve_project(request, slug):
     project = get_object_or_404(Project, slug=slug)
     
     if not project.is_approved:
-        project.is_approved = True
-        project.save()
+        moderation.approve_projects([project.pk])
         messages.success(request, f'Le projet "{project.title}" a été approuvé!')
     else:
         messages.info(request, f'Le projet "{project.title}" est déjà approuvé.')
@@ -667,9 +736,7 @@ def approve_post(request, slug):
     post = get_object_or_404(Post, slug=slug)
     
     if post.status == PostStatus.PENDING:
-        post.status = PostStatus.PUBLISHED
-        post.published_at = timezone.now()
-        post.save()
+        moderation.approve_posts([post.pk])
         messages.success(request, f'L\'article "{post.title}" a été publié!')
     elif post.status == PostStatus.PUBLISHED:
         messages.info(request, f'L\'article "{post.title}" est déjà publié.')
@@ -689,25 +756,49 @@ def moderation_dashboard(request):
     if not request.user.is_staff and not request.user.is_superuser:
         raise Http404("Page non trouvée")
     
-    pending_posts = Post.objects.filter(status=PostStatus.PENDING)
-    pending_projects = Project.objects.filter(is_approved=False)
-    
-    # Compter les éléments en attente
-    pending_posts_count = pending_posts.count()
-    pending_projects_count = pending_projects.count()
-    total_pending = pending_posts_count + pending_projects_count
+    # Deux listes paginées par curseur sur la même page; auteur de la
+    # soumission et catégorie lus dans la même requête que la page
+    pending_posts = paginate(
+        request, Post.objects.filter(status=PostStatus.PENDING).select_related('submitted_by', 'category'),
+        MODERATION_PAGE_SIZE, POST_ORDERING, with_count=True, prefix='posts_',
+    )
+    pending_projects = paginate(
+        request, Project.objects.filter(is_approved=False, rejected_at__isnull=True).select_related('submitted_by'),
+        MODERATION_PAGE_SIZE, PROJECT_ORDERING, with_count=True, prefix='projects_',
+    )
     
     context = {
         'pending_posts': pending_posts,
         'pending_projects': pending_projects,
-        'pending_posts_count': pending_posts_count,
-        'pending_projects_count': pending_projects_count,
-        'total_pending': total_pending,
+        'pending_posts_count': pending_posts.count,
+        'pending_projects_count': pending_projects.count,
+        'total_pending': pending_posts.count + pending_projects.count,
     }
     return render(request, 'blogapp/moderation_dashboard.html', context)
 
 
 
+@user_passes_test(is_admin)
+@login_required
+@require_POST
+def bulk_moderation(request):
+    """Approuver ou refuser les articles et projets cochés, en un seul lot"""
+    action = request.POST.get('action')
+    if action not in moderation.ACTIONS:
+        messages.error(request, 'Action de modération inconnue.')
+        return redirect('moderation_dashboard')
+    post_ids = [pk for pk in request.POST.getlist('post_ids') if pk.isdigit()]
+    project_ids = [pk for pk in request.POST.getlist('project_ids') if pk.isdigit()]
+    if not post_ids and not project_ids:
+        messages.info(request, 'Aucun élément sélectionné.')
+        return redirect('moderation_dashboard')
+
+    posts, projects = moderation.moderate(action, post_ids, project_ids)
+    if action == moderation.APPROVE:
+        messages.success(request, f'{posts} article(s) publié(s), {projects} projet(s) approuvé(s).')
+    else:
+        messages.success(request, f'{posts} article(s) renvoyé(s) en brouillon, {projects} projet(s) refusé(s).')
+    return redirect('moderation_dashboard')
 
 
 @user_passes_test(is_admin)
@@ -715,7 +806,7 @@ def moderation_dashboard(request):
 def admin_profile(request):
     """Profil administrateur avec outils de gestion"""
     user_profile, created = UserProfile.objects.get_or_create(user=request.user)
-    user_posts = Post.objects.filter(author=request.user).order_by('-created_at')
+    user_posts = Post.objects.filter(author=request.user).select_related('category').order_by('-created_at')
     
     # Statistiques pour le tableau de bord
     stats = {
@@ -742,44 +833,25 @@ def admin_profile(request):
 
 
 
-def arduino_detail(request):
-    """Page détaillée Arduino"""
-    arduino_posts = Post.objects.filter(
-        tags__name__icontains='arduino',
-        status=PostStatus.PUBLISHED
-    ).select_related('author', 'category').prefetch_related('tags')[:6]
-    
-    context = {
-        'platform': 'Arduino',
-        'posts': arduino_posts,
-        'tutorials_count': arduino_posts.count(),
-    }
-    return render(request, 'blogapp/platform_detail.html', context)
-
-def esp32_detail(request):
-    """Page détaillée ESP32"""
-    esp32_posts = Post.objects.filter(
-        tags__name__icontains='esp32',
-        status=PostStatus.PUBLISHED
-    ).select_related('author', 'category').prefetch_related('tags')[:6]
-    
-    context = {
-        'platform': 'ESP32',
-        'posts': esp32_posts,
-        'tutorials_count': esp32_posts.count(),
-    }
-    return render(request, 'blogapp/platform_detail.html', context)
-
-def raspberry_pi_detail(request):
-    """Page détaillée Raspberry Pi"""
-    raspberry_posts = Post.objects.filter(
-        tags__name__icontains='raspberry',
-        status=PostStatus.PUBLISHED
-    ).select_related('author', 'category').prefetch_related('tags')[:6]
+@cache_page_for_anonymous
+def platform_detail(request, slug):
+    """Page détaillée d'une plateforme (Arduino, ESP32, Raspberry Pi...)"""
+    platform = platforms.get_platform(slug)
+    if platform is None:
+        raise Http404("Plateforme introuvable")
+    page_cache.add_tags(request, 'post-list', 'platform-list')
+    posts = list(
+        platforms.posts_for(platform).select_related('author', 'category')[:6]
+    )
     
     context = {
-        'platform': 'Raspberry Pi',
-        'posts': raspberry_posts,
-        'tutorials_count': raspberry_posts.count(),
+        'platform': platform,
+        'posts': posts,
+        'tutorials_count': platform.post_count,
+        # Sections propres à la plateforme (spécifications, variantes), facultatives
+        'guide_template': select_template([
+            'blogapp/platforms/{}.html'.format(platform.slug),
+            'blogapp/platforms/default.html',
+        ]),
     }
     return render(request, 'blogapp/platform_detail.html', context)
\ No newline at end of file
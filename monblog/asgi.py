@@ -5,12 +5,31 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Sous ASGI, les pages de lecture (accueil, robotique, détail d'un article)
+sont servies par les vues asynchrones de blogapp/async_views.py
+(``ASGI_URLCONF``). Les connexions à la base n'y sont pas persistantes.
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'monblog.settings')
+# Chaque requête ASGI passe dans un autre thread : une connexion persistante
+# par thread ne serait jamais refermée
+os.environ.setdefault('DJANGO_DB_CONN_MAX_AGE', '0')
+
+
+class BlogASGIHandler(ASGIHandler):
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = getattr(settings, 'ASGI_URLCONF', settings.ROOT_URLCONF)
+        return request, error_response
+
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+application = BlogASGIHandler()
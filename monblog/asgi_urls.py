@@ -0,0 +1,18 @@
+"""
+Configuration des URL sous ASGI (voir asgi.py) : celle de urls.py, avec les
+routes de blogapp.async_urls à la place de blogapp.urls.
+"""
+from django.urls import include, path
+
+from blogapp import urls as blog_urls
+
+from . import urls
+
+
+urlpatterns = [
+    path('', include('blogapp.async_urls')) if getattr(pattern, 'urlconf_name', None) is blog_urls else pattern
+    for pattern in urls.urlpatterns
+]
+
+handler404 = urls.handler404
+handler500 = urls.handler500
@@ -44,7 +44,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blogapp.middleware.RequestTimingMiddleware',
+    'blogapp.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'blogapp.db_router.PrimaryPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,6 +57,8 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'monblog.urls'
+# Sous ASGI : pages de lecture servies par des vues asynchrones (voir monblog/asgi.py)
+ASGI_URLCONF = 'monblog.asgi_urls'
 
 TEMPLATES = [
     {
@@ -77,10 +82,74 @@ WSGI_APPLICATION = 'monblog.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Profil SQLite de production, appliqué à chaque nouvelle connexion :
+# - WAL : les lectures ne bloquent plus l'écriture (et inversement), un seul
+#   écrivain à la fois;
+# - busy_timeout : un écrivain attend le verrou au lieu d'échouer aussitôt
+#   avec « database is locked »;
+# - synchronous=NORMAL : sûr en WAL, pas de fsync à chaque transaction;
+# - mmap, cache de pages (20 Mo) et tables temporaires en mémoire.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'init_command': ''.join('PRAGMA {}={};'.format(*pragma) for pragma in SQLITE_PRAGMAS.items()),
+            # BEGIN IMMEDIATE : le verrou d'écriture est pris au début de
+            # transaction.atomic(), en attendant busy_timeout; en mode différé,
+            # une transaction qui lit puis écrit échoue sans attendre si un
+            # autre écrivain est passé entre-temps
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Connexions persistantes (désactivées sous ASGI, voir monblog/asgi.py),
+        # vérifiées avant d'être réutilisées par une nouvelle requête
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+# Connexion en lecture seule sur le même fichier (voir blogapp/db_router.py);
+# journal_mode n'y est pas modifiable, BEGIN IMMEDIATE inutile
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': '{}?mode=ro'.format((BASE_DIR / 'db.sqlite3').as_uri()),
+    'OPTIONS': {
+        'init_command': ''.join(
+            'PRAGMA {}={};'.format(*pragma) for pragma in SQLITE_PRAGMAS.items() if pragma[0] != 'journal_mode'
+        ),
+    },
+    'TEST': {'MIRROR': 'default'},
+}
+
+DATABASE_ROUTERS = ['blogapp.db_router.ReadReplicaRouter']
+DATABASE_READ_REPLICAS = ['replica']
+# Lectures sur la base principale après une requête POST qui a écrit
+DATABASE_PIN_SECONDS = 5
+
+
+# Cache partagé entre les processus workers (l'invalidation doit atteindre
+# tous les workers). Au-delà de MAX_ENTRIES, FileBasedCache supprime des
+# fichiers au hasard, y compris les clés sans expiration (versions des
+# étiquettes de pages, génération des cartes) : la limite couvre les pages
+# et les cartes de chaque variante. Les vues en attente restent dans la
+# mémoire de chaque processus (voir blogapp/view_counter.py).
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'DJANGO_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', 50000)),
+        },
     }
 }
 
@@ -123,9 +192,28 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic : CSS minifiées, noms hachés, variantes .gz/.br (voir
+# blogapp/assets.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'blogapp.assets.CompressedManifestStaticFilesStorage'},
+}
+# Servir STATIC_ROOT depuis Django (cache d'un an sur les noms hachés);
+# False si le serveur web sert lui-même /static/
+STATIC_SERVE = True
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Servir MEDIA_ROOT depuis Django (voir blogapp/file_serving.py)
+MEDIA_SERVE = True
+MEDIA_CACHE_MAX_AGE = 86400
+# Délégation de l'envoi au serveur web : None, 'x-sendfile' (Apache,
+# lighttpd) ou 'x-accel-redirect' (nginx : location interne
+# SENDFILE_ACCEL_PREFIX + 'media/' pointant sur MEDIA_ROOT)
+SENDFILE_BACKEND = None
+SENDFILE_ACCEL_PREFIX = '/_sendfile/'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CKEditor Configuration
@@ -163,4 +251,56 @@ MESSAGE_TAGS = {
 }
 
 # Pagination
-PAGINATE_BY = 6
\ No newline at end of file
+PAGINATE_BY = 6
+
+# Compteur de vues : écriture groupée toutes les N secondes ou N vues
+VIEW_COUNTER_FLUSH_INTERVAL = 10
+VIEW_COUNTER_FLUSH_THRESHOLD = 100
+
+# Variantes d'images générées hors requête (pool de threads)
+IMAGE_VARIANTS_ASYNC = True
+IMAGE_VARIANT_WORKERS = 2
+
+# Pagination : les anciens liens ?page=N restent servis jusqu'à cette page
+PAGINATION_LEGACY_PAGES = 5
+
+# Instantané de la page d'accueil (invalidé par les signaux)
+HOME_CACHE_TIMEOUT = 3600
+
+# Liste des plateformes actives (voir blogapp/platforms.py)
+PLATFORM_CACHE_TIMEOUT = 3600
+
+# Cache de pages complètes pour les visiteurs anonymes (voir blogapp/page_cache.py)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 600
+# Succès/échecs du cache de pages journalisés tous les N accès, par processus
+PAGE_CACHE_STATS_LOG_EVERY = 1000
+
+# Compression brotli/gzip des réponses et minification du HTML (voir
+# blogapp/compression.py)
+COMPRESSION_ENABLED = True
+HTML_MINIFY = True
+
+# Cartes d'articles/projets rendues, clées par updated_at (voir blogapp/cards.py)
+CARD_CACHE_TIMEOUT = 86400
+
+# Articles/projets similaires précalculés (voir blogapp/recommendations.py) :
+# recalcul du voisinage d'un document modifié après le commit
+RECOMMENDATIONS_AUTO_UPDATE = True
+
+# Mesure des requêtes (SQL, templates, Server-Timing) sur une fraction du
+# trafic; 0 = désactivé. Voir blogapp/middleware.py
+REQUEST_TIMING_SAMPLE_RATE = 0.0
+REQUEST_TIMING_DUPLICATE_THRESHOLD = 2
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'blogapp.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'blogapp.page_cache': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
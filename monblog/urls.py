@@ -15,11 +15,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 
+from blogapp import assets, file_serving
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('blogapp.urls')),
@@ -42,10 +45,13 @@ urlpatterns = [
     ), name='password_reset_complete'),
 ]
 
-# Gestion des fichiers média en développement
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+# Fichiers statiques collectés (variantes compressées, cache longue durée)
+if settings.STATIC_SERVE:
+    urlpatterns.insert(0, re_path(r'^%s(?P<path>.+)$' % re.escape(settings.STATIC_URL.lstrip('/')), assets.serve))
+
+# Fichiers téléversés (ETag, plages, délégation au serveur web)
+if settings.MEDIA_SERVE:
+    urlpatterns.insert(0, re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), file_serving.serve_media))
 
 # Gestionnaires d'erreurs personnalisés
 handler404 = 'blogapp.views.custom_404'